@@ -1,5 +1,9 @@
+from .base import API, ChunkIndex, LatencyHistory, Response, UploadJournal
 from .initialize_repository_api import InitializeRepositoryAPI
-from .query_repository_api import QueryRepositoryAPI
-from .reinitialize_repository_api import ReinitializeRepositoryAPI
+from .query_repository_api import QueryRepositoryAPI, QueryResult
+from .reinitialize_repository_api import (
+    IncompleteUploadError,
+    ReinitializeRepositoryAPI,
+)
 from .uninitialize_repository_api import UninitializeRepositoryAPI
 from .validate_repository_id_api import ValidateRepositoryIdAPI
@@ -1 +1,12 @@
 from .api import API
+from .async_session import AsyncSession, Response, StreamingResponse
+from .batch_builder import BatchBuilder
+from .batch_loader import BatchLoader
+from .batch_uploader import BatchUploader
+from .chunk_index import ChunkIndex, FileRecipe
+from .concurrency_controller import ConcurrencyController
+from .latency_history import LatencyHistory
+from .media_type import MediaType
+from .request_body import RequestBody
+from .multipart_request_body import MultipartRequestBody
+from .upload_journal import UploadJournal, UploadSession
@@ -1,8 +1,211 @@
 from abc import ABC, abstractmethod
-from typing import Any
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Coroutine,
+    Iterable,
+    Iterator,
+)
+import asyncio, atexit, requests, threading, time, weakref
+
+from .async_session import AsyncSession, Response
+from .latency_history import LatencyHistory
+from .request_body import RequestBody
+from insight_cli import config
+from insight_cli.utils import File
 
 
 class API(ABC):
+    """
+    Every endpoint is implemented as a coroutine, make_request_async,
+    which can be awaited from any event loop. The synchronous
+    make_request runs that coroutine on a single background event
+    loop shared by all API subclasses, so that synchronous callers
+    share one connection pool across calls as well.
+    """
+
+    _UNSUPPORTED_ENDPOINT_STATUS_CODES = {405, 501}
+    _loop: asyncio.AbstractEventLoop | None = None
+    _loop_lock = threading.Lock()
+    _sessions: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    @staticmethod
+    def _get_loop() -> asyncio.AbstractEventLoop:
+        with API._loop_lock:
+            if API._loop is None:
+                API._loop = asyncio.new_event_loop()
+                threading.Thread(target=API._loop.run_forever, daemon=True).start()
+                atexit.register(API._close_session)
+
+        return API._loop
+
+    @staticmethod
+    def _close_session() -> None:
+        """
+        Closes the pooled connections of the background event loop
+        before the interpreter exits, which would otherwise leave their
+        transports open.
+        """
+        if API._loop not in API._sessions:
+            return
+
+        try:
+            asyncio.run_coroutine_threadsafe(
+                API._sessions[API._loop].close(), API._loop
+            ).result(config.INSIGHT_API_READ_TIMEOUT_SECONDS)
+        except Exception:
+            pass
+
+    @staticmethod
+    def _run(coroutine: Coroutine) -> Any:
+        return asyncio.run_coroutine_threadsafe(coroutine, API._get_loop()).result()
+
+    @staticmethod
+    def _iterate(async_iterator: AsyncIterator) -> Iterator:
+        """
+        Iterates [async_iterator] on the background event loop, one
+        item at a time, so that synchronous callers receive each item
+        as soon as it is produced.
+        """
+        try:
+            while True:
+                try:
+                    yield API._run(anext(async_iterator))
+                except StopAsyncIteration:
+                    return
+
+        finally:
+            API._run(async_iterator.aclose())
+
+    @staticmethod
+    def session() -> AsyncSession:
+        """
+        Every API subclass shares a single keep-alive session per
+        event loop so that consecutive requests (and concurrent upload
+        batches) reuse pooled connections instead of reconnecting each
+        time. Must be called from a running event loop.
+        """
+        loop = asyncio.get_running_loop()
+
+        if loop not in API._sessions:
+            API._sessions[loop] = AsyncSession(
+                config.INSIGHT_API_MAX_CONCURRENT_REQUESTS
+            )
+
+        return API._sessions[loop]
+
+    @staticmethod
+    async def warm_up_async() -> None:
+        try:
+            await API.session().request("HEAD", config.INSIGHT_API_BASE_URL)
+        except requests.RequestException:
+            pass
+
+    @staticmethod
+    def warm_up() -> Future:
+        return asyncio.run_coroutine_threadsafe(API.warm_up_async(), API._get_loop())
+
+    @staticmethod
+    async def _send(method: str, url: str, body: RequestBody, **kwargs) -> Response:
+        while True:
+            response = await API.session().request(
+                method, url, data=body.content, headers=body.headers, **kwargs
+            )
+
+            media_type_is_unsupported = response.status_code == 415
+            if not media_type_is_unsupported:
+                return response
+
+            fallback_body = body.fallback(
+                response.headers.get("Accept-Encoding"), response.headers.get("Accept")
+            )
+            if fallback_body is None:
+                return response
+
+            body = fallback_body
+
+    @staticmethod
+    async def _hedge(
+        make_attempt: Callable[[], Awaitable],
+        endpoint: str,
+        latency_history: LatencyHistory | None,
+        discard: Callable[[Any], Awaitable] | None = None,
+    ) -> Any:
+        """
+        Makes an attempt with [make_attempt] and, if it has not finished
+        within the hedge delay of [endpoint] in [latency_history], a
+        duplicate one, returning the result of whichever succeeds first.
+        The other attempt is cancelled, or its result passed to
+        [discard] if it also succeeded. The time since the first attempt
+        was made is recorded, which is never more than how long the
+        first attempt alone would have taken, so hedging does not make
+        the recorded latencies any longer.
+        """
+        if latency_history is None:
+            return await make_attempt()
+
+        started_at = time.perf_counter()
+        hedge_delay_seconds = latency_history.get_hedge_delay_seconds(endpoint)
+        pending_tasks = {asyncio.create_task(make_attempt())}
+        error = None
+
+        try:
+            while pending_tasks:
+                done_tasks, pending_tasks = await asyncio.wait(
+                    pending_tasks,
+                    timeout=hedge_delay_seconds,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+
+                if not done_tasks:
+                    pending_tasks.add(asyncio.create_task(make_attempt()))
+                    hedge_delay_seconds = None
+                    continue
+
+                successful_tasks = [
+                    task for task in done_tasks if task.exception() is None
+                ]
+
+                if not successful_tasks:
+                    error = next(iter(done_tasks)).exception()
+                    continue
+
+                latency_history.record(endpoint, time.perf_counter() - started_at)
+
+                for task in successful_tasks[1:]:
+                    if discard is not None:
+                        await discard(task.result())
+
+                return successful_tasks[0].result()
+
+            raise error
+
+        finally:
+            for task in pending_tasks:
+                task.cancel()
+
+            for result in await asyncio.gather(*pending_tasks, return_exceptions=True):
+                if discard is not None and not isinstance(result, BaseException):
+                    await discard(result)
+
+    @staticmethod
+    def _get_content_hashes(file_paths: Iterable[str]) -> dict[str, str]:
+        file_paths = list(file_paths)
+
+        with ThreadPoolExecutor() as executor:
+            content_hashes = executor.map(
+                lambda file_path: File(Path(file_path)).content_hash, file_paths
+            )
+            return dict(zip(file_paths, content_hashes))
+
+    @abstractmethod
+    async def make_request_async(self, *args, **kwargs) -> Any:
+        pass
+
     @abstractmethod
     def make_request(self, *args, **kwargs) -> Any:
         pass
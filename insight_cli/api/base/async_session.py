@@ -0,0 +1,359 @@
+from requests.structures import CaseInsensitiveDict
+from typing import Any, AsyncIterator, Iterable, Iterator
+from urllib.parse import urlsplit
+import contextlib, functools, httpx, os, requests, stat
+
+from .media_type import MediaType
+from .multipart_request_body import MultipartRequestBody
+from .request_body import RequestBody
+from insight_cli import config
+from insight_cli.utils import Deadline
+
+
+class Response:
+    def __init__(
+        self,
+        url: str,
+        status_code: int,
+        reason: str,
+        headers: CaseInsensitiveDict,
+        content: bytes,
+    ):
+        self.url = url
+        self.status_code = status_code
+        self.reason = reason
+        self.headers = headers
+        self.content = content
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400
+
+    def json(self) -> Any:
+        """
+        Decodes the content as JSON or MessagePack, whichever the
+        server sent.
+        """
+        return MediaType.decode(self.content, self.headers.get("Content-Type"))
+
+    def raise_for_status(self) -> None:
+        if 400 <= self.status_code < 600:
+            raise requests.HTTPError(
+                f"{self.status_code} {self.reason} for url: {self.url}",
+                response=self,
+            )
+
+
+class StreamingResponse(Response):
+    """
+    A response whose content is read from its connection as it is
+    consumed, with iter_content, iter_lines or read. Connection
+    failures and undecodable content while reading are raised as the
+    corresponding requests exceptions.
+    """
+
+    def __init__(self, url: str, response: httpx.Response):
+        super().__init__(
+            url,
+            response.status_code,
+            response.reason_phrase,
+            CaseInsensitiveDict(response.headers),
+            b"",
+        )
+        self._response = response
+        self._is_consumed = False
+
+    @property
+    def is_consumed(self) -> bool:
+        return self._is_consumed
+
+    async def iter_content(self) -> AsyncIterator[bytes]:
+        with AsyncSession._raise_as_requests_error():
+            async for chunk in self._response.aiter_bytes():
+                yield chunk
+
+        self._is_consumed = True
+
+    async def iter_lines(self) -> AsyncIterator[bytes]:
+        """
+        Yields every non-empty line of the content without its line
+        ending.
+        """
+        buffer = b""
+
+        async for chunk in self.iter_content():
+            *lines, buffer = (buffer + chunk).split(b"\n")
+
+            for line in lines:
+                if line := line.rstrip(b"\r"):
+                    yield line
+
+        if buffer := buffer.rstrip(b"\r"):
+            yield buffer
+
+    async def read(self) -> bytes:
+        self.content = b"".join([chunk async for chunk in self.iter_content()])
+        return self.content
+
+
+class AsyncSession:
+    """
+    A keep-alive HTTP session on httpx.AsyncClient, so that a single
+    event loop can keep many requests in flight without a thread per
+    request. As with requests, redirects are followed, HTTP(S)_PROXY
+    and NO_PROXY select the proxy of each request, and certificates are
+    verified against REQUESTS_CA_BUNDLE or CURL_CA_BUNDLE if set, and
+    certifi otherwise. httpx errors are raised as the corresponding
+    requests exceptions so callers handle them the same way as before.
+    Opening a connection, and every wait for the server to accept or
+    send data, time out as the connect and read timeouts of requests
+    do. A server on the same host can also be reached through a Unix
+    domain socket, with a URL such as unix:///path/to/socket/endpoint.
+    """
+
+    _UNIX_SCHEME = "unix"
+    _UNIX_SOCKET_HOST = "localhost"
+    _CA_BUNDLE_ENV_NAMES = ("REQUESTS_CA_BUNDLE", "CURL_CA_BUNDLE")
+
+    def __init__(self, max_num_idle_connections: int):
+        self._limits = httpx.Limits(
+            max_connections=None, max_keepalive_connections=max_num_idle_connections
+        )
+        self._client: httpx.AsyncClient | None = None
+        self._unix_socket_clients: dict[str, httpx.AsyncClient] = {}
+
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def _split_unix_socket_path(path: str) -> tuple[str, str]:
+        """
+        Splits the path of a unix URL into the path of its socket,
+        which is the shortest prefix of it that is a socket, and the
+        path of the request.
+        """
+        parts = path.split("/")
+
+        for i in range(2, len(parts) + 1):
+            socket_path = "/".join(parts[:i])
+
+            try:
+                if stat.S_ISSOCK(os.stat(socket_path).st_mode):
+                    return socket_path, "/".join(["", *parts[i:]])
+            except OSError:
+                break
+
+        raise requests.ConnectionError(f"cannot find a unix socket in {path}")
+
+    @staticmethod
+    def _get_ca_bundle() -> str | bool:
+        return next(
+            (
+                os.environ[name]
+                for name in AsyncSession._CA_BUNDLE_ENV_NAMES
+                if os.environ.get(name)
+            ),
+            True,
+        )
+
+    def _get_client(self, url: str) -> tuple[httpx.AsyncClient, str]:
+        """
+        Returns the client to send a request for [url] with, and the URL
+        to send it to. Requests for a unix URL are sent over its socket
+        by a client of their own.
+        """
+        split_url = urlsplit(url)
+
+        if split_url.scheme != AsyncSession._UNIX_SCHEME:
+            if self._client is None:
+                self._client = httpx.AsyncClient(
+                    verify=AsyncSession._get_ca_bundle(),
+                    limits=self._limits,
+                    follow_redirects=True,
+                )
+
+            return self._client, url
+
+        socket_path, path = AsyncSession._split_unix_socket_path(split_url.path)
+
+        if socket_path not in self._unix_socket_clients:
+            self._unix_socket_clients[socket_path] = httpx.AsyncClient(
+                transport=httpx.AsyncHTTPTransport(
+                    uds=socket_path, limits=self._limits
+                ),
+                follow_redirects=True,
+            )
+
+        return (
+            self._unix_socket_clients[socket_path],
+            split_url._replace(
+                scheme="http", netloc=AsyncSession._UNIX_SOCKET_HOST, path=path
+            ).geturl(),
+        )
+
+    @staticmethod
+    def _get_timeout() -> httpx.Timeout:
+        read_timeout = Deadline.limit(config.INSIGHT_API_READ_TIMEOUT_SECONDS)
+
+        return httpx.Timeout(
+            connect=Deadline.limit(config.INSIGHT_API_CONNECT_TIMEOUT_SECONDS),
+            read=read_timeout,
+            write=read_timeout,
+            pool=None,
+        )
+
+    @staticmethod
+    @contextlib.contextmanager
+    def _raise_as_requests_error() -> Iterator[None]:
+        """
+        A timeout once the deadline is reached is raised as
+        DeadlineExceededError.
+        """
+        try:
+            yield
+
+        except httpx.TimeoutException as e:
+            Deadline.raise_if_expired()
+
+            if isinstance(e, httpx.ConnectTimeout):
+                raise requests.ConnectTimeout(e) from e
+
+            if isinstance(e, httpx.ReadTimeout):
+                raise requests.ReadTimeout(e) from e
+
+            raise requests.Timeout(e) from e
+
+        except httpx.ProxyError as e:
+            raise requests.exceptions.ProxyError(e) from e
+
+        except httpx.UnsupportedProtocol as e:
+            raise requests.exceptions.InvalidSchema(e) from e
+
+        except httpx.TooManyRedirects as e:
+            raise requests.TooManyRedirects(e) from e
+
+        except httpx.DecodingError as e:
+            raise requests.exceptions.ContentDecodingError(e) from e
+
+        except httpx.InvalidURL as e:
+            raise requests.exceptions.InvalidURL(e) from e
+
+        except (httpx.TransportError, httpx.StreamError) as e:
+            raise requests.ConnectionError(e) from e
+
+    @staticmethod
+    async def _iter_data(
+        data: Iterable[bytes | memoryview],
+    ) -> AsyncIterator[bytes | memoryview]:
+        for part in data:
+            yield part
+
+    @staticmethod
+    def _get_request_headers(
+        data: bytes | Iterable[bytes | memoryview] | None,
+        headers: dict[str, str] | None,
+        cookies: dict[str, str] | None,
+        content_type: str | None,
+    ) -> dict[str, str]:
+        request_headers = {
+            "User-Agent": f"insight-cli/{config.INSIGHT_VERSION}",
+            "Accept": MediaType.accept_header(),
+        }
+
+        if content_type is not None:
+            request_headers["Content-Type"] = content_type
+
+        if data is not None:
+            request_headers["Content-Length"] = str(len(data))
+
+        if cookies:
+            request_headers["Cookie"] = "; ".join(
+                f"{name}={value}" for name, value in cookies.items()
+            )
+
+        request_headers.update(headers or {})
+
+        return request_headers
+
+    @contextlib.asynccontextmanager
+    async def stream(
+        self,
+        method: str,
+        url: str,
+        data: bytes | Iterable[bytes | memoryview] | None = None,
+        headers: dict[str, str] | None = None,
+        cookies: dict[str, str] | None = None,
+        json: Any = None,
+    ) -> AsyncIterator[StreamingResponse]:
+        """
+        Sends a request and yields its response as soon as the response
+        head is read, so that its content can be consumed as it
+        arrives. The connection is only returned to the pool if the
+        content was read in full. [json] is sent in the preferred media
+        type, which need not be JSON.
+        """
+        content_type = None
+
+        if json is not None:
+            content_type = MediaType.preferred_media_type()
+            data = MediaType.encode(json, content_type)
+
+        request_headers = AsyncSession._get_request_headers(
+            data, headers, cookies, content_type
+        )
+
+        with AsyncSession._raise_as_requests_error():
+            client, request_url = self._get_client(url)
+            response = await client.send(
+                client.build_request(
+                    method,
+                    request_url,
+                    content=(
+                        data
+                        if data is None or isinstance(data, (bytes, bytearray))
+                        else AsyncSession._iter_data(data)
+                    ),
+                    headers=request_headers,
+                    timeout=AsyncSession._get_timeout(),
+                ),
+                stream=True,
+            )
+
+        try:
+            MediaType.record_response(response.headers.get("Content-Type"))
+            RequestBody.record_response(response.headers.get("Accept-Encoding"))
+            MultipartRequestBody.record_response(response.headers.get("Accept-Post"))
+
+            yield StreamingResponse(url, response)
+
+        finally:
+            await response.aclose()
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        data: bytes | Iterable[bytes | memoryview] | None = None,
+        headers: dict[str, str] | None = None,
+        cookies: dict[str, str] | None = None,
+        json: Any = None,
+    ) -> Response:
+        async with self.stream(
+            method, url, data=data, headers=headers, cookies=cookies, json=json
+        ) as response:
+            return Response(
+                url,
+                response.status_code,
+                response.reason,
+                response.headers,
+                await response.read(),
+            )
+
+    async def close(self) -> None:
+        clients = [*self._unix_socket_clients.values()]
+
+        if self._client is not None:
+            clients.append(self._client)
+
+        self._client, self._unix_socket_clients = None, {}
+
+        for client in clients:
+            await client.aclose()
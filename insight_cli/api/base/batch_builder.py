@@ -0,0 +1,385 @@
+import bisect, json, math
+
+from .multipart_request_body import MultipartRequestBody
+from insight_cli.utils import FileChunkifier
+
+
+class _BatchItem:
+    __slots__ = (
+        "file_path",
+        "change",
+        "start",
+        "end",
+        "chunk_index",
+        "num_total_chunks",
+        "json_size_bytes",
+        "multipart_size_bytes",
+        "change_size_bytes",
+    )
+
+    def __init__(
+        self,
+        file_path: str,
+        change: str | None,
+        start: int | None = None,
+        end: int | None = None,
+        chunk_index: int = 0,
+        num_total_chunks: int = 1,
+    ):
+        self.file_path = file_path
+        self.change = change
+        self.start = start
+        self.end = end
+        self.chunk_index = chunk_index
+        self.num_total_chunks = num_total_chunks
+        self.json_size_bytes = 0
+        self.multipart_size_bytes = 0
+        self.change_size_bytes = 0
+
+    @property
+    def has_content(self) -> bool:
+        return self.start is not None
+
+    @property
+    def size_bytes(self) -> int:
+        return self.end - self.start if self.has_content else 0
+
+
+class _Batch:
+    __slots__ = (
+        "index",
+        "items",
+        "num_files",
+        "json_size_bytes",
+        "multipart_size_bytes",
+    )
+
+    def __init__(self, index: int, json_size_bytes: int, multipart_size_bytes: int):
+        self.index = index
+        self.items: list[_BatchItem] = []
+        self.num_files = 0
+        self.json_size_bytes = json_size_bytes
+        self.multipart_size_bytes = multipart_size_bytes
+
+    @property
+    def size_bytes(self) -> int:
+        return max(self.json_size_bytes, self.multipart_size_bytes)
+
+
+class BatchBuilder:
+    """
+    Packs files into batches whose request bodies never exceed
+    [max_batch_size_bytes]. The size of every entry is computed
+    exactly for both body formats, the base64 JSON body and the
+    multipart body of raw bytes, and a batch is charged the larger of
+    the two since it can be sent in either format after a fallback.
+    Only the batch index and number of batches are estimated, at
+    their maximum width.
+
+    Files are packed best-fit-decreasing. The size of every entry is
+    computed once, when it is added, and open batches are kept sorted
+    by the room left in them, so that the fullest batch an entry fits
+    in is found by bisection. A file is only split into chunks when it
+    does not fit in an empty batch; all but its last chunk then fill a
+    batch each. Batches are returned largest first so that the longest
+    uploads start first.
+    """
+
+    MAX_NUM_BATCHES = 2**31 - 1
+    _ITEM_SEPARATOR_SIZE_BYTES = len(", ")
+    _MAX_NUM_FIT_CHECKS = 2
+    _PART_NAME = "file_0"
+    _PART_HEADER_SIZE_BYTES = MultipartRequestBody.part_header_size(
+        _PART_NAME, "application/octet-stream"
+    )
+
+    @staticmethod
+    def _get_base64_size_bytes(size_bytes: int) -> int:
+        return 4 * math.ceil(size_bytes / 3)
+
+    @staticmethod
+    def _get_key_size_bytes(file_path: str) -> int:
+        return len(json.dumps(file_path)) + len(": ")
+
+    @staticmethod
+    def _get_change_size_bytes(item: _BatchItem) -> int:
+        return BatchBuilder._get_key_size_bytes(item.file_path) + len(
+            json.dumps(item.change)
+        )
+
+    @staticmethod
+    def _get_part_index_size_bytes(part_index: int) -> int:
+        """
+        The part name, file_<part_index>, is in both the metadata and
+        the part header of a multipart body. The size of an entry is
+        computed with part index 0, and this is added to it.
+        """
+        return 2 * (len(str(part_index)) - 1)
+
+    @staticmethod
+    def _get_file_size_bytes(item: _BatchItem) -> tuple[int, int]:
+        metadata = {
+            "size_bytes": item.size_bytes,
+            "chunk_index": item.chunk_index,
+            "num_total_chunks": item.num_total_chunks,
+        }
+        key_size_bytes = BatchBuilder._get_key_size_bytes(item.file_path)
+        metadata_size_bytes = len(json.dumps({**metadata, "content": ""}))
+
+        json_size_bytes = (
+            key_size_bytes
+            + metadata_size_bytes
+            + BatchBuilder._get_base64_size_bytes(item.size_bytes)
+        )
+        multipart_size_bytes = (
+            key_size_bytes
+            + metadata_size_bytes
+            + len(BatchBuilder._PART_NAME)
+            + len("\r\n")
+            + BatchBuilder._PART_HEADER_SIZE_BYTES
+            + item.size_bytes
+        )
+
+        return json_size_bytes, multipart_size_bytes
+
+    def __init__(
+        self,
+        max_batch_size_bytes: int,
+        base_request_body: dict,
+        includes_changes: bool = False,
+    ):
+        """
+        [base_request_body] is the request body of a batch without
+        files or changes, with the batch index and number of batches
+        set to MAX_NUM_BATCHES.
+        """
+        base_request_body_json = json.dumps(base_request_body)
+
+        self._max_batch_size_bytes = max_batch_size_bytes
+        self._includes_changes = includes_changes
+        self._base_json_size_bytes = len(base_request_body_json)
+        self._base_multipart_size_bytes = (
+            MultipartRequestBody.part_header_size("metadata", "application/json")
+            + len(base_request_body_json)
+            + MultipartRequestBody.closing_delimiter_size()
+        )
+        self._items: list[_BatchItem] = []
+
+    def _measure(self, item: _BatchItem) -> _BatchItem:
+        if item.has_content:
+            item.json_size_bytes, item.multipart_size_bytes = (
+                BatchBuilder._get_file_size_bytes(item)
+            )
+
+        if self._includes_changes:
+            item.change_size_bytes = BatchBuilder._get_change_size_bytes(item)
+
+        return item
+
+    def _get_added_size_bytes(self, batch: _Batch, item: _BatchItem) -> tuple[int, int]:
+        json_size_bytes, multipart_size_bytes = 0, 0
+
+        if item.has_content:
+            json_size_bytes = item.json_size_bytes
+            multipart_size_bytes = (
+                item.multipart_size_bytes
+                + BatchBuilder._get_part_index_size_bytes(batch.num_files)
+            )
+
+            if batch.num_files > 0:
+                json_size_bytes += BatchBuilder._ITEM_SEPARATOR_SIZE_BYTES
+                multipart_size_bytes += BatchBuilder._ITEM_SEPARATOR_SIZE_BYTES
+
+        if self._includes_changes:
+            change_size_bytes = item.change_size_bytes
+
+            if len(batch.items) > 0:
+                change_size_bytes += BatchBuilder._ITEM_SEPARATOR_SIZE_BYTES
+
+            json_size_bytes += change_size_bytes
+            multipart_size_bytes += change_size_bytes
+
+        return json_size_bytes, multipart_size_bytes
+
+    def _fits(self, batch: _Batch, item: _BatchItem) -> bool:
+        json_size_bytes, multipart_size_bytes = self._get_added_size_bytes(batch, item)
+
+        return (
+            max(
+                batch.json_size_bytes + json_size_bytes,
+                batch.multipart_size_bytes + multipart_size_bytes,
+            )
+            <= self._max_batch_size_bytes
+        )
+
+    def _add_to_batch(self, batch: _Batch, item: _BatchItem) -> None:
+        json_size_bytes, multipart_size_bytes = self._get_added_size_bytes(batch, item)
+        batch.items.append(item)
+        batch.num_files += item.has_content
+        batch.json_size_bytes += json_size_bytes
+        batch.multipart_size_bytes += multipart_size_bytes
+
+    def _create_batch(self, index: int = 0) -> _Batch:
+        return _Batch(
+            index, self._base_json_size_bytes, self._base_multipart_size_bytes
+        )
+
+    def _get_room_bytes(self, batch: _Batch) -> int:
+        return self._max_batch_size_bytes - batch.size_bytes
+
+    def _get_max_chunk_size_bytes(self, file_path: str, file_size_bytes: int) -> int:
+        """
+        Returns the largest chunk of a [file_size_bytes] byte file that
+        fits in an empty batch, charging the chunk's metadata at the
+        widest it can be.
+        """
+        item = self._measure(
+            _BatchItem(
+                file_path, "update", 0, 0, file_size_bytes, max(file_size_bytes, 1)
+            )
+        )
+        batch = self._create_batch()
+        json_size_bytes, multipart_size_bytes = self._get_added_size_bytes(batch, item)
+        digits_size_bytes = len(str(file_size_bytes))
+
+        max_chunk_size_bytes = min(
+            3
+            * (
+                (
+                    self._max_batch_size_bytes
+                    - batch.json_size_bytes
+                    - json_size_bytes
+                    - digits_size_bytes
+                )
+                // 4
+            ),
+            self._max_batch_size_bytes
+            - batch.multipart_size_bytes
+            - multipart_size_bytes
+            - digits_size_bytes,
+        )
+
+        if max_chunk_size_bytes <= 0:
+            raise ValueError(
+                f"cannot fit {file_path} in a batch of {self._max_batch_size_bytes} bytes"
+            )
+
+        return max_chunk_size_bytes
+
+    def add_file(
+        self, file_path: str, file_size_bytes: int, change: str | None = None
+    ) -> None:
+        item = self._measure(_BatchItem(file_path, change, 0, file_size_bytes))
+
+        if self._fits(self._create_batch(), item):
+            self._items.append(item)
+            return
+
+        file_chunk_ranges = FileChunkifier.chunkify_file_size(
+            file_size_bytes,
+            self._get_max_chunk_size_bytes(file_path, file_size_bytes),
+        )
+
+        for i, (start, end) in enumerate(file_chunk_ranges):
+            self._items.append(
+                self._measure(
+                    _BatchItem(file_path, change, start, end, i, len(file_chunk_ranges))
+                )
+            )
+
+    def add_change(self, file_path: str, change: str) -> None:
+        """
+        Adds a change that is sent without content, such as a deletion.
+        """
+        self._items.append(self._measure(_BatchItem(file_path, change)))
+
+    def _find_batch(
+        self,
+        batches: list[_Batch],
+        batch_rooms: list[tuple[int, int]],
+        item: _BatchItem,
+    ) -> _Batch | None:
+        """
+        [batch_rooms] holds the room left in each of [batches] with its
+        index, in ascending order. The room an entry takes in a batch
+        is at least the smaller of its sizes in the two body formats,
+        and at most the larger of them with a separator and the widest
+        part index, so only the batches with room in between need to be
+        checked exactly. At most _MAX_NUM_FIT_CHECKS of them are, before
+        falling back to the fullest batch with room for the largest
+        size.
+        """
+        min_room_bytes = (
+            min(item.json_size_bytes, item.multipart_size_bytes)
+            + item.change_size_bytes
+        )
+        i = bisect.bisect_left(batch_rooms, (min_room_bytes, -1))
+
+        for _, batch_index in batch_rooms[i : i + BatchBuilder._MAX_NUM_FIT_CHECKS]:
+            if self._fits(batches[batch_index], item):
+                return batches[batch_index]
+
+        max_room_bytes = (
+            max(
+                item.json_size_bytes,
+                item.multipart_size_bytes
+                + BatchBuilder._get_part_index_size_bytes(len(self._items)),
+            )
+            + item.change_size_bytes
+            + 2 * BatchBuilder._ITEM_SEPARATOR_SIZE_BYTES
+        )
+        i = bisect.bisect_left(batch_rooms, (max_room_bytes, -1))
+
+        if i < len(batch_rooms) and self._fits(batches[batch_rooms[i][1]], item):
+            return batches[batch_rooms[i][1]]
+
+        return None
+
+    def build(self) -> list[dict]:
+        batches: list[_Batch] = []
+        batch_rooms: list[tuple[int, int]] = []
+        items = sorted(
+            self._items,
+            key=lambda item: (-item.size_bytes, item.file_path, item.chunk_index),
+        )
+
+        for item in items:
+            batch = self._find_batch(batches, batch_rooms, item)
+
+            if batch is None:
+                batch = self._create_batch(len(batches))
+                batches.append(batch)
+            else:
+                del batch_rooms[
+                    bisect.bisect_left(
+                        batch_rooms, (self._get_room_bytes(batch), batch.index)
+                    )
+                ]
+
+            self._add_to_batch(batch, item)
+            bisect.insort(batch_rooms, (self._get_room_bytes(batch), batch.index))
+
+        batches.sort(key=lambda batch: batch.size_bytes, reverse=True)
+
+        return [self._to_dict(batch) for batch in batches]
+
+    def _to_dict(self, batch: _Batch) -> dict:
+        batch_dict = {
+            "files": {
+                item.file_path: {
+                    "start": item.start,
+                    "end": item.end,
+                    "chunk_index": item.chunk_index,
+                    "num_total_chunks": item.num_total_chunks,
+                }
+                for item in batch.items
+                if item.has_content
+            }
+        }
+
+        if self._includes_changes:
+            batch_dict["changes"] = {
+                item.file_path: item.change for item in batch.items
+            }
+
+        return batch_dict
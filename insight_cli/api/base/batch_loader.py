@@ -0,0 +1,106 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Iterable, Iterator
+import collections, os
+
+from .multipart_request_body import MultipartRequestBody
+from .request_body import RequestBody
+from insight_cli.utils import ChunkedFileEncoder, File
+
+
+class BatchLoader:
+    """
+    Batches are planned from file sizes alone, with each file entry
+    holding the byte range of its chunk. BatchLoader reads, encodes and
+    compresses each planned batch's request body on a small worker
+    pool, keeping this work off the upload threads. Once read, a batch
+    can be passed through [deduplicate_batch], which drops the files
+    whose content the server already has. Batches are only
+    loaded as they are pulled, at most _NUM_LOAD_WORKERS ahead, so the
+    file content held in memory is bounded by the batches being
+    uploaded regardless of repository size. File chunks are only
+    base64 encoded when the server does not accept multipart bodies of
+    raw bytes.
+    """
+
+    _NUM_LOAD_WORKERS = min(4, os.cpu_count() or 1)
+
+    @staticmethod
+    def _map_concurrently(
+        function: Callable, iterable: Iterable, num_workers: int
+    ) -> Iterator:
+        with ThreadPoolExecutor(max_workers=num_workers) as executor:
+            futures = collections.deque()
+
+            for item in iterable:
+                futures.append(executor.submit(function, item))
+
+                if len(futures) >= num_workers:
+                    yield futures.popleft().result()
+
+            while futures:
+                yield futures.popleft().result()
+
+    @staticmethod
+    def _read_batch(batch: dict) -> dict:
+        return {
+            **batch,
+            "files": {
+                file_path: {
+                    "content": File(Path(file_path)).read(chunk["start"], chunk["end"]),
+                    "chunk_index": chunk["chunk_index"],
+                    "num_total_chunks": chunk["num_total_chunks"],
+                }
+                for file_path, chunk in batch["files"].items()
+            },
+        }
+
+    @staticmethod
+    def _encode_batch(batch: dict, as_base64: bool) -> dict:
+        return {
+            **batch,
+            "files": {
+                file_path: ChunkedFileEncoder.encode_chunk_with_metadata(
+                    chunk["content"],
+                    chunk["chunk_index"],
+                    chunk["num_total_chunks"],
+                    as_base64,
+                )
+                for file_path, chunk in batch["files"].items()
+            },
+        }
+
+    @staticmethod
+    def _load_batch(
+        batch: dict,
+        get_request_body: Callable[[dict], dict],
+        body_type: type[RequestBody],
+        deduplicate_batch: Callable[[dict], dict] | None,
+    ) -> dict:
+        read_batch = BatchLoader._read_batch(batch)
+
+        if deduplicate_batch is not None:
+            read_batch = deduplicate_batch(read_batch)
+
+        encoded_batch = BatchLoader._encode_batch(read_batch, body_type is RequestBody)
+        metadata = {key: value for key, value in batch.items() if key != "files"}
+
+        return {**metadata, "body": body_type(get_request_body(encoded_batch))}
+
+    @staticmethod
+    def load(
+        batches: Iterable[dict],
+        get_request_body: Callable[[dict], dict],
+        deduplicate_batch: Callable[[dict], dict] | None = None,
+    ) -> Iterator[dict]:
+        body_type = (
+            MultipartRequestBody if MultipartRequestBody.is_supported() else RequestBody
+        )
+
+        return BatchLoader._map_concurrently(
+            lambda batch: BatchLoader._load_batch(
+                batch, get_request_body, body_type, deduplicate_batch
+            ),
+            batches,
+            BatchLoader._NUM_LOAD_WORKERS,
+        )
@@ -0,0 +1,151 @@
+from typing import Any, Awaitable, Callable, Iterable
+import asyncio, itertools, random, requests
+
+from .concurrency_controller import ConcurrencyController
+from insight_cli import config
+from insight_cli.utils import Deadline, DeadlineExceededError
+
+
+class BatchUploader:
+    """
+    Uploads batches concurrently within an adaptive concurrency window.
+    Batches that fail transiently (throttling, gateway errors, dropped
+    connections and timeouts) are retried with exponential backoff and
+    full jitter; [on_batch_uploaded] is called once a batch has been
+    acknowledged by the server. A batch attempt that outlasts
+    INSIGHT_API_UPLOAD_BATCH_TIMEOUT_SECONDS is retried as a timeout,
+    while reaching the command deadline fails the upload at once.
+    """
+
+    _TRANSIENT_STATUS_CODES = {429, 502, 503, 504}
+    _MAX_NUM_ATTEMPTS = 5
+    _INITIAL_BACKOFF_SECONDS = 0.5
+    _MAX_BACKOFF_SECONDS = 30.0
+
+    @staticmethod
+    def _get_backoff_seconds(attempt: int) -> float:
+        return random.uniform(
+            0,
+            min(
+                BatchUploader._MAX_BACKOFF_SECONDS,
+                BatchUploader._INITIAL_BACKOFF_SECONDS * 2 ** (attempt - 1),
+            ),
+        )
+
+    def __init__(
+        self,
+        make_batch_request: Callable[[dict], Awaitable[Any]],
+        max_concurrent_requests: int | None = None,
+        on_batch_uploaded: Callable[[dict, Any], None] | None = None,
+    ):
+        self._make_batch_request = make_batch_request
+        self._on_batch_uploaded = on_batch_uploaded
+        self._controller = ConcurrencyController(
+            max_concurrent_requests or config.INSIGHT_API_MAX_CONCURRENT_REQUESTS
+        )
+        self._is_aborted = False
+
+    async def _upload_batch(self, batch: dict) -> Any:
+        for attempt in range(1, BatchUploader._MAX_NUM_ATTEMPTS + 1):
+            started_at = await self._controller.acquire()
+
+            if self._is_aborted:
+                self._controller.release()
+                raise asyncio.CancelledError
+
+            try:
+                result = await Deadline.wait_for(
+                    self._make_batch_request(batch),
+                    config.INSIGHT_API_UPLOAD_BATCH_TIMEOUT_SECONDS,
+                )
+
+            except DeadlineExceededError:
+                self._controller.release()
+                raise
+
+            except requests.HTTPError as e:
+                status_code = e.response.status_code if e.response is not None else None
+
+                if status_code not in BatchUploader._TRANSIENT_STATUS_CODES:
+                    self._controller.release()
+                    raise
+
+                self._controller.on_congestion(
+                    started_at,
+                    ConcurrencyController.parse_retry_after(
+                        e.response.headers.get("Retry-After")
+                    ),
+                )
+
+                if attempt == BatchUploader._MAX_NUM_ATTEMPTS:
+                    raise
+
+            except (requests.ConnectionError, requests.Timeout):
+                self._controller.on_congestion(started_at)
+
+                if attempt == BatchUploader._MAX_NUM_ATTEMPTS:
+                    raise
+
+            except BaseException:
+                self._controller.release()
+                raise
+
+            else:
+                self._controller.on_success(started_at)
+
+                if self._on_batch_uploaded is not None:
+                    self._on_batch_uploaded(batch, result)
+
+                return result
+
+            await asyncio.sleep(
+                Deadline.limit(BatchUploader._get_backoff_seconds(attempt))
+            )
+
+    async def upload(self, batches: Iterable[dict]) -> list:
+        """
+        A batch is only pulled from [batches] once a slot of the
+        concurrency window is free, so the batches pending at once,
+        including those waiting to be retried, are bounded by the
+        current window rather than by its maximum. Once a batch
+        fails, batches that have not been sent yet are abandoned while
+        the ones already in flight are allowed to finish, so that
+        every batch the server received is acknowledged.
+        """
+        results: dict[int, Any] = {}
+        tasks: dict[asyncio.Task, int] = {}
+        batch_iterator = iter(batches)
+
+        def collect(completed_tasks: set[asyncio.Task]) -> None:
+            for task in completed_tasks:
+                results[tasks.pop(task)] = task.result()
+
+        try:
+            for i in itertools.count():
+                while len(tasks) >= self._controller.limit:
+                    completed_tasks, _ = await asyncio.wait(
+                        tasks, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    collect(completed_tasks)
+
+                batch = await asyncio.to_thread(next, batch_iterator, None)
+
+                if batch is None:
+                    break
+
+                tasks[asyncio.create_task(self._upload_batch(batch))] = i
+
+            if tasks:
+                collect((await asyncio.wait(tasks))[0])
+
+        except BaseException as e:
+            self._is_aborted = True
+
+            if isinstance(e, asyncio.CancelledError):
+                for task in tasks:
+                    task.cancel()
+
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+        return [results[i] for i in range(len(results))]
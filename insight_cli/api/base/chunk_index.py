@@ -0,0 +1,135 @@
+from pathlib import Path
+from typing import Iterable, TypedDict
+import hashlib, json, os, threading
+
+from insight_cli import config
+from insight_cli.utils import ContentDefinedChunkifier, File
+
+
+class FileRecipe(TypedDict):
+    content_hash: str
+    chunks: list[tuple[str, int]]
+
+
+class ChunkIndex:
+    """
+    Keeps the content-defined chunks, as (chunk hash, size) pairs, of
+    the last uploaded version of every file that is synced by delta. A
+    later upload of a modified file then only sends the
+    chunks that are not in its last uploaded version. An index
+    without a parent directory is kept in memory only.
+    """
+
+    _FILE_NAME = "chunk_index.json"
+
+    @staticmethod
+    def is_synced_by_delta(file_size_bytes: int) -> bool:
+        """
+        Small files are cheaper to upload in full than to chunk, and
+        very large files are slower to chunk than to upload in full.
+        """
+        return (
+            config.INSIGHT_DELTA_SYNC_MIN_FILE_SIZE_BYTES
+            <= file_size_bytes
+            <= config.INSIGHT_DELTA_SYNC_MAX_FILE_SIZE_BYTES
+        )
+
+    @staticmethod
+    def get_recipe(content: bytes) -> FileRecipe:
+        return {
+            "content_hash": hashlib.sha256(content).hexdigest(),
+            "chunks": [
+                (hashlib.sha256(content[start:end]).hexdigest(), end - start)
+                for start, end in ContentDefinedChunkifier.chunkify_content(
+                    content, config.INSIGHT_DELTA_SYNC_AVERAGE_CHUNK_SIZE_BYTES
+                )
+            ],
+        }
+
+    def __init__(self, parent_dir_path: Path | None = None):
+        self._path: Path | None = (
+            parent_dir_path / ChunkIndex._FILE_NAME
+            if parent_dir_path is not None
+            else None
+        )
+        self._lock = threading.Lock()
+        self._recipes: dict[str, FileRecipe] | None = None
+
+    def _read_from_file(self) -> dict[str, FileRecipe]:
+        if self._path is None or not self._path.is_file():
+            return {}
+
+        try:
+            with open(self._path, "r") as file:
+                return json.load(file)
+        except json.JSONDecodeError:
+            return {}
+
+    def _write_to_file(self) -> None:
+        if self._path is None:
+            return
+
+        os.makedirs(self._path.parent, exist_ok=True)
+        temp_path = self._path.with_suffix(".tmp")
+
+        with open(temp_path, "w") as file:
+            file.write(json.dumps(self._recipes))
+
+        os.replace(temp_path, self._path)
+
+    def _get_recipes(self) -> dict[str, FileRecipe]:
+        if self._recipes is None:
+            self._recipes = self._read_from_file()
+
+        return self._recipes
+
+    def get(self, file_path: str) -> FileRecipe | None:
+        with self._lock:
+            return self._get_recipes().get(file_path)
+
+    def update(self, recipes: dict[str, FileRecipe | None]) -> None:
+        """
+        Records the recipe of each file in [recipes], or forgets the
+        file if its recipe is None.
+        """
+        with self._lock:
+            for file_path, recipe in recipes.items():
+                if recipe is None:
+                    self._get_recipes().pop(file_path, None)
+                else:
+                    self._get_recipes()[file_path] = recipe
+
+            self._write_to_file()
+
+    def record(
+        self,
+        file_paths: Iterable[str],
+        recipes: dict[str, FileRecipe] | None = None,
+    ) -> None:
+        """
+        Records the current content of [file_paths] as uploaded. Files
+        that are not synced by delta are forgotten instead. Files whose
+        current content was already chunked have their recipe in
+        [recipes], and are not chunked again.
+        """
+        known_recipes, recipes = recipes or {}, {}
+
+        for file_path in file_paths:
+            if file_path in known_recipes:
+                recipes[file_path] = known_recipes[file_path]
+                continue
+
+            file = File(Path(file_path))
+            file_size_bytes = file.size
+            recipes[file_path] = (
+                ChunkIndex.get_recipe(file.read(0, file_size_bytes))
+                if ChunkIndex.is_synced_by_delta(file_size_bytes)
+                else None
+            )
+
+        self.update(recipes)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._recipes = {}
+            self._write_to_file()
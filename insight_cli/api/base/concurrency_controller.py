@@ -0,0 +1,128 @@
+from email.utils import parsedate_to_datetime
+import asyncio, time
+
+
+class ConcurrencyController:
+    """
+    Bounds the number of in-flight requests with an AIMD window:
+    the window grows by one request per window of successful
+    requests and halves when the server signals congestion (429s,
+    5xx responses, connection errors, or a latency spike). A
+    window is only halved once per congestion event; requests that
+    started before the last decrease do not decrease it again.
+
+    The controller is not thread-safe and must only be used from the
+    event loop that awaits [acquire].
+    """
+
+    _INITIAL_LIMIT = 2
+    _LATENCY_SMOOTHING_FACTOR = 0.2
+    _LATENCY_TOLERANCE_FACTOR = 2.0
+    _MIN_LATENCY_SPIKE_SECONDS = 0.1
+    _DECREASE_FACTOR = 0.5
+
+    @staticmethod
+    def parse_retry_after(retry_after: str | None) -> float | None:
+        if retry_after is None:
+            return None
+
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            pass
+
+        try:
+            retry_date = parsedate_to_datetime(retry_after)
+        except (TypeError, ValueError):
+            return None
+
+        return max(0.0, retry_date.timestamp() - time.time())
+
+    def __init__(self, max_limit: int):
+        if max_limit < 1:
+            raise ValueError(f"{max_limit} must be at least 1")
+
+        self._max_limit: int = max_limit
+        self._limit: float = min(ConcurrencyController._INITIAL_LIMIT, max_limit)
+        self._num_in_flight: int = 0
+        self._latency_baseline: float | None = None
+        self._last_decrease_time: float = float("-inf")
+        self._resume_time: float = float("-inf")
+        self._slot_released = asyncio.Event()
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def max_limit(self) -> int:
+        return self._max_limit
+
+    def _decrease(self, started_at: float) -> None:
+        if started_at <= self._last_decrease_time:
+            return
+
+        self._limit = max(1.0, self._limit * ConcurrencyController._DECREASE_FACTOR)
+        self._last_decrease_time = time.monotonic()
+
+    def _increase(self) -> None:
+        self._limit = min(float(self._max_limit), self._limit + 1 / self._limit)
+
+    async def acquire(self) -> float:
+        while True:
+            delay = self._resume_time - time.monotonic()
+
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            elif self._num_in_flight >= self.limit:
+                self._slot_released.clear()
+                await self._slot_released.wait()
+
+            else:
+                break
+
+        self._num_in_flight += 1
+
+        return time.monotonic()
+
+    def release(self) -> None:
+        self._num_in_flight -= 1
+        self._slot_released.set()
+
+    def on_success(self, started_at: float) -> None:
+        latency = time.monotonic() - started_at
+        self._num_in_flight -= 1
+
+        if self._latency_baseline is None:
+            self._latency_baseline = latency
+
+        latency_is_spiking = (
+            latency
+            > self._latency_baseline * ConcurrencyController._LATENCY_TOLERANCE_FACTOR
+            and latency - self._latency_baseline
+            > ConcurrencyController._MIN_LATENCY_SPIKE_SECONDS
+        )
+
+        if latency_is_spiking:
+            self._decrease(started_at)
+
+        else:
+            self._increase()
+
+        self._latency_baseline += ConcurrencyController._LATENCY_SMOOTHING_FACTOR * (
+            latency - self._latency_baseline
+        )
+
+        self._slot_released.set()
+
+    def on_congestion(
+        self, started_at: float, retry_after: float | None = None
+    ) -> None:
+        self._num_in_flight -= 1
+        self._decrease(started_at)
+
+        if retry_after is not None:
+            self._resume_time = max(self._resume_time, time.monotonic() + retry_after)
+
+        self._slot_released.set()
@@ -0,0 +1,82 @@
+from pathlib import Path
+import json, math, os, threading
+
+from insight_cli import config
+
+
+class LatencyHistory:
+    """
+    Keeps the latencies of the most recent requests to each endpoint,
+    so that a request can be hedged once it has taken longer than a
+    given percentile of them. A history without a parent directory is
+    kept in memory only.
+    """
+
+    _FILE_NAME = "latencies.json"
+
+    def __init__(self, parent_dir_path: Path | None = None):
+        self._path: Path | None = (
+            parent_dir_path / LatencyHistory._FILE_NAME
+            if parent_dir_path is not None
+            else None
+        )
+        self._lock = threading.Lock()
+        self._latencies: dict[str, list[float]] | None = None
+
+    def _read_from_file(self) -> dict[str, list[float]]:
+        if self._path is None or not self._path.is_file():
+            return {}
+
+        try:
+            with open(self._path, "r") as file:
+                return json.load(file)
+        except json.JSONDecodeError:
+            return {}
+
+    def _write_to_file(self) -> None:
+        if self._path is None or not self._path.parent.is_dir():
+            return
+
+        temp_path = self._path.with_suffix(".tmp")
+
+        with open(temp_path, "w") as file:
+            file.write(json.dumps(self._latencies))
+
+        os.replace(temp_path, self._path)
+
+    def _get_latencies(self) -> dict[str, list[float]]:
+        if self._latencies is None:
+            self._latencies = self._read_from_file()
+
+        return self._latencies
+
+    def record(self, endpoint: str, latency_seconds: float) -> None:
+        with self._lock:
+            latencies = self._get_latencies().setdefault(endpoint, [])
+            latencies.append(latency_seconds)
+            del latencies[: -config.INSIGHT_API_HEDGE_MAX_NUM_LATENCIES]
+            self._write_to_file()
+
+    def get_percentile(self, endpoint: str, percentile: float) -> float | None:
+        """
+        Returns the nearest-rank [percentile] of the recent latencies
+        of [endpoint], or None if too few have been recorded for it to
+        be meaningful.
+        """
+        with self._lock:
+            latencies = sorted(self._get_latencies().get(endpoint, []))
+
+        if len(latencies) < config.INSIGHT_API_HEDGE_MIN_NUM_LATENCIES:
+            return None
+
+        return latencies[max(math.ceil(percentile / 100 * len(latencies)) - 1, 0)]
+
+    def get_hedge_delay_seconds(self, endpoint: str) -> float | None:
+        """
+        Returns how long a request to [endpoint] may take before it is
+        hedged, or None if it should not be hedged.
+        """
+        if config.INSIGHT_API_HEDGE_PERCENTILE is None:
+            return None
+
+        return self.get_percentile(endpoint, config.INSIGHT_API_HEDGE_PERCENTILE)
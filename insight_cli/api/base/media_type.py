@@ -0,0 +1,108 @@
+from typing import Any
+import json, threading
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+class MediaType:
+    """
+    Encodes and decodes API payloads in the most compact format that
+    both ends support. Every request offers MessagePack in its Accept
+    header when msgpack is installed, and request bodies are sent as
+    MessagePack once the server has responded with it, so servers that
+    only speak JSON never receive anything else. A server that rejects
+    a MessagePack body with a 415 response is sent JSON from then on.
+    """
+
+    JSON = "application/json"
+    MSGPACK = "application/msgpack"
+    _MSGPACK_ALIASES = {MSGPACK, "application/x-msgpack", "application/vnd.msgpack"}
+    _lock = threading.Lock()
+    _supported_media_types: set[str] = set()
+    _rejected_media_types: set[str] = set()
+
+    @staticmethod
+    def parse(content_type: str | None) -> str:
+        """
+        Returns the media type of a Content-Type header, without its
+        parameters, with JSON as the default.
+        """
+        media_type = (content_type or MediaType.JSON).split(";")[0].strip().lower()
+
+        return (
+            MediaType.MSGPACK
+            if media_type in MediaType._MSGPACK_ALIASES
+            else media_type
+        )
+
+    @staticmethod
+    def _available_media_types() -> list[str]:
+        return (
+            [MediaType.MSGPACK, MediaType.JSON]
+            if msgpack is not None
+            else [MediaType.JSON]
+        )
+
+    @staticmethod
+    def accept_header(*preferred_media_types: str) -> str:
+        """
+        Lists [preferred_media_types] and then every available media
+        type, each less preferred than the one before it.
+        """
+        media_types = [*preferred_media_types, *MediaType._available_media_types()]
+
+        return ", ".join(
+            media_type if i == 0 else f"{media_type};q=0.{10 - i}"
+            for i, media_type in enumerate(media_types)
+        )
+
+    @staticmethod
+    def preferred_media_type() -> str:
+        with MediaType._lock:
+            for media_type in MediaType._available_media_types():
+                is_supported = (
+                    media_type == MediaType.JSON
+                    or media_type in MediaType._supported_media_types
+                )
+
+                if is_supported and media_type not in MediaType._rejected_media_types:
+                    return media_type
+
+        return MediaType.JSON
+
+    @staticmethod
+    def record_response(content_type: str | None) -> None:
+        """
+        Records that the server supports the media type of a response
+        it sent with [content_type].
+        """
+        media_type = MediaType.parse(content_type)
+
+        if media_type in MediaType._available_media_types():
+            with MediaType._lock:
+                MediaType._supported_media_types.add(media_type)
+
+    @staticmethod
+    def reject(media_type: str) -> None:
+        with MediaType._lock:
+            MediaType._rejected_media_types.add(media_type)
+
+    @staticmethod
+    def encode(data: Any, media_type: str) -> bytes:
+        match media_type:
+            case MediaType.MSGPACK:
+                return msgpack.packb(data)
+            case MediaType.JSON:
+                return json.dumps(data).encode("utf-8")
+            case _:
+                raise ValueError(f"Invalid media type: {media_type}")
+
+    @staticmethod
+    def decode(content: bytes, content_type: str | None) -> Any:
+        if MediaType.parse(content_type) == MediaType.MSGPACK:
+            return msgpack.unpackb(content)
+
+        return json.loads(content)
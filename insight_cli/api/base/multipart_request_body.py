@@ -0,0 +1,188 @@
+from typing import Any, Iterator
+import base64, json, secrets, threading
+
+from .media_type import MediaType
+from .request_body import RequestBody
+from insight_cli import config
+
+
+class MultipartRequestBody(RequestBody):
+    """
+    A multipart/form-data request body that carries file chunks as
+    raw bytes instead of base64 text. The first part, "metadata",
+    holds the JSON request body with each file chunk's content
+    replaced by the name of the part holding its bytes.
+
+    Uncompressed bodies are streamed part by part from memoryviews of
+    the chunks, so no copy of the batch is assembled in memory.
+    Bodies are only sent as multipart once the server has listed
+    multipart/form-data in the Accept-Post header of a response, and
+    are sent in the base64 JSON format until then. If the server
+    rejects the multipart media type, every later body falls back to
+    the base64 JSON format.
+    """
+
+    BOUNDARY_LENGTH = 32
+    _MEDIA_TYPE = "multipart/form-data"
+    _lock = threading.Lock()
+    _is_advertised: bool = False
+    _is_rejected: bool = False
+
+    class _Content:
+        def __init__(self, parts: list[bytes | memoryview]):
+            self._parts = parts
+            self._size_bytes = sum(len(part) for part in parts)
+
+        def __iter__(self) -> Iterator[bytes | memoryview]:
+            return iter(self._parts)
+
+        def __len__(self) -> int:
+            return self._size_bytes
+
+    @staticmethod
+    def is_supported() -> bool:
+        with MultipartRequestBody._lock:
+            return (
+                config.INSIGHT_API_MULTIPART_UPLOADS
+                and MultipartRequestBody._is_advertised
+                and not MultipartRequestBody._is_rejected
+            )
+
+    @staticmethod
+    def record_response(accept_post: str | None) -> None:
+        """
+        Records whether the server accepts multipart bodies by the
+        Accept-Post header of a response, if it sent one.
+        """
+        if accept_post is None:
+            return
+
+        with MultipartRequestBody._lock:
+            MultipartRequestBody._is_advertised = MultipartRequestBody._MEDIA_TYPE in {
+                MediaType.parse(media_type) for media_type in accept_post.split(",")
+            }
+
+    @staticmethod
+    def reject() -> None:
+        with MultipartRequestBody._lock:
+            MultipartRequestBody._is_rejected = True
+
+    @staticmethod
+    def _get_part_header(boundary: str, name: str, content_type: str) -> bytes:
+        return (
+            f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="{name}"\r\n'
+            f"Content-Type: {content_type}\r\n\r\n"
+        ).encode("utf-8")
+
+    @staticmethod
+    def _get_closing_delimiter(boundary: str) -> bytes:
+        return f"\r\n--{boundary}--\r\n".encode("utf-8")
+
+    @staticmethod
+    def part_header_size(name: str, content_type: str) -> int:
+        """
+        Returns the size in bytes of the header of a part, which is the
+        same for every boundary.
+        """
+        return len(
+            MultipartRequestBody._get_part_header(
+                "0" * MultipartRequestBody.BOUNDARY_LENGTH, name, content_type
+            )
+        )
+
+    @staticmethod
+    def closing_delimiter_size() -> int:
+        return len(
+            MultipartRequestBody._get_closing_delimiter(
+                "0" * MultipartRequestBody.BOUNDARY_LENGTH
+            )
+        )
+
+    def __init__(self, data: dict, content_encoding: str | None = None):
+        self._data: dict = data
+        self._boundary: str = secrets.token_hex(
+            MultipartRequestBody.BOUNDARY_LENGTH // 2
+        )
+        self._content_encoding: str = (
+            content_encoding or RequestBody.preferred_content_encoding()
+        )
+        self._media_type: str = MediaType.JSON
+
+        metadata = {**data, "files": {}}
+        file_parts = []
+
+        for i, (file_path, chunk) in enumerate(data["files"].items()):
+            part_name = f"file_{i}"
+            metadata["files"][file_path] = {
+                **{key: value for key, value in chunk.items() if key != "content"},
+                "content": part_name,
+            }
+            file_parts.append((part_name, chunk["content"]))
+
+        parts = [
+            MultipartRequestBody._get_part_header(
+                self._boundary, "metadata", "application/json"
+            ),
+            json.dumps(metadata).encode("utf-8"),
+        ]
+
+        for part_name, content in file_parts:
+            parts.append(
+                b"\r\n"
+                + MultipartRequestBody._get_part_header(
+                    self._boundary, part_name, "application/octet-stream"
+                )
+            )
+            parts.append(content)
+
+        parts.append(MultipartRequestBody._get_closing_delimiter(self._boundary))
+
+        self._content: bytes | MultipartRequestBody._Content = (
+            MultipartRequestBody._Content(parts)
+            if self._content_encoding == RequestBody._IDENTITY
+            else RequestBody._compress(b"".join(parts), self._content_encoding)
+        )
+
+    @property
+    def content(self) -> "bytes | MultipartRequestBody._Content":
+        return self._content
+
+    @property
+    def headers(self) -> dict[str, str]:
+        return {
+            **super().headers,
+            "Content-Type": f"multipart/form-data; boundary={self._boundary}",
+        }
+
+    @property
+    def data(self) -> Any:
+        return self._data
+
+    def fallback(
+        self, accept_encoding: str | None = None, accept: str | None = None
+    ) -> RequestBody | None:
+        content_encoding_is_rejected = (
+            accept_encoding is not None
+            and self._content_encoding != RequestBody._IDENTITY
+            and self._content_encoding not in accept_encoding.lower()
+        )
+
+        if content_encoding_is_rejected:
+            RequestBody.reject_content_encoding(self._content_encoding, accept_encoding)
+            return MultipartRequestBody(self._data)
+
+        MultipartRequestBody.reject()
+
+        return RequestBody(
+            {
+                **self._data,
+                "files": {
+                    file_path: {
+                        **chunk,
+                        "content": base64.b64encode(chunk["content"]).decode("utf-8"),
+                    }
+                    for file_path, chunk in self._data["files"].items()
+                },
+            }
+        )
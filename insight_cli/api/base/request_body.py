@@ -0,0 +1,195 @@
+from typing import Any
+import gzip, re, threading
+
+from .media_type import MediaType
+from insight_cli import config
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class RequestBody:
+    """
+    A request body in the preferred media type, compressed with the
+    most preferred content coding that the server accepts. Bodies are
+    only compressed once the server has advertised a coding in the
+    Accept-Encoding header of a response (RFC 7694), since a server
+    that cannot decode a coding need not reply with a 415 response.
+    Servers that do reject a coding with a 415 response are never sent
+    it again.
+    """
+
+    _IDENTITY = "identity"
+    _WILDCARD = "*"
+    _lock = threading.Lock()
+    _accepted_content_encodings: set[str] = set()
+    _rejected_content_encodings: set[str] = set()
+
+    @staticmethod
+    def _available_content_encodings() -> list[str]:
+        if config.INSIGHT_API_REQUEST_COMPRESSION_LEVEL == 0:
+            return []
+
+        return ["zstd", "gzip"] if zstandard is not None else ["gzip"]
+
+    @staticmethod
+    def preferred_content_encoding() -> str:
+        with RequestBody._lock:
+            for content_encoding in RequestBody._available_content_encodings():
+                is_rejected = (
+                    content_encoding in RequestBody._rejected_content_encodings
+                )
+                is_accepted = not RequestBody._accepted_content_encodings.isdisjoint(
+                    {content_encoding, RequestBody._WILDCARD}
+                )
+
+                if is_accepted and not is_rejected:
+                    return content_encoding
+
+        return RequestBody._IDENTITY
+
+    @staticmethod
+    def _parse_accept_encoding(accept_encoding: str) -> set[str]:
+        """
+        Returns the codings listed in an Accept-Encoding header, except
+        those it marks as unacceptable with a quality value of 0.
+        """
+        content_encodings = set()
+
+        for coding in accept_encoding.split(","):
+            content_encoding, _, params = coding.partition(";")
+            content_encoding = content_encoding.strip().lower()
+
+            if content_encoding and not re.search(r"q=0(\.0*)?\s*$", params):
+                content_encodings.add(content_encoding)
+
+        return content_encodings
+
+    @staticmethod
+    def record_response(accept_encoding: str | None) -> None:
+        """
+        Records the content codings that the server advertised in the
+        Accept-Encoding header of a response, if it sent one.
+        """
+        if accept_encoding is None:
+            return
+
+        with RequestBody._lock:
+            RequestBody._accepted_content_encodings = (
+                RequestBody._parse_accept_encoding(accept_encoding)
+            )
+
+    @staticmethod
+    def reject_content_encoding(
+        content_encoding: str, accept_encoding: str | None = None
+    ) -> None:
+        with RequestBody._lock:
+            RequestBody._rejected_content_encodings.add(content_encoding)
+
+            if accept_encoding is not None:
+                RequestBody._accepted_content_encodings = (
+                    RequestBody._parse_accept_encoding(accept_encoding)
+                )
+
+    @staticmethod
+    def _compress(content: bytes, content_encoding: str) -> bytes:
+        level = config.INSIGHT_API_REQUEST_COMPRESSION_LEVEL
+
+        match content_encoding:
+            case "zstd":
+                return zstandard.ZstdCompressor(level=level).compress(content)
+            case "gzip":
+                return gzip.compress(content, compresslevel=level)
+            case "identity":
+                return content
+            case _:
+                raise ValueError(f"Invalid content encoding: {content_encoding}")
+
+    @staticmethod
+    def _decompress(content: bytes, content_encoding: str) -> bytes:
+        match content_encoding:
+            case "zstd":
+                return zstandard.ZstdDecompressor().decompress(content)
+            case "gzip":
+                return gzip.decompress(content)
+            case "identity":
+                return content
+            case _:
+                raise ValueError(f"Invalid content encoding: {content_encoding}")
+
+    def __init__(
+        self,
+        data: Any,
+        content_encoding: str | None = None,
+        media_type: str | None = None,
+    ):
+        self._content_encoding: str = (
+            content_encoding or RequestBody.preferred_content_encoding()
+        )
+        self._media_type: str = media_type or MediaType.preferred_media_type()
+        self._content: bytes = RequestBody._compress(
+            MediaType.encode(data, self._media_type), self._content_encoding
+        )
+
+    @property
+    def content(self) -> bytes:
+        return self._content
+
+    @property
+    def content_encoding(self) -> str:
+        return self._content_encoding
+
+    @property
+    def media_type(self) -> str:
+        return self._media_type
+
+    @property
+    def headers(self) -> dict[str, str]:
+        headers = {"Content-Type": self._media_type}
+
+        if self._content_encoding != RequestBody._IDENTITY:
+            headers["Content-Encoding"] = self._content_encoding
+
+        return headers
+
+    @property
+    def data(self) -> Any:
+        return MediaType.decode(
+            RequestBody._decompress(self._content, self._content_encoding),
+            self._media_type,
+        )
+
+    def fallback(
+        self, accept_encoding: str | None = None, accept: str | None = None
+    ) -> "RequestBody | None":
+        """
+        Returns the body to resend after the server rejected this one
+        with a 415 response, or None if there is nothing to fall back
+        to. [accept_encoding] and [accept] are the response's
+        Accept-Encoding and Accept headers. A body that is not JSON is
+        resent as JSON first, unless the server accepts its media type.
+        """
+        media_type_is_accepted = accept is not None and self._media_type in {
+            MediaType.parse(media_type) for media_type in accept.split(",")
+        }
+
+        if self._media_type != MediaType.JSON and not media_type_is_accepted:
+            MediaType.reject(self._media_type)
+            return RequestBody(self.data, self._content_encoding, MediaType.JSON)
+
+        content_encoding_is_accepted = (
+            accept_encoding is not None
+            and self._content_encoding in accept_encoding.lower()
+        )
+
+        if (
+            self._content_encoding == RequestBody._IDENTITY
+            or content_encoding_is_accepted
+        ):
+            return None
+
+        RequestBody.reject_content_encoding(self._content_encoding, accept_encoding)
+
+        return RequestBody(self.data, media_type=self._media_type)
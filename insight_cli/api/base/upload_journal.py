@@ -0,0 +1,114 @@
+from pathlib import Path
+from typing import Any, TypedDict
+import hashlib, json, os, threading
+
+
+class UploadSession(TypedDict):
+    fingerprint: str
+    session_id: str
+    missing_content_hashes: list[str] | None
+    acknowledged_batch_indexes: list[int]
+    repository_id: str | None
+
+
+class UploadJournal:
+    """
+    Journals the state of an initialize or reinitialize upload so that
+    an interrupted or partially failed upload can be resumed. Batch
+    composition is a deterministic function of the uploaded content,
+    so a rerun whose fingerprint matches the journaled session reuses
+    its session id and only sends the batches the server has not yet
+    acknowledged. A journal without a parent directory is kept in
+    memory only.
+    """
+
+    _FILE_NAME = "upload_journal.json"
+
+    @staticmethod
+    def fingerprint(endpoint: str, data: Any) -> str:
+        return hashlib.sha256(
+            json.dumps([endpoint, data], sort_keys=True).encode("utf-8")
+        ).hexdigest()
+
+    def __init__(self, parent_dir_path: Path | None = None):
+        self._path: Path | None = (
+            parent_dir_path / UploadJournal._FILE_NAME
+            if parent_dir_path is not None
+            else None
+        )
+        self._lock = threading.Lock()
+        self._session: UploadSession | None = None
+
+    def _read_from_file(self) -> UploadSession | None:
+        if self._path is None or not self._path.is_file():
+            return None
+
+        try:
+            with open(self._path, "r") as file:
+                return json.load(file)
+        except json.JSONDecodeError:
+            return None
+
+    def _write_to_file(self) -> None:
+        if self._path is None:
+            return
+
+        os.makedirs(self._path.parent, exist_ok=True)
+        temp_path = self._path.with_suffix(".tmp")
+
+        with open(temp_path, "w") as file:
+            file.write(json.dumps(self._session))
+
+        os.replace(temp_path, self._path)
+
+    def resume(self, fingerprint: str) -> UploadSession | None:
+        """
+        Returns the journaled session if it has the same fingerprint.
+        """
+        with self._lock:
+            session = self._read_from_file() or self._session
+
+            if session is None or session.get("fingerprint") != fingerprint:
+                return None
+
+            self._session = session
+
+            return session
+
+    def start(
+        self,
+        fingerprint: str,
+        session_id: str,
+        missing_content_hashes: list[str] | None,
+    ) -> UploadSession:
+        """
+        Journals a new session, replacing any previous one.
+        [missing_content_hashes] is None if every file must be uploaded.
+        """
+        with self._lock:
+            self._session = {
+                "fingerprint": fingerprint,
+                "session_id": session_id,
+                "missing_content_hashes": missing_content_hashes,
+                "acknowledged_batch_indexes": [],
+                "repository_id": None,
+            }
+            self._write_to_file()
+
+            return self._session
+
+    def acknowledge(self, batch_index: int, repository_id: str | None = None) -> None:
+        with self._lock:
+            self._session["acknowledged_batch_indexes"].append(batch_index)
+
+            if repository_id is not None:
+                self._session["repository_id"] = repository_id
+
+            self._write_to_file()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._session = None
+
+            if self._path is not None and self._path.is_file():
+                os.remove(self._path)
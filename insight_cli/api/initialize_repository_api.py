@@ -1,18 +1,26 @@
-from concurrent.futures import ThreadPoolExecutor
-import copy, requests, secrets
-
-from insight_cli.utils import FileChunkifier, ChunkedFileEncoder
-from .base.api import API
+from typing import Iterable
+import asyncio, hashlib, os, secrets, threading
+
+from .base import (
+    API,
+    BatchBuilder,
+    BatchLoader,
+    BatchUploader,
+    ChunkIndex,
+    RequestBody,
+    UploadJournal,
+)
 from insight_cli import config
 
 
 class InitializeRepositoryAPI(API):
     @staticmethod
-    def _add_metadata_to_batches(batched_repository_files: list[dict]) -> list[dict]:
-        session_id = secrets.token_hex()
+    def _add_metadata_to_batches(
+        batched_repository_files: list[dict], session_id: str | None = None
+    ) -> list[dict]:
+        session_id = session_id or secrets.token_hex()
 
         for i, batch in enumerate(batched_repository_files):
-            del batch["size_bytes"]
             batch.update(
                 {
                     "batch_index": i,
@@ -25,49 +33,109 @@ class InitializeRepositoryAPI(API):
 
     @staticmethod
     def _batch_repository_files(
-        repository_files: dict[str, bytes], max_batch_size_bytes: int = 10 * 1024**2
+        repository_file_sizes: dict[str, int], max_batch_size_bytes: int | None = None
     ) -> list[dict]:
-        batched_repository_files = []
-        empty_batch = {"files": {}, "size_bytes": 0}
-        current_batch = copy.deepcopy(empty_batch)
-
-        for file_path, file_content in repository_files.items():
-            file_content_chunks = FileChunkifier.chunkify_file_content(
-                file_content,
-                max_batch_size_bytes,
-                max_batch_size_bytes - current_batch["size_bytes"],
-            )
+        batch_builder = BatchBuilder(
+            max_batch_size_bytes or config.INSIGHT_API_MAX_BATCH_SIZE_BYTES,
+            InitializeRepositoryAPI._get_request_body(
+                {
+                    "files": {},
+                    "batch_index": BatchBuilder.MAX_NUM_BATCHES,
+                    "num_total_batches": BatchBuilder.MAX_NUM_BATCHES,
+                }
+            ),
+        )
 
-            encoded_file_content_chunks_with_metadata = (
-                ChunkedFileEncoder.encode_with_metadata(file_content_chunks)
-            )
+        for file_path, file_size_bytes in repository_file_sizes.items():
+            batch_builder.add_file(file_path, file_size_bytes)
 
-            for file_content_chunk in encoded_file_content_chunks_with_metadata:
-                if (
-                    current_batch["size_bytes"] + file_content_chunk["size_bytes"]
-                    > max_batch_size_bytes
-                ):
-                    batched_repository_files.append(current_batch)
-                    current_batch = copy.deepcopy(empty_batch)
+        return batch_builder.build()
+
+    @staticmethod
+    async def _make_manifest_request(
+        session_id: str, content_hashes: dict[str, str]
+    ) -> dict | None:
+        response = await API._send(
+            "POST",
+            f"{config.INSIGHT_API_BASE_URL}/initialize_repository_manifest",
+            RequestBody({"files": content_hashes}),
+            cookies={"session_id": session_id},
+        )
 
-                current_batch["files"][file_path] = file_content_chunk
-                current_batch["size_bytes"] += file_content_chunk["size_bytes"]
+        if response.status_code in API._UNSUPPORTED_ENDPOINT_STATUS_CODES:
+            return None
 
-        if current_batch != empty_batch:
-            batched_repository_files.append(current_batch)
+        response.raise_for_status()
 
-        return batched_repository_files
+        return response.json()
 
     @staticmethod
-    def _make_batch_request(payload: dict) -> dict[str, str]:
-        response = requests.post(
-            url=f"{config.INSIGHT_API_BASE_URL}/initialize_repository",
-            cookies={"session_id": payload["session_id"]},
-            json={
-                "files": payload["files"],
-                "batch_index": payload["batch_index"],
-                "num_total_batches": payload["num_total_batches"],
+    def _deduplicate_batch(
+        batch: dict, session_id: str, manifest_is_unsupported: threading.Event
+    ) -> dict:
+        """
+        Sends the content hashes of the whole files in a read [batch] as
+        a slice of the session's manifest, and drops the files whose
+        content the server already has. Files split across batches are
+        always uploaded.
+        """
+        content_hashes = {
+            file_path: hashlib.sha256(chunk["content"]).hexdigest()
+            for file_path, chunk in batch["files"].items()
+            if chunk["num_total_chunks"] == 1
+        }
+
+        if not content_hashes or manifest_is_unsupported.is_set():
+            return batch
+
+        manifest_response = API._run(
+            InitializeRepositoryAPI._make_manifest_request(session_id, content_hashes)
+        )
+
+        if manifest_response is None:
+            manifest_is_unsupported.set()
+            return batch
+
+        missing_content_hashes = set(manifest_response["missing_content_hashes"])
+
+        return {
+            **batch,
+            "files": {
+                file_path: chunk
+                for file_path, chunk in batch["files"].items()
+                if file_path not in content_hashes
+                or content_hashes[file_path] in missing_content_hashes
             },
+        }
+
+    @staticmethod
+    def _get_file_stats(file_paths: Iterable[str]) -> dict[str, list[int] | None]:
+        file_stats = {}
+
+        for file_path in file_paths:
+            try:
+                stats = os.stat(file_path)
+                file_stats[file_path] = [stats.st_size, stats.st_mtime_ns]
+            except OSError:
+                file_stats[file_path] = None
+
+        return file_stats
+
+    @staticmethod
+    def _get_request_body(batch: dict) -> dict:
+        return {
+            "files": batch["files"],
+            "batch_index": batch["batch_index"],
+            "num_total_batches": batch["num_total_batches"],
+        }
+
+    @staticmethod
+    async def _make_batch_request(payload: dict) -> dict[str, str]:
+        response = await API._send(
+            "POST",
+            f"{config.INSIGHT_API_BASE_URL}/initialize_repository",
+            payload["body"],
+            cookies={"session_id": payload["session_id"]},
         )
 
         response.raise_for_status()
@@ -75,10 +143,77 @@ class InitializeRepositoryAPI(API):
         return response.json()
 
     @classmethod
-    def make_request(cls, repository_files: dict[str, bytes]) -> dict[str, str]:
-        repository_files_batches = cls._batch_repository_files(repository_files)
-        request_batches = cls._add_metadata_to_batches(repository_files_batches)
+    async def make_request_async(
+        cls,
+        repository_file_sizes: dict[str, int],
+        upload_journal: UploadJournal | None = None,
+        chunk_index: ChunkIndex | None = None,
+    ) -> dict[str, str]:
+        """
+        As each batch is read, the content hashes of its files are sent
+        to the server as a slice of the upload's manifest, so that only
+        content the server has not already indexed is uploaded, without
+        hashing the whole repository before the first batch. Servers
+        without a manifest endpoint receive every file, as before.
+        Batches acknowledged in a previous, interrupted run of the same
+        upload are not sent again. [chunk_index] is cleared rather than
+        filled: chunking every file would take longer than uploading it,
+        so a file is only chunked once it is uploaded again by
+        reinitialize, and synced by delta after that.
+        """
+        upload_journal = upload_journal or UploadJournal()
+        chunk_index = chunk_index or ChunkIndex()
+        file_stats = await asyncio.to_thread(cls._get_file_stats, repository_file_sizes)
+        fingerprint = UploadJournal.fingerprint("initialize_repository", file_stats)
+        session = upload_journal.resume(fingerprint) or upload_journal.start(
+            fingerprint, secrets.token_hex(), None
+        )
+        manifest_is_unsupported = threading.Event()
+
+        # planning the batches of a large repository takes long enough
+        # to stall every other request on the event loop
+        repository_files_batches = await asyncio.to_thread(
+            cls._batch_repository_files, repository_file_sizes
+        ) or [{"files": {}}]
+        request_batches = cls._add_metadata_to_batches(
+            repository_files_batches, session["session_id"]
+        )
+        acknowledged_batch_indexes = set(session["acknowledged_batch_indexes"])
+
+        results = await BatchUploader(
+            cls._make_batch_request,
+            on_batch_uploaded=lambda batch, result: upload_journal.acknowledge(
+                batch["batch_index"], result["repository_id"]
+            ),
+        ).upload(
+            BatchLoader.load(
+                [
+                    batch
+                    for batch in request_batches
+                    if batch["batch_index"] not in acknowledged_batch_indexes
+                ],
+                cls._get_request_body,
+                lambda batch: cls._deduplicate_batch(
+                    batch, session["session_id"], manifest_is_unsupported
+                ),
+            )
+        )
 
-        with ThreadPoolExecutor(max_workers=len(request_batches)) as executor:
-            results = executor.map(cls._make_batch_request, request_batches)
-            return {"repository_id": result["repository_id"] for result in results}
+        repository_id = (
+            results[-1]["repository_id"] if results else session["repository_id"]
+        )
+        upload_journal.clear()
+        chunk_index.clear()
+
+        return {"repository_id": repository_id}
+
+    @classmethod
+    def make_request(
+        cls,
+        repository_file_sizes: dict[str, int],
+        upload_journal: UploadJournal | None = None,
+        chunk_index: ChunkIndex | None = None,
+    ) -> dict[str, str]:
+        return API._run(
+            cls.make_request_async(repository_file_sizes, upload_journal, chunk_index)
+        )
@@ -1,20 +1,375 @@
-import requests
+from http import HTTPStatus
+from typing import AsyncIterator, Callable, Iterable, Iterator, TypedDict
+import asyncio, contextlib, json, requests, time
 
 from .base.api import API
+from .base.async_session import StreamingResponse
+from .base.latency_history import LatencyHistory
+from .base.media_type import MediaType
 from insight_cli import config
 
 
+class QueryResult(TypedDict):
+    index: int
+    query_string: str
+    matches: list[dict] | None
+    error: str | None
+    latency_seconds: float
+
+
 class QueryRepositoryAPI(API):
+    _ENDPOINT = "query_repository"
+    _NDJSON_MEDIA_TYPE = "application/x-ndjson"
+    _NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+    @staticmethod
+    def _get_request_data(
+        repository_id: str,
+        query_string: str,
+        revision: int | None,
+        limit: int | None = None,
+        cursor: str | None = None,
+        scope: dict | None = None,
+    ) -> dict:
+        """
+        The repository revision lets the server tell whether a repeated
+        query is against unchanged content. [limit] and [cursor] ask for
+        a single page of the matches, starting where a previous page
+        ended. [scope] restricts the query to the files that match its
+        path and glob predicate, which the server evaluates.
+        """
+        request_data = {
+            "repository_id": repository_id,
+            "query_string": query_string,
+        }
+
+        if revision is not None:
+            request_data["revision"] = revision
+
+        if limit is not None:
+            request_data["limit"] = limit
+
+        if cursor is not None:
+            request_data["cursor"] = cursor
+
+        if scope is not None:
+            request_data["scope"] = scope
+
+        return request_data
+
     @staticmethod
-    def make_request(repository_id: str, query_string: str) -> list[dict]:
-        response = requests.get(
-            url=f"{config.INSIGHT_API_BASE_URL}/query_repository",
-            json={
-                "repository_id": repository_id,
-                "query_string": query_string,
-            },
+    async def make_request_async(
+        repository_id: str, query_string: str, revision: int | None = None
+    ) -> list[dict]:
+        response = await API.session().request(
+            "GET",
+            f"{config.INSIGHT_API_BASE_URL}/{QueryRepositoryAPI._ENDPOINT}",
+            json=QueryRepositoryAPI._get_request_data(
+                repository_id, query_string, revision
+            ),
         )
 
         response.raise_for_status()
 
         return response.json()
+
+    @staticmethod
+    def make_request(
+        repository_id: str, query_string: str, revision: int | None = None
+    ) -> list[dict]:
+        return API._run(
+            QueryRepositoryAPI.make_request_async(repository_id, query_string, revision)
+        )
+
+    @staticmethod
+    async def stream_request_async(
+        repository_id: str,
+        query_string: str,
+        latency_history: LatencyHistory | None = None,
+        revision: int | None = None,
+        etag: str | None = None,
+        on_response: Callable[[StreamingResponse], None] | None = None,
+        limit: int | None = None,
+        cursor: str | None = None,
+        scope: dict | None = None,
+    ) -> AsyncIterator[dict]:
+        """
+        Yields matches as they arrive from servers that stream them as
+        newline-delimited JSON, and all at once from servers that
+        respond with a single JSON array. If [latency_history] is
+        given, the request is hedged until a response starts to arrive.
+        If [etag] is given, the server may respond with 304 Not Modified
+        instead of sending the matches again, in which case nothing is
+        yielded. [on_response] is called with the response, before any
+        match is yielded, so that callers can read its status code and
+        ETag.
+        """
+        headers = {
+            "Accept": MediaType.accept_header(QueryRepositoryAPI._NDJSON_MEDIA_TYPE)
+        }
+
+        if etag is not None:
+            headers["If-None-Match"] = etag
+
+        async def open_stream() -> tuple[contextlib.AsyncExitStack, StreamingResponse]:
+            exit_stack = contextlib.AsyncExitStack()
+            response = await exit_stack.enter_async_context(
+                API.session().stream(
+                    "GET",
+                    f"{config.INSIGHT_API_BASE_URL}/{QueryRepositoryAPI._ENDPOINT}",
+                    headers=headers,
+                    json=QueryRepositoryAPI._get_request_data(
+                        repository_id,
+                        query_string,
+                        revision,
+                        limit,
+                        cursor,
+                        scope,
+                    ),
+                )
+            )
+
+            return exit_stack, response
+
+        exit_stack, response = await API._hedge(
+            open_stream,
+            QueryRepositoryAPI._ENDPOINT,
+            latency_history,
+            discard=lambda opened_stream: opened_stream[0].aclose(),
+        )
+
+        async with exit_stack:
+            response.raise_for_status()
+
+            if on_response is not None:
+                on_response(response)
+
+            if response.status_code == HTTPStatus.NOT_MODIFIED:
+                return
+
+            if not response.headers.get("Content-Type", "").startswith(
+                QueryRepositoryAPI._NDJSON_MEDIA_TYPE
+            ):
+                for match in MediaType.decode(
+                    await response.read(), response.headers.get("Content-Type")
+                ):
+                    yield match
+
+                return
+
+            async for line in response.iter_lines():
+                yield json.loads(line)
+
+    @staticmethod
+    def stream_request(
+        repository_id: str,
+        query_string: str,
+        latency_history: LatencyHistory | None = None,
+        revision: int | None = None,
+        etag: str | None = None,
+        on_response: Callable[[StreamingResponse], None] | None = None,
+        scope: dict | None = None,
+    ) -> Iterator[dict]:
+        return API._iterate(
+            QueryRepositoryAPI.stream_request_async(
+                repository_id,
+                query_string,
+                latency_history,
+                revision,
+                etag,
+                on_response,
+                scope=scope,
+            )
+        )
+
+    @staticmethod
+    async def _get_page(
+        repository_id: str,
+        query_string: str,
+        limit: int,
+        cursor: str | None,
+        latency_history: LatencyHistory | None,
+        revision: int | None,
+        scope: dict | None,
+    ) -> tuple[list[dict], str | None]:
+        next_cursor = None
+
+        def on_response(response: StreamingResponse) -> None:
+            nonlocal next_cursor
+            next_cursor = response.headers.get(QueryRepositoryAPI._NEXT_CURSOR_HEADER)
+
+        matches = [
+            match
+            async for match in QueryRepositoryAPI.stream_request_async(
+                repository_id,
+                query_string,
+                latency_history,
+                revision,
+                on_response=on_response,
+                limit=limit,
+                cursor=cursor,
+                scope=scope,
+            )
+        ]
+
+        # servers that ignore the limit send every match in one page
+        return matches[:limit], next_cursor if len(matches) <= limit else None
+
+    @staticmethod
+    async def stream_top_matches_async(
+        repository_id: str,
+        query_string: str,
+        limit: int,
+        latency_history: LatencyHistory | None = None,
+        revision: int | None = None,
+        scope: dict | None = None,
+    ) -> AsyncIterator[dict]:
+        """
+        Yields the top [limit] matches, requesting them a page of at
+        most INSIGHT_QUERY_PAGE_SIZE matches at a time. The next page
+        is requested as soon as the current one has arrived, so that it
+        is on its way while the current one is consumed, and no page is
+        requested once [limit] matches have been yielded.
+        """
+        if limit < 1:
+            raise ValueError(f"{limit} must be a positive number of matches")
+
+        def get_page(num_matches: int, cursor: str | None) -> asyncio.Task:
+            return asyncio.create_task(
+                QueryRepositoryAPI._get_page(
+                    repository_id,
+                    query_string,
+                    min(limit - num_matches, config.INSIGHT_QUERY_PAGE_SIZE),
+                    cursor,
+                    latency_history,
+                    revision,
+                    scope,
+                )
+            )
+
+        num_matches = 0
+        page_task = get_page(num_matches, None)
+
+        try:
+            while page_task is not None:
+                matches, next_cursor = await page_task
+                num_matches += len(matches)
+                page_task = (
+                    get_page(num_matches, next_cursor)
+                    if matches and next_cursor is not None and num_matches < limit
+                    else None
+                )
+
+                for match in matches:
+                    yield match
+
+        finally:
+            if page_task is not None:
+                page_task.cancel()
+                await asyncio.gather(page_task, return_exceptions=True)
+
+    @staticmethod
+    def stream_top_matches(
+        repository_id: str,
+        query_string: str,
+        limit: int,
+        latency_history: LatencyHistory | None = None,
+        revision: int | None = None,
+        scope: dict | None = None,
+    ) -> Iterator[dict]:
+        return API._iterate(
+            QueryRepositoryAPI.stream_top_matches_async(
+                repository_id,
+                query_string,
+                limit,
+                latency_history,
+                revision,
+                scope,
+            )
+        )
+
+    @staticmethod
+    async def _make_timed_request(
+        repository_id: str, index: int, query_string: str, revision: int | None
+    ) -> QueryResult:
+        started_at = time.perf_counter()
+
+        try:
+            matches = await QueryRepositoryAPI.make_request_async(
+                repository_id, query_string, revision
+            )
+            error = None
+
+        except requests.RequestException as e:
+            matches, error = None, str(e)
+
+        return {
+            "index": index,
+            "query_string": query_string,
+            "matches": matches,
+            "error": error,
+            "latency_seconds": time.perf_counter() - started_at,
+        }
+
+    @staticmethod
+    async def make_requests_async(
+        repository_id: str,
+        queries: Iterable[tuple[int, str]],
+        max_concurrent_requests: int | None = None,
+        revision: int | None = None,
+    ) -> AsyncIterator[QueryResult]:
+        """
+        Runs the (index, query string) pairs of [queries] concurrently
+        over the shared session, at most [max_concurrent_requests] at a
+        time, and yields each result as soon as it completes. A failed
+        query is yielded with its error instead of raising, so that one
+        failure does not discard the rest of the results.
+        """
+        max_concurrent_requests = (
+            max_concurrent_requests or config.INSIGHT_QUERY_BATCH_MAX_CONCURRENT_QUERIES
+        )
+        queries = iter(queries)
+        pending_tasks = set()
+
+        try:
+            while True:
+                while len(pending_tasks) < max_concurrent_requests:
+                    query = next(queries, None)
+
+                    if query is None:
+                        break
+
+                    pending_tasks.add(
+                        asyncio.create_task(
+                            QueryRepositoryAPI._make_timed_request(
+                                repository_id, *query, revision
+                            )
+                        )
+                    )
+
+                if not pending_tasks:
+                    return
+
+                done_tasks, pending_tasks = await asyncio.wait(
+                    pending_tasks, return_when=asyncio.FIRST_COMPLETED
+                )
+
+                for task in done_tasks:
+                    yield task.result()
+
+        finally:
+            for task in pending_tasks:
+                task.cancel()
+
+    @staticmethod
+    def make_requests(
+        repository_id: str,
+        queries: Iterable[tuple[int, str]],
+        max_concurrent_requests: int | None = None,
+        revision: int | None = None,
+    ) -> Iterator[QueryResult]:
+        return API._iterate(
+            QueryRepositoryAPI.make_requests_async(
+                repository_id, queries, max_concurrent_requests, revision
+            )
+        )
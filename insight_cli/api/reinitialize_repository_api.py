@@ -1,23 +1,45 @@
-from concurrent.futures import ThreadPoolExecutor
-import copy, requests
+from pathlib import Path
+import asyncio, base64, requests, secrets
 
-from insight_cli.utils import FileChunkifier, ChunkedFileEncoder
-from .base.api import API
+from .base import (
+    API,
+    BatchBuilder,
+    BatchLoader,
+    BatchUploader,
+    ChunkIndex,
+    FileRecipe,
+    RequestBody,
+    UploadJournal,
+    UploadSession,
+)
 from insight_cli import config
+from insight_cli.utils import File
+
+
+class IncompleteUploadError(Exception):
+    def __init__(self, acknowledged_file_paths: set[str]):
+        super().__init__(
+            f"upload failed after {len(acknowledged_file_paths)} changed files were acknowledged"
+        )
+        self.acknowledged_file_paths = acknowledged_file_paths
 
 
 class ReinitializeRepositoryAPI(API):
+    _DELTA_REJECTED_STATUS_CODES = {409, 412, 413, 422}
+
     @staticmethod
     def _add_metadata_to_batches(
-        batched_repository_file_changes: list[dict], repository_id: str
+        batched_repository_file_changes: list[dict],
+        repository_id: str,
+        session_id: str | None = None,
     ) -> list[dict]:
         for i, batch in enumerate(batched_repository_file_changes):
-            del batch["size_bytes"]
             batch.update(
                 {
                     "batch_index": i,
                     "num_total_batches": len(batched_repository_file_changes),
                     "repository_id": repository_id,
+                    "session_id": session_id,
                 }
             )
 
@@ -25,76 +47,465 @@ class ReinitializeRepositoryAPI(API):
 
     @staticmethod
     def _batch_repository_file_changes(
-        repository_file_changes: dict[str, list[tuple[str, bytes]]],
-        max_batch_size_bytes: int = 10 * 1024**2,
+        repository_id: str,
+        repository_file_changes: dict[str, list[tuple[str, int]]],
+        known_file_changes: dict[str, str] | None = None,
+        max_batch_size_bytes: int | None = None,
     ) -> list[dict]:
-        batched_repository_file_changes = []
-        empty_batch = {"files": {}, "changes": {}, "size_bytes": 0}
-        current_batch = copy.deepcopy(empty_batch)
+        """
+        Deleted files and [known_file_changes], files whose content the
+        server already has, are sent as changes without content.
+        """
+        batch_builder = BatchBuilder(
+            max_batch_size_bytes or config.INSIGHT_API_MAX_BATCH_SIZE_BYTES,
+            ReinitializeRepositoryAPI._get_request_body(
+                {
+                    "repository_id": repository_id,
+                    "files": {},
+                    "changes": {},
+                    "batch_index": BatchBuilder.MAX_NUM_BATCHES,
+                    "num_total_batches": BatchBuilder.MAX_NUM_BATCHES,
+                }
+            ),
+            includes_changes=True,
+        )
 
         for change, files in repository_file_changes.items():
-            for file_path, file_content in files:
+            for file_path, file_size_bytes in files:
                 if change == "delete":
-                    current_batch["changes"][file_path] = change
-                    continue
+                    batch_builder.add_change(file_path, change)
+                else:
+                    batch_builder.add_file(file_path, file_size_bytes, change)
 
-                file_content_chunks = FileChunkifier.chunkify_file_content(
-                    file_content,
-                    max_batch_size_bytes,
-                    max_batch_size_bytes - current_batch["size_bytes"],
-                )
+        for file_path, change in (known_file_changes or {}).items():
+            batch_builder.add_change(file_path, change)
+
+        return batch_builder.build()
+
+    @staticmethod
+    def _get_acknowledged_file_paths(
+        request_batches: list[dict], acknowledged_batch_indexes: set[int]
+    ) -> set[str]:
+        """
+        A changed file is acknowledged once every batch carrying one of
+        its chunks (or its deletion) has been acknowledged.
+        """
+        file_paths, unacknowledged_file_paths = set(), set()
+
+        for batch in request_batches:
+            file_paths.update(batch["changes"])
+
+            if batch["batch_index"] not in acknowledged_batch_indexes:
+                unacknowledged_file_paths.update(batch["changes"])
+
+        return file_paths - unacknowledged_file_paths
+
+    @staticmethod
+    def _get_file_delta(
+        previous_recipe: FileRecipe, content: bytes, recipe: FileRecipe | None = None
+    ) -> tuple[dict, FileRecipe] | None:
+        """
+        Returns the delta from the last uploaded version of a file,
+        described by [previous_recipe], to [content], together with the
+        recipe of [content]. Chunks of [content] that are in the last
+        uploaded version are copied from it by byte range and all other
+        chunks are inserted. Returns None if most of [content] would be
+        inserted, in which case the file is cheaper to upload in full.
+        [recipe] is the recipe of [content], if it is already known.
+        """
+        recipe = recipe or ChunkIndex.get_recipe(content)
+        previous_chunk_ranges, offset = {}, 0
+
+        for chunk_hash, chunk_size_bytes in previous_recipe["chunks"]:
+            previous_chunk_ranges.setdefault(
+                chunk_hash, (offset, offset + chunk_size_bytes)
+            )
+            offset += chunk_size_bytes
+
+        instructions, num_inserted_bytes, offset = [], 0, 0
+
+        for chunk_hash, chunk_size_bytes in recipe["chunks"]:
+            start, end = offset, offset + chunk_size_bytes
+            offset = end
+            previous_chunk_range = previous_chunk_ranges.get(chunk_hash)
+
+            if previous_chunk_range is None:
+                num_inserted_bytes += chunk_size_bytes
+
+                if instructions and instructions[-1][0] == "insert":
+                    instructions[-1][2] = end
+                else:
+                    instructions.append(["insert", start, end])
+
+            elif (
+                instructions
+                and instructions[-1][0] == "copy"
+                and instructions[-1][2] == previous_chunk_range[0]
+            ):
+                instructions[-1][2] = previous_chunk_range[1]
+
+            else:
+                instructions.append(["copy", *previous_chunk_range])
+
+        if 2 * num_inserted_bytes > len(content):
+            return None
 
-                encoded_file_content_chunks_with_metadata = (
-                    ChunkedFileEncoder.encode_with_metadata(file_content_chunks)
+        for instruction in instructions:
+            if instruction[0] == "insert":
+                start, end = instruction[1:]
+                instruction[1:] = [base64.b64encode(content[start:end]).decode("utf-8")]
+
+        return {
+            "base_content_hash": previous_recipe["content_hash"],
+            "content_hash": recipe["content_hash"],
+            "instructions": instructions,
+        }, recipe
+
+    @staticmethod
+    def _get_file_deltas(
+        file_paths: list[str], chunk_index: ChunkIndex
+    ) -> tuple[dict[str, tuple[dict, FileRecipe]], dict[str, FileRecipe]]:
+        """
+        Also returns the recipe of every file that was chunked, so that
+        files uploaded in full after all are not chunked again.
+        """
+        file_deltas, recipes = {}, {}
+
+        for file_path in file_paths:
+            previous_recipe = chunk_index.get(file_path)
+            file = File(Path(file_path))
+            file_size_bytes = file.size
+
+            if previous_recipe is None or not ChunkIndex.is_synced_by_delta(
+                file_size_bytes
+            ):
+                continue
+
+            content = file.read(0, file_size_bytes)
+            recipes[file_path] = ChunkIndex.get_recipe(content)
+            file_delta = ReinitializeRepositoryAPI._get_file_delta(
+                previous_recipe, content, recipes[file_path]
+            )
+
+            if file_delta is not None:
+                file_deltas[file_path] = file_delta
+
+        return file_deltas, recipes
+
+    @staticmethod
+    def _batch_file_deltas(file_deltas: dict[str, dict]) -> list[dict[str, dict]]:
+        batches, batch_size_bytes = [], 0
+
+        for file_path, file_delta in sorted(file_deltas.items()):
+            file_delta_size_bytes = len(file_path) + sum(
+                len(instruction[1]) if instruction[0] == "insert" else 0
+                for instruction in file_delta["instructions"]
+            )
+
+            if (
+                not batches
+                or batch_size_bytes + file_delta_size_bytes
+                > config.INSIGHT_API_MAX_BATCH_SIZE_BYTES
+            ):
+                batches.append({})
+                batch_size_bytes = 0
+
+            batches[-1][file_path] = file_delta
+            batch_size_bytes += file_delta_size_bytes
+
+        return batches
+
+    @staticmethod
+    async def _make_delta_request(payload: dict) -> set[str]:
+        """
+        Returns the file paths whose delta the server did not apply,
+        either because its copy of the file is not the version the
+        delta is based on or because it does not support deltas.
+        """
+        response = await API._send(
+            "PUT",
+            f"{config.INSIGHT_API_BASE_URL}/reinitialize_repository_delta",
+            payload["body"],
+        )
+
+        if response.status_code in API._UNSUPPORTED_ENDPOINT_STATUS_CODES:
+            return set(payload["file_paths"])
+
+        response.raise_for_status()
+
+        return set(response.json()["conflicting_file_paths"])
+
+    @classmethod
+    async def _sync_file_deltas(
+        cls,
+        repository_id: str,
+        file_paths: list[str],
+        chunk_index: ChunkIndex,
+    ) -> tuple[set[str], dict[str, FileRecipe]]:
+        """
+        Uploads updated files that were last uploaded in full or by
+        delta as deltas, and returns the file paths whose delta was
+        applied, together with the recipes of the files that were
+        chunked. The rest are left to be uploaded in full, including
+        when the server rejects a delta request. Any other failure,
+        including reaching the command deadline, fails the upload with
+        the file paths whose delta was applied.
+        """
+        file_deltas, recipes = await asyncio.to_thread(
+            cls._get_file_deltas, file_paths, chunk_index
+        )
+        delta_file_paths = set()
+
+        if not file_deltas:
+            return delta_file_paths, recipes
+
+        def on_batch_uploaded(batch: dict, conflicting_file_paths: set[str]) -> None:
+            applied_file_paths = set(batch["file_paths"]) - conflicting_file_paths
+            chunk_index.update(
+                {
+                    file_path: file_deltas[file_path][1]
+                    for file_path in applied_file_paths
+                }
+            )
+            delta_file_paths.update(applied_file_paths)
+
+        try:
+            await BatchUploader(
+                cls._make_delta_request, on_batch_uploaded=on_batch_uploaded
+            ).upload(
+                {
+                    "file_paths": list(batch),
+                    "body": RequestBody(
+                        {"repository_id": repository_id, "files": batch}
+                    ),
+                }
+                for batch in cls._batch_file_deltas(
+                    {
+                        file_path: file_delta
+                        for file_path, (file_delta, _) in file_deltas.items()
+                    }
                 )
+            )
 
-                for file_content_chunk in encoded_file_content_chunks_with_metadata:
-                    if (
-                        current_batch["size_bytes"] + file_content_chunk["size_bytes"]
-                        > max_batch_size_bytes
-                    ):
-                        batched_repository_file_changes.append(current_batch)
-                        current_batch = copy.deepcopy(empty_batch)
+        except requests.HTTPError as e:
+            status_code = e.response.status_code if e.response is not None else None
 
-                    current_batch["files"][file_path] = file_content_chunk
-                    current_batch["changes"][file_path] = change
-                    current_batch["size_bytes"] += file_content_chunk["size_bytes"]
+            if status_code not in cls._DELTA_REJECTED_STATUS_CODES:
+                raise IncompleteUploadError(delta_file_paths) from e
 
-        if current_batch != empty_batch:
-            batched_repository_file_changes.append(current_batch)
+        except Exception as e:
+            raise IncompleteUploadError(delta_file_paths) from e
 
-        return batched_repository_file_changes
+        return delta_file_paths, recipes
 
     @staticmethod
-    def _make_batch_request(
-        payload: dict[str, dict[str, bytes] | dict[str, str] | str]
-    ) -> None:
-        response = requests.put(
-            url=f"{config.INSIGHT_API_BASE_URL}/reinitialize_repository",
-            json={
-                "repository_id": payload["repository_id"],
-                "files": payload["files"],
-                "changes": payload["changes"],
-                "batch_index": payload["batch_index"],
-                "num_total_batches": payload["num_total_batches"],
-            },
+    async def _make_manifest_request(
+        repository_id: str, content_hashes: dict[str, str]
+    ) -> dict | None:
+        response = await API._send(
+            "PUT",
+            f"{config.INSIGHT_API_BASE_URL}/reinitialize_repository_manifest",
+            RequestBody({"repository_id": repository_id, "files": content_hashes}),
+        )
+
+        if response.status_code in API._UNSUPPORTED_ENDPOINT_STATUS_CODES:
+            return None
+
+        response.raise_for_status()
+
+        return response.json()
+
+    @staticmethod
+    def _get_request_body(batch: dict) -> dict:
+        return {
+            "repository_id": batch["repository_id"],
+            "files": batch["files"],
+            "changes": batch["changes"],
+            "batch_index": batch["batch_index"],
+            "num_total_batches": batch["num_total_batches"],
+        }
+
+    @staticmethod
+    async def _make_batch_request(payload: dict) -> None:
+        response = await API._send(
+            "PUT",
+            f"{config.INSIGHT_API_BASE_URL}/reinitialize_repository",
+            payload["body"],
+            cookies=(
+                {"session_id": payload["session_id"]}
+                if payload.get("session_id")
+                else None
+            ),
         )
 
         response.raise_for_status()
 
     @classmethod
-    def make_request(
+    async def _start_session(
         cls,
+        upload_journal: UploadJournal,
+        fingerprint: str,
         repository_id: str,
-        repository_file_changes: dict[str, list[tuple[str, bytes]]],
+        content_hashes: dict[str, str],
+    ) -> UploadSession:
+        manifest_response = (
+            await cls._make_manifest_request(repository_id, content_hashes)
+            if content_hashes
+            else None
+        )
+
+        if manifest_response is None:
+            return upload_journal.start(fingerprint, secrets.token_hex(), None)
+
+        return upload_journal.start(
+            fingerprint,
+            manifest_response["session_id"],
+            manifest_response["missing_content_hashes"],
+        )
+
+    @classmethod
+    async def make_request_async(
+        cls,
+        repository_id: str,
+        repository_file_changes: dict[str, list[tuple[str, int]]],
+        upload_journal: UploadJournal | None = None,
+        chunk_index: ChunkIndex | None = None,
     ) -> None:
-        repository_file_changes_batches = cls._batch_repository_file_changes(
-            repository_file_changes
+        """
+        Updated files whose last uploaded version is in [chunk_index]
+        are first sent as deltas of the chunks that changed. The
+        remaining added and updated files are listed in a manifest of
+        content hashes; files whose content the server already has are
+        sent as changes without content. Batches acknowledged in a
+        previous, interrupted run of the same upload are not sent again.
+        """
+        upload_journal = upload_journal or UploadJournal()
+        chunk_index = chunk_index or ChunkIndex()
+        delta_file_paths, recipes = await cls._sync_file_deltas(
+            repository_id,
+            [file_path for file_path, _ in repository_file_changes["update"]],
+            chunk_index,
+        )
+
+        if delta_file_paths:
+            repository_file_changes = {
+                change: [
+                    (file_path, file_size_bytes)
+                    for file_path, file_size_bytes in files
+                    if file_path not in delta_file_paths
+                ]
+                for change, files in repository_file_changes.items()
+            }
+
+            if not any(repository_file_changes.values()):
+                return
+
+        content_hashes = await asyncio.to_thread(
+            API._get_content_hashes,
+            [
+                file_path
+                for change in ["add", "update"]
+                for file_path, _ in repository_file_changes[change]
+            ],
+        )
+        fingerprint = UploadJournal.fingerprint(
+            "reinitialize_repository",
+            {
+                "repository_id": repository_id,
+                "changes": {
+                    file_path: change
+                    for change, files in repository_file_changes.items()
+                    for file_path, _ in files
+                },
+                "content_hashes": content_hashes,
+            },
+        )
+        session = upload_journal.resume(fingerprint) or await cls._start_session(
+            upload_journal, fingerprint, repository_id, content_hashes
         )
+        known_file_changes = {}
+
+        if session["missing_content_hashes"] is not None:
+            missing_content_hashes = set(session["missing_content_hashes"])
+            known_file_changes = {
+                file_path: change
+                for change in ["add", "update"]
+                for file_path, _ in repository_file_changes[change]
+                if content_hashes[file_path] not in missing_content_hashes
+            }
+            repository_file_changes = {
+                change: [
+                    (file_path, file_size_bytes)
+                    for file_path, file_size_bytes in files
+                    if file_path not in known_file_changes
+                ]
+                for change, files in repository_file_changes.items()
+            }
+
+        repository_file_changes_batches = await asyncio.to_thread(
+            cls._batch_repository_file_changes,
+            repository_id,
+            repository_file_changes,
+            known_file_changes,
+        ) or [{"files": {}, "changes": {}}]
 
         request_batches = cls._add_metadata_to_batches(
-            repository_file_changes_batches, repository_id
+            repository_file_changes_batches, repository_id, session["session_id"]
         )
+        acknowledged_batch_indexes = set(session["acknowledged_batch_indexes"])
+        unacknowledged_request_batches = [
+            batch
+            for batch in request_batches
+            if batch["batch_index"] not in acknowledged_batch_indexes
+        ]
+
+        def on_batch_uploaded(batch: dict, _) -> None:
+            upload_journal.acknowledge(batch["batch_index"])
+            acknowledged_batch_indexes.add(batch["batch_index"])
+
+        try:
+            await BatchUploader(
+                cls._make_batch_request, on_batch_uploaded=on_batch_uploaded
+            ).upload(
+                BatchLoader.load(unacknowledged_request_batches, cls._get_request_body)
+            )
 
-        with ThreadPoolExecutor(max_workers=len(request_batches)) as executor:
-            executor.map(cls._make_batch_request, request_batches)
+        except Exception as e:
+            acknowledged_file_paths = cls._get_acknowledged_file_paths(
+                request_batches, acknowledged_batch_indexes
+            )
+            await asyncio.to_thread(
+                chunk_index.record, acknowledged_file_paths, recipes
+            )
+
+            raise IncompleteUploadError(
+                acknowledged_file_paths | delta_file_paths
+            ) from e
+
+        upload_journal.clear()
+        await asyncio.to_thread(
+            chunk_index.record,
+            [
+                *known_file_changes,
+                *(
+                    file_path
+                    for files in repository_file_changes.values()
+                    for file_path, _ in files
+                ),
+            ],
+            recipes,
+        )
+
+    @classmethod
+    def make_request(
+        cls,
+        repository_id: str,
+        repository_file_changes: dict[str, list[tuple[str, int]]],
+        upload_journal: UploadJournal | None = None,
+        chunk_index: ChunkIndex | None = None,
+    ) -> None:
+        API._run(
+            cls.make_request_async(
+                repository_id, repository_file_changes, upload_journal, chunk_index
+            )
+        )
@@ -1,15 +1,18 @@
-import requests
-
 from .base import API
 from insight_cli import config
 
 
 class UninitializeRepositoryAPI(API):
     @staticmethod
-    def make_request(repository_id: str) -> None:
-        response = requests.delete(
-            url=f"{config.INSIGHT_API_BASE_URL}/uninitialize_repository",
+    async def make_request_async(repository_id: str) -> None:
+        response = await API.session().request(
+            "DELETE",
+            f"{config.INSIGHT_API_BASE_URL}/uninitialize_repository",
             json={"repository_id": repository_id},
         )
 
         response.raise_for_status()
+
+    @staticmethod
+    def make_request(repository_id: str) -> None:
+        API._run(UninitializeRepositoryAPI.make_request_async(repository_id))
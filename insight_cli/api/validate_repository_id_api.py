@@ -1,17 +1,36 @@
-import requests
-
 from .base.api import API
+from .base.latency_history import LatencyHistory
 from insight_cli import config
 
 
 class ValidateRepositoryIdAPI(API):
+    _ENDPOINT = "validate_repository_id"
+
     @staticmethod
-    def make_request(repository_id: str) -> dict[str, bool]:
-        response = requests.post(
-            url=f"{config.INSIGHT_API_BASE_URL}/validate_repository_id",
-            json={"repository_id": repository_id},
+    async def make_request_async(
+        repository_id: str, latency_history: LatencyHistory | None = None
+    ) -> dict[str, bool]:
+        """
+        The request is hedged if [latency_history] is given.
+        """
+        response = await API._hedge(
+            lambda: API.session().request(
+                "POST",
+                f"{config.INSIGHT_API_BASE_URL}/{ValidateRepositoryIdAPI._ENDPOINT}",
+                json={"repository_id": repository_id},
+            ),
+            ValidateRepositoryIdAPI._ENDPOINT,
+            latency_history,
         )
 
         response.raise_for_status()
 
         return response.json()
+
+    @staticmethod
+    def make_request(
+        repository_id: str, latency_history: LatencyHistory | None = None
+    ) -> dict[str, bool]:
+        return API._run(
+            ValidateRepositoryIdAPI.make_request_async(repository_id, latency_history)
+        )
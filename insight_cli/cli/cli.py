@@ -2,6 +2,7 @@ from typing import Callable, TypedDict
 import argparse
 
 from insight_cli.commands import Command
+from insight_cli.utils import Deadline
 
 
 class ParsedCommand(TypedDict):
@@ -14,6 +15,8 @@ class ParsedCommand(TypedDict):
 
 
 class CLI:
+    _TIMEOUT_OPTION_NAME = "timeout"
+
     @staticmethod
     def _parse_command(command: Command) -> ParsedCommand:
         def get_name() -> str:
@@ -109,6 +112,7 @@ class CLI:
         CLI._raise_for_invalid_args(commands, description)
         self._arguments: argparse.Namespace = argparse.Namespace()
         self._parsed_commands: dict[str, ParsedCommand] = {}
+        self._option_command_names: dict[str, list[str]] = {}
         self._parser: argparse.ArgumentParser = argparse.ArgumentParser(
             description=description,
             formatter_class=lambda prog: argparse.HelpFormatter(
@@ -116,6 +120,12 @@ class CLI:
             ),
         )
         self._add_commands(commands)
+        self._parser.add_argument(
+            f"--{CLI._TIMEOUT_OPTION_NAME}",
+            help="fails the invoked commands if they do not finish within the given number of seconds",
+            metavar="<seconds>",
+            type=float,
+        )
 
     def _add_commands(self, commands: list[Command]) -> None:
         sorted_parsed_commands: list[ParsedCommand] = sorted(
@@ -124,16 +134,113 @@ class CLI:
         )
 
         for parsed_command in sorted_parsed_commands:
+            # argparse would store the value of a flag such as
+            # --batch-query under batch_query, so every command is
+            # stored under an explicit dest derived from its name
+            dest = parsed_command["name"].replace("-", "_")
             self._parser.add_argument(
-                *parsed_command["flag_strings"], **parsed_command["options"]
+                *parsed_command["flag_strings"],
+                dest=dest,
+                **parsed_command["options"],
             )
-            self._parsed_commands[parsed_command["name"]] = parsed_command
+            self._parsed_commands[dest] = parsed_command
+
+        self._add_command_options(sorted_parsed_commands)
+
+    @staticmethod
+    def _get_option_type(option_type: Callable) -> Callable:
+        """
+        argparse reports the message of a ValueError raised while
+        parsing an option, rather than only the name of its type.
+        """
+
+        def parse(value: str):
+            try:
+                return option_type(value)
+            except ValueError as e:
+                raise argparse.ArgumentTypeError(str(e)) from e
+
+        return parse
+
+    @staticmethod
+    def _get_option_flag_string(option_name: str) -> str:
+        return f"--{option_name.replace('_', '-')}"
+
+    @staticmethod
+    def _get_option_help(option: dict) -> str:
+        command_flag_strings = " or ".join(
+            f"--{name}" for name in option["command_names"]
+        )
+
+        if option["description"] is None:
+            return f"an option of {command_flag_strings}"
+
+        return f"{option['description']} (with {command_flag_strings})"
+
+    def _add_command_options(self, parsed_commands: list[ParsedCommand]) -> None:
+        """
+        An option shared by several commands is added once, and is
+        passed to each of them that is invoked. It is described by the
+        first command that describes it.
+        """
+        options: dict[str, dict] = {}
+
+        for parsed_command in parsed_commands:
+            for option in parsed_command["command"].executor_options:
+                options.setdefault(option["name"], {**option, "command_names": []})
+                options[option["name"]]["command_names"].append(parsed_command["name"])
+
+                if options[option["name"]]["description"] is None:
+                    options[option["name"]]["description"] = option["description"]
+
+        for option_name, option in options.items():
+            self._parser.add_argument(
+                CLI._get_option_flag_string(option_name),
+                dest=option_name,
+                help=CLI._get_option_help(option),
+                metavar=f"<{option_name}>",
+                type=CLI._get_option_type(option["type"]),
+            )
+            self._option_command_names[option_name] = option["command_names"]
+
+    def _raise_for_options_without_commands(self) -> None:
+        """
+        An option does nothing unless a command that takes it is
+        invoked, so giving it on its own is an error.
+        """
+        for option_name, command_names in self._option_command_names.items():
+            option_is_given = getattr(self._arguments, option_name) is not None
+            command_is_invoked = any(
+                getattr(self._arguments, name.replace("-", "_")) is not None
+                for name in command_names
+            )
+
+            if option_is_given and not command_is_invoked:
+                self._parser.error(
+                    f"{CLI._get_option_flag_string(option_name)} requires "
+                    + " or ".join(f"--{name}" for name in command_names)
+                )
 
     def parse_arguments(self) -> None:
         self._arguments: argparse.Namespace = self._parser.parse_args()
+        timeout_seconds = getattr(self._arguments, CLI._TIMEOUT_OPTION_NAME)
+
+        if timeout_seconds is not None and timeout_seconds <= 0:
+            self._parser.error(
+                f"--{CLI._TIMEOUT_OPTION_NAME} must be a positive number of seconds"
+            )
+
+        self._raise_for_options_without_commands()
 
     def execute_invoked_commands(self) -> None:
-        for command_name, command_args in vars(self._arguments).items():
+        arguments = vars(self._arguments).copy()
+        Deadline.start(arguments.pop(CLI._TIMEOUT_OPTION_NAME, None))
+        options = {
+            option_name: arguments.pop(option_name, None)
+            for option_name in self._option_command_names
+        }
+
+        for command_name, command_args in arguments.items():
             command_is_not_invoked = command_args is None
             if command_is_not_invoked:
                 continue
@@ -141,5 +248,10 @@ class CLI:
             parsed_command = self._parsed_commands[command_name]
             command = parsed_command["command"]
             command_executor_args = parsed_command["get_executor_args"](command_args)
+            command_executor_options = {
+                option["name"]: options[option["name"]]
+                for option in command.executor_options
+                if options[option["name"]] is not None
+            }
 
-            command.execute(*command_executor_args)
+            command.execute(*command_executor_args, **command_executor_options)
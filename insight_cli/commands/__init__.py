@@ -1,4 +1,5 @@
 from .base import Command
+from .batch_query_command import BatchQueryCommand
 from .initialize_command import InitializeCommand
 from .query_command import QueryCommand
 from .uninitialize_command import UninitializeCommand
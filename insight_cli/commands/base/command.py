@@ -40,13 +40,45 @@ class Command(ABC):
                     f"the {executor} parameter '{param_name}' does not have a type"
                 )
 
-    def __init__(self, flags: list[str], description: str):
+    @staticmethod
+    def _raise_for_invalid_option_descriptions(
+        option_descriptions: dict[str, str], executor: Callable
+    ) -> None:
+        if not isinstance(option_descriptions, dict):
+            raise TypeError(f"{option_descriptions} must be a dict")
+
+        option_names = {
+            param_name
+            for param_name, param in inspect.signature(executor).parameters.items()
+            if param.kind == inspect.Parameter.KEYWORD_ONLY
+        }
+
+        for option_name, description in option_descriptions.items():
+            if option_name not in option_names:
+                raise ValueError(f"{option_name} is not an option of {executor}")
+
+            Command._raise_for_invalid_description(description)
+
+    def __init__(
+        self,
+        flags: list[str],
+        description: str,
+        option_descriptions: dict[str, str] | None = None,
+    ):
+        """
+        [option_descriptions] describes the options of the executor by
+        their names.
+        """
         Command._raise_for_invalid_flags(flags)
         Command._raise_for_invalid_description(description)
         Command._raise_for_invalid_executor(self.execute)
+        Command._raise_for_invalid_option_descriptions(
+            option_descriptions or {}, self.execute
+        )
 
         self._flags: list[Flag] = [Flag(flag) for flag in flags]
         self._description: str = description
+        self._option_descriptions: dict[str, str] = option_descriptions or {}
 
     @abstractmethod
     def execute(self, *args, **kwargs):
@@ -70,11 +102,39 @@ class Command(ABC):
 
     @property
     def executor_params(self) -> list[dict]:
-        param_names = inspect.signature(self.execute).parameters
+        params = inspect.signature(self.execute).parameters
         param_types = typing.get_type_hints(self.execute)
         return [
             {"name": param_name, "type": param_types[param_name]}
-            for param_name in param_names
+            for param_name, param in params.items()
+            if param.kind != inspect.Parameter.KEYWORD_ONLY
+        ]
+
+    @property
+    def executor_options(self) -> list[dict]:
+        """
+        Keyword-only parameters of the executor are optional, and are
+        given with a flag of their own named after the parameter. The
+        type of an option is its annotated type without None.
+        """
+        params = inspect.signature(self.execute).parameters
+        param_types = typing.get_type_hints(self.execute)
+        return [
+            {
+                "name": param_name,
+                "type": next(
+                    (
+                        param_type
+                        for param_type in typing.get_args(param_types[param_name])
+                        if param_type is not type(None)
+                    ),
+                    param_types[param_name],
+                ),
+                "default": param.default,
+                "description": self._option_descriptions.get(param_name),
+            }
+            for param_name, param in params.items()
+            if param.kind == inspect.Parameter.KEYWORD_ONLY
         ]
 
     @property
@@ -0,0 +1,78 @@
+from pathlib import Path
+from typing import Any
+import json, sys
+
+from .base.command import Command
+from insight_cli.repository import Repository, InvalidRepositoryError
+from insight_cli.utils import Color
+
+
+class BatchQueryCommand(Command):
+    _STDIN_FILE_PATH = "-"
+
+    @staticmethod
+    def _parse_queries(lines: list[str]) -> list[tuple[Any, str]]:
+        """
+        Each non-blank line is either a query string, identified by its
+        line number, or a JSON object with a "query" and an optional
+        "id".
+        """
+        queries = []
+
+        for line_number, line in enumerate(lines, start=1):
+            line = line.strip()
+
+            if not line:
+                continue
+
+            try:
+                query = json.loads(line)
+            except json.JSONDecodeError:
+                query = None
+
+            if isinstance(query, dict) and isinstance(query.get("query"), str):
+                queries.append((query.get("id", line_number), query["query"]))
+            else:
+                queries.append((line_number, line))
+
+        return queries
+
+    @staticmethod
+    def _read_lines(queries_file_path: str) -> list[str]:
+        if queries_file_path == BatchQueryCommand._STDIN_FILE_PATH:
+            return sys.stdin.readlines()
+
+        with open(queries_file_path, "r") as file:
+            return file.readlines()
+
+    def __init__(self):
+        super().__init__(
+            flags=["-b", "--batch-query"],
+            description="runs every query in the given file, or in stdin if the file is -, and prints each result as a line of JSON",
+        )
+
+    def execute(self, queries_file_path: str) -> None:
+        try:
+            queries = BatchQueryCommand._parse_queries(
+                BatchQueryCommand._read_lines(queries_file_path)
+            )
+            repository = Repository(Path(""))
+
+            for result in repository.query_batch(
+                [query_string for _, query_string in queries]
+            ):
+                output = {
+                    "id": queries[result["index"]][0],
+                    "query": result["query_string"],
+                    "latency_ms": round(result["latency_seconds"] * 1000, 3),
+                }
+
+                if result["error"] is None:
+                    output["matches"] = result["matches"]
+                else:
+                    output["error"] = result["error"]
+
+                print(json.dumps(output), flush=True)
+
+        except (InvalidRepositoryError, OSError) as e:
+            print(Color.red(e), file=sys.stderr)
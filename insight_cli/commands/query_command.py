@@ -1,52 +1,107 @@
 from pathlib import Path
+from typing import Iterable
 
 from .base.command import Command
-from insight_cli.repository import Repository, InvalidRepositoryError
-from insight_cli.utils import Color
+from insight_cli import config
+from insight_cli.repository import (
+    InvalidRepositoryError,
+    PathNotInRepositoryError,
+    QueryScope,
+    Repository,
+)
+from insight_cli.utils import Color, PositiveInt
 
 
 class QueryCommand(Command):
     @staticmethod
-    def _print_matches(matches) -> None:
-        num_matches = len(matches)
+    def _print_match(match: dict, is_first_match: bool) -> None:
+        terminal_output = "" if is_first_match else "\n"
 
-        if num_matches == 0:
-            print(Color.yellow(f"{num_matches} matches found"))
+        terminal_output += f"{match['path']}\n"
 
-        elif num_matches == 1:
-            print(Color.yellow(f"{num_matches} match found in the following file:"))
+        if match["start_line"] == match["end_line"]:
+            terminal_output += (
+                f"\tLine {match['start_line']}: {Color.green(match['content'])}"
+            )
 
         else:
-            print(Color.yellow(f"{num_matches} matches found in the following files:"))
+            terminal_output += f"\tLine {match['start_line']} - {match['end_line']}: {Color.green(match['content'])}"
+
+        print(terminal_output, flush=True)
 
-        for i, match in enumerate(matches):
-            is_first_match = i == 0
+    @staticmethod
+    def _print_summary(num_matches: int, num_files: int) -> None:
+        if num_matches == 0:
+            print(Color.yellow(f"{num_matches} matches found"))
 
-            terminal_output = "" if is_first_match else "\n"
+        elif num_matches == 1:
+            print("\n" + Color.yellow(f"{num_matches} match found in 1 file"))
 
-            terminal_output += f"{match['path']}\n"
+        else:
+            files = "file" if num_files == 1 else "files"
+            print(
+                "\n"
+                + Color.yellow(f"{num_matches} matches found in {num_files} {files}")
+            )
 
-            if match["start_line"] == match["end_line"]:
-                terminal_output += (
-                    f"\tLine {match['start_line']}: {Color.green(match['content'])}"
-                )
+    @staticmethod
+    def _print_matches(matches: Iterable[dict]) -> None:
+        """
+        Prints each match as soon as it arrives, followed by a summary
+        once every match has arrived.
+        """
+        num_matches, file_paths = 0, set()
 
-            else:
-                terminal_output += f"\tLine {match['start_line']} - {match['end_line']}: {Color.green(match['content'])}"
+        for match in matches:
+            QueryCommand._print_match(match, is_first_match=num_matches == 0)
+            num_matches += 1
+            file_paths.add(match["path"])
 
-            print(terminal_output)
+        QueryCommand._print_summary(num_matches, len(file_paths))
 
     def __init__(self):
         super().__init__(
             flags=["-q", "--query"],
             description="shows files in the current insight repository that satisfy the given natural language query",
+            option_descriptions={
+                "limit": "shows only the given number of top matches",
+                "path": "queries only the files under the given path, relative to the repository",
+                "glob": "queries only the files matching the given glob, relative to the repository",
+            },
         )
 
-    def execute(self, query_string: str) -> None:
+    def execute(
+        self,
+        query_string: str,
+        *,
+        limit: PositiveInt | None = None,
+        path: str | None = None,
+        glob: str | None = None,
+    ) -> None:
         try:
             repository = Repository(Path(""))
-            matches = repository.query(query_string)
-            self._print_matches(matches)
+            scope = (
+                QueryScope(repository.path, path, glob)
+                if path is not None or glob is not None
+                else None
+            )
+            self._print_matches(
+                repository.query_stream(
+                    query_string,
+                    config.INSIGHT_QUERY_SYNC_TIMEOUT_SECONDS,
+                    limit=limit,
+                    scope=scope,
+                )
+            )
+
+            if not repository.is_synced:
+                print(
+                    Color.yellow(
+                        "these matches may be stale, waiting for changed files to sync..."
+                    ),
+                    flush=True,
+                )
+                repository.wait_for_sync()
 
-        except InvalidRepositoryError as e:
+        except (InvalidRepositoryError, PathNotInRepositoryError) as e:
             print(Color.red(e))
@@ -1,2 +1,20 @@
 INSIGHT_VERSION = "0.0.0"
 INSIGHT_API_BASE_URL = "http://127.0.0.1:5000"
+INSIGHT_API_MAX_CONCURRENT_REQUESTS = 16
+INSIGHT_API_CONNECT_TIMEOUT_SECONDS = 10
+INSIGHT_API_READ_TIMEOUT_SECONDS = 120
+INSIGHT_API_UPLOAD_BATCH_TIMEOUT_SECONDS = 600
+INSIGHT_API_REQUEST_COMPRESSION_LEVEL = 6
+INSIGHT_API_MULTIPART_UPLOADS = True
+INSIGHT_API_HEDGE_PERCENTILE = 95
+INSIGHT_API_HEDGE_MIN_NUM_LATENCIES = 20
+INSIGHT_API_HEDGE_MAX_NUM_LATENCIES = 200
+INSIGHT_API_MAX_BATCH_SIZE_BYTES = 10 * 1024**2
+INSIGHT_DELTA_SYNC_MIN_FILE_SIZE_BYTES = 64 * 1024
+INSIGHT_DELTA_SYNC_AVERAGE_CHUNK_SIZE_BYTES = 4 * 1024
+INSIGHT_DELTA_SYNC_MAX_FILE_SIZE_BYTES = 4 * 1024**2
+INSIGHT_QUERY_CACHE_MAX_SIZE_BYTES = 8 * 1024**2
+INSIGHT_QUERY_SYNC_TIMEOUT_SECONDS = 2
+INSIGHT_QUERY_BATCH_MAX_CONCURRENT_QUERIES = 8
+INSIGHT_QUERY_PAGE_SIZE = 20
+INSIGHT_REPOSITORY_VALIDATION_TTL_SECONDS = 60 * 60
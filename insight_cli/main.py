@@ -1,15 +1,27 @@
+import sys
+
 from insight_cli.cli import CLI
 from insight_cli.commands import (
+    BatchQueryCommand,
     InitializeCommand,
     QueryCommand,
     UninitializeCommand,
     VersionCommand,
 )
+from insight_cli.utils import Color, DeadlineExceededError
+
+
+def _get_deadline_exceeded_error(e: BaseException) -> DeadlineExceededError | None:
+    while e is not None and not isinstance(e, DeadlineExceededError):
+        e = e.__cause__
+
+    return e
 
 
 def main() -> None:
     cli = CLI(
         commands=[
+            BatchQueryCommand(),
             InitializeCommand(),
             QueryCommand(),
             UninitializeCommand(),
@@ -20,7 +32,17 @@ def main() -> None:
 
     cli.parse_arguments()
 
-    cli.execute_invoked_commands()
+    try:
+        cli.execute_invoked_commands()
+
+    except Exception as e:
+        deadline_exceeded_error = _get_deadline_exceeded_error(e)
+
+        if deadline_exceeded_error is None:
+            raise
+
+        print(Color.red(deadline_exceeded_error), file=sys.stderr)
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -1 +1,2 @@
+from .query_scope import QueryScope, PathNotInRepositoryError
 from .repository import Repository, InvalidRepositoryError
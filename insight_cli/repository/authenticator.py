@@ -1,8 +1,9 @@
 from pathlib import Path
 from typing import TypedDict
-import json
+import json, os, time
 
-from insight_cli.api import ValidateRepositoryIdAPI
+from insight_cli import config
+from insight_cli.api import LatencyHistory, ValidateRepositoryIdAPI
 
 
 class AuthenticatorData(TypedDict):
@@ -10,7 +11,15 @@ class AuthenticatorData(TypedDict):
 
 
 class Authenticator:
+    """
+    A repository id that the server has confirmed is valid is trusted
+    for INSIGHT_REPOSITORY_VALIDATION_TTL_SECONDS without asking the
+    server again. Callers that learn from the server that the
+    repository is unknown should invalidate that confirmation.
+    """
+
     _FILE_NAME = "authenticator.json"
+    _VALIDATION_FILE_NAME = "validation.json"
 
     @staticmethod
     def _is_authenticator_data_instance(data):
@@ -23,8 +32,12 @@ class Authenticator:
             )
         )
 
-    def __init__(self, parent_dir_path: Path):
+    def __init__(
+        self, parent_dir_path: Path, latency_history: LatencyHistory | None = None
+    ):
         self._path = parent_dir_path / Authenticator._FILE_NAME
+        self._latency_history = latency_history
+        self._validation_path = parent_dir_path / Authenticator._VALIDATION_FILE_NAME
 
     def create(self, data: AuthenticatorData) -> None:
         if not Authenticator._is_authenticator_data_instance(data):
@@ -47,13 +60,59 @@ class Authenticator:
 
         return data
 
+    def _is_validated(self, repository_id: str) -> bool:
+        if not self._validation_path.is_file():
+            return False
+
+        try:
+            with open(self._validation_path, "r") as file:
+                validation = json.load(file)
+        except json.JSONDecodeError:
+            return False
+
+        return (
+            validation.get("repository_id") == repository_id
+            and 0
+            <= time.time() - validation.get("validated_at", 0)
+            < config.INSIGHT_REPOSITORY_VALIDATION_TTL_SECONDS
+        )
+
+    def validate(self, repository_id: str) -> None:
+        """
+        Records that the server has confirmed [repository_id].
+        """
+        with open(self._validation_path, "w") as file:
+            file.write(
+                json.dumps(
+                    {
+                        "repository_id": repository_id,
+                        "validated_at": time.time(),
+                    },
+                    indent=4,
+                )
+            )
+
+    def invalidate(self) -> None:
+        if self._validation_path.is_file():
+            os.remove(self._validation_path)
+
     @property
     def is_valid(self) -> bool:
         try:
+            repository_id = self.data["repository_id"]
+
+            if self._is_validated(repository_id):
+                return True
+
             response_data: dict[str, bool] = ValidateRepositoryIdAPI.make_request(
-                self.data["repository_id"]
+                repository_id, latency_history=self._latency_history
             )
 
+            if response_data["repository_id_is_valid"]:
+                self.validate(repository_id)
+            else:
+                self.invalidate()
+
             return response_data["repository_id_is_valid"]
 
         except ValueError:
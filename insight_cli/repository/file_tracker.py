@@ -1,49 +1,83 @@
-from datetime import datetime
 from pathlib import Path
-import json, os
+import json, os, threading
+
+from insight_cli.utils import FileChangesDetector, FileVersion
 
 
 class FileTracker:
+    """
+    Tracks the version, the modified time in nanoseconds and the inode,
+    of every synced file, as taken from the stat results of the scan
+    that found it. A sync running in the background changes the tracked
+    files while queries read them, so they are only changed and read
+    under a lock.
+    """
+
     _FILE_NAME = "file_tracker.json"
 
     def __init__(self, parent_dir_file_path: Path):
         self._file_path: Path = parent_dir_file_path / FileTracker._FILE_NAME
-        self._data: dict[str, float] = self._read_from_file()
+        self._data: dict[str, list[int | None]] = self._read_from_file()
+        self._lock = threading.Lock()
 
     def _write_to_file(self) -> None:
         with open(self._file_path, "w") as file:
             file.write(json.dumps(self._data, indent=4))
 
-    def _read_from_file(self) -> dict[str, float]:
+    def _read_from_file(self) -> dict[str, list[int | None]]:
+        """
+        Files tracked by their modified time in float seconds, before
+        versions were tracked, have no inode.
+        """
         if not self._file_path.is_file():
             return {}
 
         with open(self._file_path, "r") as file:
-            return json.load(file)
+            data = json.load(file)
 
-    def _add(self, file_paths: list[Path]) -> None:
-        for file_path in file_paths:
-            if not file_path.is_file():
-                raise FileNotFoundError(f"cannot find file at {file_path}")
+        return {
+            file_path: (
+                version
+                if isinstance(version, list)
+                else [round(version * 1_000_000_000), None]
+            )
+            for file_path, version in data.items()
+        }
 
+    @staticmethod
+    def _get_version(
+        file_path: Path, file_stats: dict[Path, os.stat_result]
+    ) -> list[int | None]:
+        if file_path not in file_stats:
+            raise FileNotFoundError(f"cannot find file at {file_path}")
+
+        return list(FileChangesDetector.get_file_version(file_stats[file_path]))
+
+    def _add(
+        self,
+        file_paths: list[Path],
+        file_stats: dict[Path, os.stat_result],
+    ) -> None:
+        for file_path in file_paths:
             if str(file_path) in self._data:
                 raise ValueError(
                     f"cannot add file path that already exists: {file_path}"
                 )
 
-            self._data[str(file_path)] = os.path.getmtime(file_path)
+            self._data[str(file_path)] = FileTracker._get_version(file_path, file_stats)
 
-    def _update(self, file_paths: list[Path]) -> None:
+    def _update(
+        self,
+        file_paths: list[Path],
+        file_stats: dict[Path, os.stat_result],
+    ) -> None:
         for file_path in file_paths:
-            if not file_path.is_file():
-                raise FileNotFoundError(f"cannot find file at {file_path}")
-
             if str(file_path) not in self._data:
                 raise ValueError(
                     f"cannot update file path that does not exist: {file_path}"
                 )
 
-            self._data[str(file_path)] = os.path.getmtime(file_path)
+            self._data[str(file_path)] = FileTracker._get_version(file_path, file_stats)
 
     def _delete(self, file_paths: list[Path]) -> None:
         for file_path in file_paths:
@@ -54,24 +88,31 @@ class FileTracker:
 
             del self._data[str(file_path)]
 
-    def create(self, file_paths: list[Path]) -> None:
-        self._add(file_paths)
-        self._write_to_file()
+    def create(
+        self,
+        file_paths: list[Path],
+        file_stats: dict[Path, os.stat_result],
+    ) -> None:
+        with self._lock:
+            self._add(file_paths, file_stats)
+            self._write_to_file()
 
     def change_file_paths(
         self,
         paths_to_add: list[Path],
         paths_to_update: list[Path],
         paths_to_delete: list[Path],
+        file_stats: dict[Path, os.stat_result],
     ) -> None:
-        self._add(paths_to_add)
-        self._update(paths_to_update)
-        self._delete(paths_to_delete)
-        self._write_to_file()
+        with self._lock:
+            self._add(paths_to_add, file_stats)
+            self._update(paths_to_update, file_stats)
+            self._delete(paths_to_delete)
+            self._write_to_file()
 
     @property
-    def tracked_file_modified_times(self) -> dict[Path, datetime]:
-        return {
-            Path(file_path): datetime.fromtimestamp(last_updated_time)
-            for file_path, last_updated_time in self._data.items()
-        }
+    def tracked_file_versions(self) -> dict[Path, FileVersion]:
+        with self._lock:
+            data = self._data.copy()
+
+        return {Path(file_path): tuple(version) for file_path, version in data.items()}
@@ -1,9 +1,13 @@
-from datetime import datetime
 from pathlib import Path
 import os, shutil
 
+from insight_cli.api import ChunkIndex, LatencyHistory, UploadJournal
+from insight_cli.utils import FileVersion
 from .authenticator import Authenticator
 from .file_tracker import FileTracker
+from .query_cache import QueryCache
+from .revision_tracker import RevisionTracker
+from .sync_journal import SyncJournal
 
 
 class Manager:
@@ -16,28 +20,50 @@ class Manager:
 
     def __init__(self, parent_dir_path: Path):
         self._path = parent_dir_path / Manager._DIR_NAME
-        self._authenticator = Authenticator(self._path)
+        self._latency_history = LatencyHistory(self._path)
+        self._authenticator = Authenticator(self._path, self._latency_history)
         self._file_tracker = FileTracker(self._path)
+        self._upload_journal = UploadJournal(self._path)
+        self._chunk_index = ChunkIndex(self._path)
+        self._query_cache = QueryCache(self._path)
+        self._revision_tracker = RevisionTracker(self._path)
+        self._sync_journal = SyncJournal(self._path)
 
     def create(
-        self, repository_id: str, nested_repository_file_paths: list[Path]
+        self,
+        repository_id: str,
+        nested_repository_file_paths: list[Path],
+        file_stats: dict[Path, os.stat_result],
     ) -> None:
         os.makedirs(self._path, exist_ok=True)
         self._authenticator.create({"repository_id": repository_id})
-        self._file_tracker.create(nested_repository_file_paths)
+        self._authenticator.validate(repository_id)
+        self._file_tracker.create(nested_repository_file_paths, file_stats)
+        self._revision_tracker.create()
+        self._query_cache.clear()
+        self._sync_journal.clear()
 
     def update(
-        self, repository_file_changes: dict[str, list[tuple[str, bytes]]]
+        self,
+        repository_file_changes: dict[str, list[tuple[str, bytes]]],
+        file_stats: dict[Path, os.stat_result],
     ) -> None:
         self._file_tracker.change_file_paths(
             paths_to_add=[Path(path) for path in repository_file_changes["add"]],
             paths_to_update=[Path(path) for path in repository_file_changes["update"]],
             paths_to_delete=[Path(path) for path in repository_file_changes["delete"]],
+            file_stats=file_stats,
         )
 
+        if any(repository_file_changes.values()):
+            self._revision_tracker.increment()
+
     def delete(self) -> None:
         shutil.rmtree(self._path)
 
+    def invalidate(self) -> None:
+        self._authenticator.invalidate()
+
     @property
     def is_valid(self) -> bool:
         return self._authenticator.is_valid
@@ -47,5 +73,29 @@ class Manager:
         return self._authenticator.data["repository_id"]
 
     @property
-    def tracked_file_modified_times(self) -> dict[Path, datetime]:
-        return self._file_tracker.tracked_file_modified_times
+    def revision(self) -> int:
+        return self._revision_tracker.revision
+
+    @property
+    def upload_journal(self) -> UploadJournal:
+        return self._upload_journal
+
+    @property
+    def chunk_index(self) -> ChunkIndex:
+        return self._chunk_index
+
+    @property
+    def latency_history(self) -> LatencyHistory:
+        return self._latency_history
+
+    @property
+    def query_cache(self) -> QueryCache:
+        return self._query_cache
+
+    @property
+    def sync_journal(self) -> SyncJournal:
+        return self._sync_journal
+
+    @property
+    def tracked_file_versions(self) -> dict[Path, FileVersion]:
+        return self._file_tracker.tracked_file_versions
@@ -0,0 +1,219 @@
+from pathlib import Path
+from typing import Iterable, TypedDict
+import json, os
+
+from insight_cli import config
+
+
+class QueryCacheEntry(TypedDict):
+    matches: list[dict]
+    file_paths: list[str]
+    size_bytes: int
+    revision: int | None
+    etag: str | None
+
+
+class QueryCache:
+    """
+    Caches query results on disk, keyed by repository id and query
+    string with whitespace normalized, and by the number of matches
+    and the scope the query was limited to, if any. Once the cached results exceed
+    INSIGHT_QUERY_CACHE_MAX_SIZE_BYTES, the least recently used entries
+    are evicted. Each entry records the files its matches came from,
+    so a changed file only evicts the entries with a match in it. Each
+    entry also records the repository revision it was cached at, and
+    the validator the server sent with it, so that an entry from an
+    earlier revision can be revalidated with the server instead of
+    being fetched again.
+    """
+
+    _FILE_NAME = "query_cache.json"
+
+    @staticmethod
+    def _get_key(
+        repository_id: str,
+        query_string: str,
+        limit: int | None = None,
+        scope: str | None = None,
+    ) -> str:
+        key = [repository_id, " ".join(query_string.split())]
+
+        if limit is not None or scope is not None:
+            key.append(limit)
+
+        if scope is not None:
+            key.append(scope)
+
+        return json.dumps(key)
+
+    def __init__(self, parent_dir_path: Path):
+        self._path = parent_dir_path / QueryCache._FILE_NAME
+        self._entries: dict[str, QueryCacheEntry] | None = None
+
+    def _read_from_file(self) -> dict[str, QueryCacheEntry]:
+        if not self._path.is_file():
+            return {}
+
+        try:
+            with open(self._path, "r") as file:
+                return json.load(file)
+        except json.JSONDecodeError:
+            return {}
+
+    def _write_to_file(self) -> None:
+        if not self._path.parent.is_dir():
+            return
+
+        temp_path = self._path.with_suffix(".tmp")
+
+        with open(temp_path, "w") as file:
+            file.write(json.dumps(self._entries))
+
+        os.replace(temp_path, self._path)
+
+    def _get_entries(self) -> dict[str, QueryCacheEntry]:
+        """
+        Entries are ordered from least to most recently used.
+        """
+        if self._entries is None:
+            self._entries = self._read_from_file()
+
+        return self._entries
+
+    def _use_entry(self, key: str) -> QueryCacheEntry | None:
+        entries = self._get_entries()
+        entry = entries.pop(key, None)
+
+        if entry is not None:
+            entries[key] = entry
+
+        return entry
+
+    def get_entry(
+        self,
+        repository_id: str,
+        query_string: str,
+        limit: int | None = None,
+        scope: str | None = None,
+    ) -> QueryCacheEntry | None:
+        entry = self._use_entry(
+            QueryCache._get_key(repository_id, query_string, limit, scope)
+        )
+
+        if entry is not None:
+            self._write_to_file()
+
+        return entry
+
+    def get_many(
+        self,
+        repository_id: str,
+        query_strings: Iterable[str],
+        revision: int | None = None,
+    ) -> dict[str, list[dict]]:
+        """
+        Returns the cached matches of each of [query_strings] that is
+        cached, at [revision] if it is given, writing the cache to disk
+        once for all of them.
+        """
+        cached_matches = {}
+
+        for query_string in query_strings:
+            entry = self._use_entry(QueryCache._get_key(repository_id, query_string))
+
+            if entry is not None and revision in (None, entry.get("revision")):
+                cached_matches[query_string] = entry["matches"]
+
+        if cached_matches:
+            self._write_to_file()
+
+        return cached_matches
+
+    def get(
+        self, repository_id: str, query_string: str, revision: int | None = None
+    ) -> list[dict] | None:
+        return self.get_many(repository_id, [query_string], revision).get(query_string)
+
+    def set_many(
+        self,
+        repository_id: str,
+        matches: dict[str, list[dict]],
+        revision: int | None = None,
+        etags: dict[str, str | None] | None = None,
+        limit: int | None = None,
+        scope: str | None = None,
+    ) -> None:
+        """
+        Caches the matches of each query string in [matches] at
+        [revision], along with its validator in [etags], writing the
+        cache to disk once for all of them. Matches of queries limited
+        to [limit] matches or to [scope] are cached apart from the
+        matches of unlimited ones.
+        """
+        if not matches:
+            return
+
+        entries = self._get_entries()
+
+        for query_string, query_matches in matches.items():
+            key = QueryCache._get_key(repository_id, query_string, limit, scope)
+            entries.pop(key, None)
+            entries[key] = {
+                "matches": query_matches,
+                "file_paths": sorted({match["path"] for match in query_matches}),
+                "size_bytes": len(json.dumps(query_matches)),
+                "revision": revision,
+                "etag": (etags or {}).get(query_string),
+            }
+
+        size_bytes = sum(entry["size_bytes"] for entry in entries.values())
+
+        while entries and size_bytes > config.INSIGHT_QUERY_CACHE_MAX_SIZE_BYTES:
+            size_bytes -= entries.pop(next(iter(entries)))["size_bytes"]
+
+        self._write_to_file()
+
+    def set(
+        self,
+        repository_id: str,
+        query_string: str,
+        matches: list[dict],
+        revision: int | None = None,
+        etag: str | None = None,
+        limit: int | None = None,
+        scope: str | None = None,
+    ) -> None:
+        self.set_many(
+            repository_id,
+            {query_string: matches},
+            revision,
+            {query_string: etag},
+            limit,
+            scope,
+        )
+
+    def evict(self, file_paths: Iterable[Path | str]) -> None:
+        """
+        Evicts every entry with a match in one of [file_paths].
+        """
+        file_paths = {str(file_path) for file_path in file_paths}
+        entries = self._get_entries()
+        evicted_keys = [
+            key
+            for key, entry in entries.items()
+            if not file_paths.isdisjoint(entry["file_paths"])
+        ]
+
+        if not evicted_keys:
+            return
+
+        for key in evicted_keys:
+            del entries[key]
+
+        self._write_to_file()
+
+    def clear(self) -> None:
+        self._entries = {}
+
+        if self._path.is_file():
+            os.remove(self._path)
@@ -0,0 +1,132 @@
+from pathlib import Path
+import json, os, re
+
+
+class PathNotInRepositoryError(ValueError):
+    def __init__(self, path: str):
+        self.message = f"{path} is not in the insight repository"
+        super().__init__(self.message)
+
+
+class QueryScope:
+    """
+    Restricts a query to the files under [path] and matching [glob],
+    both relative to the repository. Only the directory that contains
+    every file in scope is scanned when syncing before the query, and
+    only the tracked files in scope are scored by the server.
+    """
+
+    _GLOB_MAGIC_CHARS = ("*", "?", "[")
+
+    @staticmethod
+    def _get_glob_regex(glob: str) -> re.Pattern:
+        """
+        ** matches any number of directories, while * and ? match
+        within a single one.
+        """
+        regex = ""
+
+        for part in re.split(r"(\*\*/|\*\*|\*|\?)", glob):
+            match part:
+                case "**/":
+                    regex += "(?:.*/)?"
+                case "**":
+                    regex += ".*"
+                case "*":
+                    regex += "[^/]*"
+                case "?":
+                    regex += "[^/]"
+                case _:
+                    regex += re.escape(part)
+
+        return re.compile(regex)
+
+    @staticmethod
+    def _normalize(repository_path: Path, path: str) -> str:
+        relative_path = os.path.relpath(
+            os.path.abspath(repository_path / path), os.path.abspath(repository_path)
+        )
+
+        if relative_path == os.pardir or relative_path.startswith(os.pardir + os.sep):
+            raise PathNotInRepositoryError(path)
+
+        return Path(relative_path).as_posix()
+
+    def __init__(
+        self, repository_path: Path, path: str | None = None, glob: str | None = None
+    ):
+        if path is None and glob is None:
+            raise ValueError("a query scope needs a path, a glob or both")
+
+        self._repository_path = repository_path
+        self._path = (
+            QueryScope._normalize(repository_path, path) if path is not None else "."
+        )
+        self._glob = glob.removeprefix("./") if glob is not None else None
+        self._glob_regex = (
+            QueryScope._get_glob_regex(self._glob) if self._glob is not None else None
+        )
+
+    @staticmethod
+    def from_predicate(predicate: dict) -> "QueryScope":
+        return QueryScope(
+            Path(predicate["repository_path"]), predicate["path"], predicate["glob"]
+        )
+
+    @property
+    def predicate(self) -> dict:
+        """
+        The path and glob of the scope, which a server can evaluate
+        against the files of the repository with from_predicate, so
+        that the files in scope need not be listed in a query.
+        """
+        return {
+            "repository_path": str(self._repository_path),
+            "path": self._path,
+            "glob": self._glob,
+        }
+
+    @property
+    def key(self) -> str:
+        return json.dumps([self._path, self._glob])
+
+    @property
+    def root_path(self) -> Path:
+        """
+        The deepest directory that contains every file in scope.
+        """
+        root_parts = [] if self._path == "." else self._path.split("/")
+
+        if self._glob is not None:
+            glob_parts = self._glob.split("/")[:-1]
+            glob_root_parts = []
+
+            for part in glob_parts:
+                if any(char in part for char in QueryScope._GLOB_MAGIC_CHARS):
+                    break
+
+                glob_root_parts.append(part)
+
+            if len(glob_root_parts) > len(root_parts):
+                root_parts = glob_root_parts
+
+        root_path = self._repository_path.joinpath(*root_parts)
+
+        if root_path.is_file():
+            return root_path.parent
+
+        return root_path
+
+    def contains(self, file_path: Path) -> bool:
+        relative_path = Path(
+            os.path.relpath(file_path, self._repository_path)
+        ).as_posix()
+
+        if self._path != "." and not (
+            relative_path == self._path or relative_path.startswith(self._path + "/")
+        ):
+            return False
+
+        return self._glob_regex is None or bool(
+            self._glob_regex.fullmatch(relative_path)
+        )
@@ -1,14 +1,23 @@
+from http import HTTPStatus
 from pathlib import Path
+from typing import Callable, Iterator
+import concurrent.futures, contextlib, json, os, requests, stat, threading, time
 
+from insight_cli import config
 from insight_cli.api import (
+    API,
+    IncompleteUploadError,
     InitializeRepositoryAPI,
     QueryRepositoryAPI,
+    QueryResult,
     ReinitializeRepositoryAPI,
+    Response,
     UninitializeRepositoryAPI,
 )
 from insight_cli.utils import Directory, FileChangesDetector
 from .manager import Manager
 from .pattern_ignorer import PatternIgnorer
+from .query_scope import QueryScope
 
 
 class InvalidRepositoryError(Exception):
@@ -23,7 +32,9 @@ class Repository:
         self._path = path
         self._manager = Manager(path)
         self._pattern_ignorer = PatternIgnorer(path)
-        self._is_valid = self._manager.is_valid
+        self._is_valid: bool | None = None
+        self._pending_sync: concurrent.futures.Future | None = None
+        self._sync_lock = threading.Lock()
 
     @property
     def _id(self) -> str:
@@ -31,17 +42,76 @@ class Repository:
 
     @property
     def is_valid(self) -> bool:
+        """
+        Validated on first use, so that commands that do not need a
+        valid repository never wait on the server to validate it.
+        """
+        if self._is_valid is None:
+            self._is_valid = self._manager.is_valid
+
         return self._is_valid
 
     @property
     def path(self) -> Path:
         return self._path
 
+    @property
+    def is_synced(self) -> bool:
+        return self._pending_sync is None or self._pending_sync.done()
+
     def _raise_for_invalid_repository(self) -> None:
         if not self.is_valid:
             raise InvalidRepositoryError(self._path)
 
+    @staticmethod
+    def _is_unknown_repository_error(e: BaseException | None) -> bool:
+        while e is not None:
+            if (
+                isinstance(e, requests.HTTPError)
+                and e.response is not None
+                and e.response.status_code == HTTPStatus.NOT_FOUND
+            ):
+                return True
+
+            e = e.__cause__
+
+        return False
+
+    @staticmethod
+    def _is_unreachable_server_error(e: BaseException | None) -> bool:
+        while e is not None:
+            if isinstance(e, (requests.ConnectionError, requests.Timeout)):
+                return True
+
+            e = e.__cause__
+
+        return False
+
+    @contextlib.contextmanager
+    def _revalidate_on_unknown_repository(self) -> Iterator[None]:
+        """
+        A cached validation may be stale, so a server that does not
+        know the repository causes it to be validated again. The
+        original error is raised if the repository is still valid.
+        """
+        try:
+            yield
+
+        except Exception as e:
+            if not Repository._is_unknown_repository_error(e):
+                raise
+
+            self._manager.invalidate()
+            self._is_valid = None
+
+            if not self.is_valid:
+                raise InvalidRepositoryError(self._path) from e
+
+            raise
+
     def initialize(self) -> None:
+        API.warm_up()
+
         repository_dir: Directory = Directory(
             path=self._path,
             ignorable_regex_patterns=self._pattern_ignorer.regex_patterns,
@@ -49,51 +119,448 @@ class Repository:
         )
 
         response_data: dict[str, str] = InitializeRepositoryAPI.make_request(
-            repository_dir.file_paths_to_content
+            repository_dir.file_paths_to_size,
+            self._manager.upload_journal,
+            self._manager.chunk_index,
         )
 
-        self._manager.create(response_data["repository_id"], repository_dir.file_paths)
+        self._manager.create(
+            response_data["repository_id"],
+            repository_dir.file_paths,
+            repository_dir.file_stats,
+        )
 
         self._is_valid = True
 
-    def reinitialize(self) -> None:
+    def reinitialize(self, scope: QueryScope | None = None) -> None:
+        """
+        If [scope] is given, only the files in it are scanned and
+        synced. Syncs never run concurrently, so one started while a
+        background sync is running waits for it to finish.
+        """
         self._raise_for_invalid_repository()
 
+        with self._sync_lock:
+            self._reinitialize(scope)
+
+    def _reinitialize(self, scope: QueryScope | None) -> None:
+        API.warm_up()
+
         repository_dir: Directory = Directory(
             path=self._path,
             ignorable_regex_patterns=self._pattern_ignorer.regex_patterns,
             allowed_file_extensions=self._allowed_file_extensions,
+            scope_path=scope.root_path if scope is not None else None,
+        )
+        self._sync_journaled_changes(
+            repository_dir, scope.root_path if scope is not None else self._path
+        )
+        previous_file_versions = self._manager.tracked_file_versions
+        current_file_versions = repository_dir.file_versions
+
+        if scope is not None:
+            previous_file_versions = {
+                path: version
+                for path, version in previous_file_versions.items()
+                if scope.contains(path)
+            }
+            current_file_versions = {
+                path: version
+                for path, version in current_file_versions.items()
+                if scope.contains(path)
+            }
+
+        self._sync_changes(
+            FileChangesDetector(
+                previous_file_versions=previous_file_versions,
+                current_file_versions=current_file_versions,
+                current_file_stats=repository_dir.file_stats,
+            )
+        )
+
+    @staticmethod
+    def _get_journaled_file_stats(
+        journaled_file_paths: list[Path],
+        repository_dir: Directory,
+        scanned_dir_path: Path,
+    ) -> dict[Path, os.stat_result]:
+        """
+        Journaled files under [scanned_dir_path] take their stat results
+        from the scan of [repository_dir], and the others are stat'ed
+        once each. A journaled file that no longer exists has no stat
+        result, so it is synced as deleted.
+        """
+        journaled_file_stats = {}
+
+        for path in journaled_file_paths:
+            if path.is_relative_to(scanned_dir_path):
+                if path in repository_dir.file_stats:
+                    journaled_file_stats[path] = repository_dir.file_stats[path]
+
+                continue
+
+            try:
+                file_stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+
+            if stat.S_ISREG(file_stat.st_mode):
+                journaled_file_stats[path] = file_stat
+
+        return journaled_file_stats
+
+    def _sync_journaled_changes(
+        self, repository_dir: Directory, scanned_dir_path: Path
+    ) -> None:
+        """
+        Syncs the changes journaled while the server was unreachable
+        before the changes found by the scan, so that journaled files
+        outside a scoped scan are synced too.
+        """
+        journaled_file_paths = self._manager.sync_journal.file_paths
+
+        if not journaled_file_paths:
+            return
+
+        tracked_file_versions = self._manager.tracked_file_versions
+        journaled_file_stats = Repository._get_journaled_file_stats(
+            journaled_file_paths, repository_dir, scanned_dir_path
         )
 
-        file_changes_detector = FileChangesDetector(
-            previous_file_modified_times=self._manager.tracked_file_modified_times,
-            current_file_modified_times=repository_dir.file_modified_times,
+        self._sync_changes(
+            FileChangesDetector(
+                previous_file_versions={
+                    path: tracked_file_versions[path]
+                    for path in journaled_file_paths
+                    if path in tracked_file_versions
+                },
+                current_file_versions={
+                    path: FileChangesDetector.get_file_version(file_stat)
+                    for path, file_stat in journaled_file_stats.items()
+                },
+                current_file_stats=journaled_file_stats,
+            )
         )
+        self._manager.sync_journal.clear()
 
+    def _sync_changes(self, file_changes_detector: FileChangesDetector) -> None:
+        """
+        Changes that are not uploaded because the server is unreachable
+        are journaled, to be synced first by the next sync.
+        """
         if file_changes_detector.no_files_changes_exist:
             return
 
-        ReinitializeRepositoryAPI.make_request(
-            repository_id=self._id,
-            repository_file_changes=file_changes_detector.file_changes,
+        self._manager.query_cache.evict(
+            path
+            for paths in file_changes_detector.file_path_changes.values()
+            for path in paths
         )
 
-        self._manager.update(file_changes_detector.file_path_changes)
+        try:
+            with self._revalidate_on_unknown_repository():
+                ReinitializeRepositoryAPI.make_request(
+                    repository_id=self._id,
+                    repository_file_changes=file_changes_detector.file_size_changes,
+                    upload_journal=self._manager.upload_journal,
+                    chunk_index=self._manager.chunk_index,
+                )
+
+        except IncompleteUploadError as e:
+            self._manager.update(
+                {
+                    change: [
+                        path for path in paths if str(path) in e.acknowledged_file_paths
+                    ]
+                    for change, paths in file_changes_detector.file_path_changes.items()
+                },
+                file_changes_detector.current_file_stats,
+            )
+
+            if Repository._is_unreachable_server_error(e):
+                self._manager.sync_journal.append(
+                    path
+                    for paths in file_changes_detector.file_path_changes.values()
+                    for path in paths
+                    if str(path) not in e.acknowledged_file_paths
+                )
+
+            raise
+
+        except requests.RequestException as e:
+            if Repository._is_unreachable_server_error(e):
+                self._manager.sync_journal.append(
+                    path
+                    for paths in file_changes_detector.file_path_changes.values()
+                    for path in paths
+                )
+
+            raise
+
+        self._manager.update(
+            file_changes_detector.file_path_changes,
+            file_changes_detector.current_file_stats,
+        )
 
         self._is_valid = True
 
     def uninitialize(self) -> None:
         self._raise_for_invalid_repository()
 
-        UninitializeRepositoryAPI.make_request(self._id)
+        with self._revalidate_on_unknown_repository():
+            UninitializeRepositoryAPI.make_request(self._id)
 
         self._manager.delete()
 
         self._is_valid = False
 
-    def query(self, query_string: str) -> list[dict]:
+    def sync(
+        self, timeout_seconds: float | None = None, scope: QueryScope | None = None
+    ) -> bool:
+        """
+        Reinitializes the repository, or only the files in [scope],
+        waiting at most [timeout_seconds] for it to finish. A sync that
+        takes longer carries on in the background, and False is
+        returned until wait_for_sync is called.
+        """
+        self._raise_for_invalid_repository()
+
+        if timeout_seconds is None:
+            self.reinitialize(scope)
+            return True
+
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self._pending_sync = executor.submit(self.reinitialize, scope)
+        executor.shutdown(wait=False)
+
+        concurrent.futures.wait([self._pending_sync], timeout=timeout_seconds)
+
+        if not self.is_synced:
+            return False
+
+        self.wait_for_sync()
+
+        return True
+
+    def wait_for_sync(self) -> None:
+        """
+        Waits for a background sync to finish, raising its error if it
+        failed.
+        """
+        if self._pending_sync is None:
+            return
+
+        pending_sync, self._pending_sync = self._pending_sync, None
+        pending_sync.result()
+
+    def query(
+        self,
+        query_string: str,
+        sync_timeout_seconds: float | None = None,
+        limit: int | None = None,
+        scope: QueryScope | None = None,
+    ) -> list[dict]:
+        return list(self.query_stream(query_string, sync_timeout_seconds, limit, scope))
+
+    def _get_cached_matches(
+        self,
+        query_string: str,
+        revision: int,
+        limit: int | None,
+        scope: QueryScope | None,
+    ) -> list[dict] | None:
+        """
+        The top [limit] matches can also be taken from the cached
+        matches of the unlimited query.
+        """
+        for entry_limit in [None] if limit is None else [limit, None]:
+            entry = self._manager.query_cache.get_entry(
+                self._id,
+                query_string,
+                entry_limit,
+                scope.key if scope is not None else None,
+            )
+
+            if entry is not None and entry.get("revision") == revision:
+                return entry["matches"][:limit]
+
+        return None
+
+    def _has_scoped_files(self, scope: QueryScope | None) -> bool:
+        return scope is None or any(
+            scope.contains(path) for path in self._manager.tracked_file_versions
+        )
+
+    def _stream_matches(
+        self,
+        query_string: str,
+        revision: int,
+        limit: int | None,
+        scope: QueryScope | None,
+        etag: str | None = None,
+        on_response: Callable[[Response], None] | None = None,
+    ) -> Iterator[dict]:
+        """
+        Unlimited matches are revalidated with [etag], while limited
+        ones are fetched a page at a time. [scope] is sent as a
+        predicate for the server to evaluate.
+        """
+        scope_predicate = scope.predicate if scope is not None else None
+
+        if limit is None:
+            return QueryRepositoryAPI.stream_request(
+                self._id,
+                query_string,
+                latency_history=self._manager.latency_history,
+                revision=revision,
+                etag=etag,
+                on_response=on_response,
+                scope=scope_predicate,
+            )
+
+        return QueryRepositoryAPI.stream_top_matches(
+            self._id,
+            query_string,
+            limit,
+            latency_history=self._manager.latency_history,
+            revision=revision,
+            scope=scope_predicate,
+        )
+
+    def query_stream(
+        self,
+        query_string: str,
+        sync_timeout_seconds: float | None = None,
+        limit: int | None = None,
+        scope: QueryScope | None = None,
+    ) -> Iterator[dict]:
+        """
+        Yields matches as they arrive from the server, or only the top
+        [limit] of them, which the server sends a page at a time. If
+        [scope] is given, only its files are synced and queried.
+        Matches are only cached once every match has arrived, and not
+        at all if they are too large for the cache. Unlimited matches
+        cached at an earlier revision are revalidated with the server,
+        which does not send them again if they are unchanged. If the
+        repository does not sync within [sync_timeout_seconds], the
+        query runs against its last synced state, bypassing the cache,
+        and is_synced stays False. That state is read before the sync
+        starts, since a sync still running in the background changes
+        it.
+        """
+        self._raise_for_invalid_repository()
+
+        revision = self._manager.revision
+        has_scoped_files = self._has_scoped_files(scope)
+        is_synced = self.sync(sync_timeout_seconds, scope)
+
+        if is_synced:
+            revision = self._manager.revision
+            has_scoped_files = self._has_scoped_files(scope)
+
+        if not has_scoped_files:
+            return
+
+        if not is_synced:
+            with self._revalidate_on_unknown_repository():
+                yield from self._stream_matches(query_string, revision, limit, scope)
+
+            return
+
+        scope_key = scope.key if scope is not None else None
+        cached_matches = self._get_cached_matches(query_string, revision, limit, scope)
+
+        if cached_matches is not None:
+            yield from cached_matches
+            return
+
+        entry = (
+            self._manager.query_cache.get_entry(self._id, query_string, scope=scope_key)
+            if limit is None
+            else None
+        )
+        is_not_modified, etag = False, None
+
+        def on_response(response: Response) -> None:
+            nonlocal is_not_modified, etag
+            is_not_modified = response.status_code == HTTPStatus.NOT_MODIFIED
+            etag = response.headers.get("ETag")
+
+        matches, matches_size_bytes = [], 0
+
+        with self._revalidate_on_unknown_repository():
+            for match in self._stream_matches(
+                query_string,
+                revision,
+                limit,
+                scope,
+                etag=entry.get("etag") if entry is not None else None,
+                on_response=on_response,
+            ):
+                yield match
+
+                if matches is None:
+                    continue
+
+                matches.append(match)
+                matches_size_bytes += len(json.dumps(match))
+
+                if matches_size_bytes > config.INSIGHT_QUERY_CACHE_MAX_SIZE_BYTES:
+                    matches = None
+
+        if is_not_modified and entry is not None:
+            matches = entry["matches"]
+            yield from matches
+
+        if matches is not None:
+            self._manager.query_cache.set(
+                self._id, query_string, matches, revision, etag, limit, scope_key
+            )
+
+    def query_batch(self, query_strings: list[str]) -> Iterator[QueryResult]:
+        """
+        Syncs the repository once and then runs [query_strings]
+        concurrently, yielding each result, tagged with the index of
+        its query string, as soon as it completes. Cached results are
+        yielded first.
+        """
         self._raise_for_invalid_repository()
 
         self.reinitialize()
 
-        return QueryRepositoryAPI.make_request(self._id, query_string)
+        revision = self._manager.revision
+        started_at = time.perf_counter()
+        cached_matches = self._manager.query_cache.get_many(
+            self._id, query_strings, revision
+        )
+        latency_seconds = (time.perf_counter() - started_at) / max(
+            len(query_strings), 1
+        )
+        uncached_queries = []
+
+        for i, query_string in enumerate(query_strings):
+            if query_string not in cached_matches:
+                uncached_queries.append((i, query_string))
+                continue
+
+            yield {
+                "index": i,
+                "query_string": query_string,
+                "matches": cached_matches[query_string],
+                "error": None,
+                "latency_seconds": latency_seconds,
+            }
+
+        matches = {}
+
+        try:
+            for result in QueryRepositoryAPI.make_requests(
+                self._id, uncached_queries, revision=revision
+            ):
+                if result["error"] is None:
+                    matches[result["query_string"]] = result["matches"]
+
+                yield result
+
+        finally:
+            self._manager.query_cache.set_many(self._id, matches, revision)
@@ -0,0 +1,50 @@
+from pathlib import Path
+import json, os, threading
+
+
+class RevisionTracker:
+    """
+    Counts the changes committed to a repository. The revision only
+    ever increases, so the server can tell whether a repeated query is
+    against unchanged content. The revision file is replaced
+    atomically, so it is never read half written, and increments are
+    serialized so that two syncs never commit the same revision.
+    """
+
+    _FILE_NAME = "revision.json"
+
+    def __init__(self, parent_dir_path: Path):
+        self._path = parent_dir_path / RevisionTracker._FILE_NAME
+        self._lock = threading.Lock()
+
+    def _write_to_file(self, revision: int) -> None:
+        if not self._path.parent.is_dir():
+            return
+
+        temp_path = self._path.with_suffix(".tmp")
+
+        with open(temp_path, "w") as file:
+            file.write(json.dumps({"revision": revision}))
+
+        os.replace(temp_path, self._path)
+
+    @property
+    def revision(self) -> int:
+        if not self._path.is_file():
+            return 0
+
+        try:
+            with open(self._path, "r") as file:
+                return json.load(file)["revision"]
+        except (json.JSONDecodeError, KeyError):
+            return 0
+
+    def create(self) -> None:
+        self._write_to_file(0)
+
+    def increment(self) -> int:
+        with self._lock:
+            revision = self.revision + 1
+            self._write_to_file(revision)
+
+        return revision
@@ -0,0 +1,60 @@
+from pathlib import Path
+from typing import Iterable
+import json, os
+
+
+class SyncJournal:
+    """
+    Journals the files whose changes could not be synced because the
+    server was unreachable, so that the next sync uploads them first,
+    without scanning the repository for them again. Only the path of
+    each changed file is journaled, and its change is determined when
+    it is synced, so repeated edits to a file collapse into a single
+    upload and a file added and then deleted is not uploaded at all.
+    """
+
+    _FILE_NAME = "sync_journal.json"
+
+    def __init__(self, parent_dir_path: Path):
+        self._path = parent_dir_path / SyncJournal._FILE_NAME
+
+    def _read_from_file(self) -> list[str]:
+        if not self._path.is_file():
+            return []
+
+        try:
+            with open(self._path, "r") as file:
+                return json.load(file)
+        except json.JSONDecodeError:
+            return []
+
+    def _write_to_file(self, file_paths: set[str]) -> None:
+        if not self._path.parent.is_dir():
+            return
+
+        if not file_paths:
+            if self._path.is_file():
+                os.remove(self._path)
+
+            return
+
+        temp_path = self._path.with_suffix(".tmp")
+
+        with open(temp_path, "w") as file:
+            file.write(json.dumps(sorted(file_paths)))
+
+        os.replace(temp_path, self._path)
+
+    @property
+    def file_paths(self) -> list[Path]:
+        return [Path(file_path) for file_path in self._read_from_file()]
+
+    def append(self, file_paths: Iterable[Path | str]) -> None:
+        journaled_file_paths = set(self._read_from_file())
+        new_file_paths = {str(file_path) for file_path in file_paths}
+
+        if not new_file_paths <= journaled_file_paths:
+            self._write_to_file(journaled_file_paths | new_file_paths)
+
+    def clear(self) -> None:
+        self._write_to_file(set())
@@ -0,0 +1 @@
+from .local_server import LocalServer
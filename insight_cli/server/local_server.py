@@ -0,0 +1,676 @@
+from email.parser import BytesParser
+from email.policy import HTTP
+from http import HTTPStatus
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Iterable
+import argparse, base64, gzip, hashlib, json, os, re, secrets, socket, socketserver, threading
+
+from insight_cli.repository import QueryScope
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class LocalServerState:
+    """
+    The in-memory state of a LocalServer. File contents are kept in a
+    content-addressed store shared by every repository, so uploads can
+    be skipped for content the server has already seen.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.content_store: dict[str, bytes] = {}
+        self.repositories: dict[str, dict[str, bytes]] = {}
+        self.sessions: dict[str, dict] = {}
+        self._add_content(b"")
+
+    @staticmethod
+    def _create_session(repository_id: str | None = None) -> dict:
+        return {
+            "repository_id": repository_id or secrets.token_hex(12),
+            "manifest": None,
+            "chunks": {},
+            "changes": {},
+            "batch_indexes": set(),
+            "num_total_batches": None,
+        }
+
+    def _add_content(self, content: bytes) -> str:
+        content_hash = hashlib.sha256(content).hexdigest()
+        self.content_store[content_hash] = content
+        return content_hash
+
+    def create_session(
+        self,
+        manifest: dict[str, str],
+        repository_id: str | None = None,
+        session_id: str | None = None,
+    ) -> tuple[str, list[str]]:
+        """
+        Adds [manifest] to the session [session_id], creating the session
+        if it does not exist yet, so that a manifest can be sent in
+        slices.
+        """
+        with self.lock:
+            session_id = session_id or secrets.token_hex()
+            session = self.sessions.setdefault(
+                session_id, LocalServerState._create_session(repository_id)
+            )
+            session["manifest"] = {**(session["manifest"] or {}), **manifest}
+            missing_content_hashes = sorted(
+                set(manifest.values()) - set(self.content_store)
+            )
+
+        return session_id, missing_content_hashes
+
+    def add_batch(
+        self,
+        session_id: str,
+        batch: dict,
+        repository_id: str | None = None,
+    ) -> dict | None:
+        """
+        Records an upload batch and returns the completed session once
+        every batch of the session has been received.
+        """
+        with self.lock:
+            session = self.sessions.setdefault(
+                session_id, LocalServerState._create_session(repository_id)
+            )
+
+            for file_path, chunk in batch["files"].items():
+                file_chunks = session["chunks"].setdefault(
+                    file_path, [None] * chunk["num_total_chunks"]
+                )
+                file_chunks[chunk["chunk_index"]] = chunk["content"]
+
+            session["changes"].update(batch.get("changes", {}))
+            session["batch_indexes"].add(batch["batch_index"])
+            session["num_total_batches"] = batch["num_total_batches"]
+
+            if len(session["batch_indexes"]) < session["num_total_batches"]:
+                return session
+
+            del self.sessions[session_id]
+            session["files"] = {
+                file_path: b"".join(file_chunks)
+                for file_path, file_chunks in session["chunks"].items()
+            }
+
+            for content in session["files"].values():
+                self._add_content(content)
+
+            session["is_complete"] = True
+            return session
+
+    def _resolve_content(self, session: dict, file_path: str) -> bytes | None:
+        file_chunks = session["chunks"].get(file_path)
+
+        if file_chunks is None:
+            return self.content_store[session["manifest"][file_path]]
+
+        if None in file_chunks:
+            return None
+
+        return b"".join(file_chunks)
+
+    def initialize(self, session: dict) -> None:
+        with self.lock:
+            file_paths = {**(session["manifest"] or {}), **session["files"]}
+            self.repositories[session["repository_id"]] = {
+                file_path: self._resolve_content(session, file_path)
+                for file_path in file_paths
+            }
+
+    def apply_deltas(
+        self, repository_id: str, file_deltas: dict[str, dict]
+    ) -> list[str]:
+        """
+        Applies each file delta whose base version is the repository's
+        current version of the file and returns the file paths of the
+        deltas that were not applied. A delta that was already applied
+        is not applied again.
+        """
+        conflicting_file_paths = []
+
+        with self.lock:
+            repository = self.repositories[repository_id]
+
+            for file_path, file_delta in file_deltas.items():
+                base_content = repository.get(file_path)
+                base_content_hash = (
+                    hashlib.sha256(base_content).hexdigest()
+                    if base_content is not None
+                    else None
+                )
+
+                if base_content_hash == file_delta["content_hash"]:
+                    continue
+
+                if base_content_hash != file_delta["base_content_hash"]:
+                    conflicting_file_paths.append(file_path)
+                    continue
+
+                content = b"".join(
+                    (
+                        base_content[instruction[1] : instruction[2]]
+                        if instruction[0] == "copy"
+                        else base64.b64decode(instruction[1])
+                    )
+                    for instruction in file_delta["instructions"]
+                )
+
+                if hashlib.sha256(content).hexdigest() != file_delta["content_hash"]:
+                    conflicting_file_paths.append(file_path)
+                    continue
+
+                repository[file_path] = content
+                self._add_content(content)
+
+        return conflicting_file_paths
+
+    def reinitialize(self, session: dict) -> None:
+        """
+        Applies every change of [session] whose content has been fully
+        received, so acknowledged batches take effect even if the rest
+        of the session never arrives.
+        """
+        with self.lock:
+            repository = self.repositories[session["repository_id"]]
+
+            for file_path, change in list(session["changes"].items()):
+                if change == "delete":
+                    repository.pop(file_path, None)
+
+                else:
+                    content = self._resolve_content(session, file_path)
+
+                    if content is None:
+                        continue
+
+                    repository[file_path] = content
+
+                del session["changes"][file_path]
+
+
+class LocalServerRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "LocalServer"
+
+    _CONTENT_ENCODINGS = ["gzip", "identity"] + (["zstd"] if zstandard else [])
+    _NDJSON_MEDIA_TYPE = "application/x-ndjson"
+    _MSGPACK_MEDIA_TYPE = "application/msgpack"
+    _MULTIPART_MEDIA_TYPE = "multipart/form-data"
+    _MEDIA_TYPES = ["application/json"] + (
+        [_MSGPACK_MEDIA_TYPE] if msgpack is not None else []
+    )
+
+    class _UnsupportedContentEncodingError(Exception):
+        pass
+
+    class _UnsupportedMediaTypeError(Exception):
+        pass
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+    def _get_response_media_type(self) -> str:
+        """
+        Returns the supported media type the client prefers, by the
+        quality values in its Accept header.
+        """
+        accepted_media_types = []
+
+        for i, accepted in enumerate(self.headers.get("Accept", "").split(",")):
+            media_type, _, params = accepted.partition(";")
+            quality = re.search(r"q=([0-9.]+)", params)
+            accepted_media_types.append(
+                (-float(quality[1]) if quality else -1.0, i, media_type.strip())
+            )
+
+        for *_, media_type in sorted(accepted_media_types):
+            if media_type in LocalServerRequestHandler._MEDIA_TYPES:
+                return media_type
+
+        return "application/json"
+
+    def _send_json(
+        self,
+        status: HTTPStatus,
+        data: Any = None,
+        headers: dict[str, str] | None = None,
+    ) -> None:
+        """
+        Sends [data] as MessagePack to clients that prefer it, and as
+        JSON otherwise.
+        """
+        media_type = self._get_response_media_type()
+
+        if data is None:
+            content = b""
+        elif media_type == LocalServerRequestHandler._MSGPACK_MEDIA_TYPE:
+            content = msgpack.packb(data)
+        else:
+            content = json.dumps(data).encode("utf-8")
+
+        self.send_response(status)
+
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+
+        self.send_header("Content-Type", media_type)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def _send_ndjson(
+        self, items: Iterable[Any], headers: dict[str, str] | None = None
+    ) -> None:
+        """
+        Sends each item as a line of JSON in its own chunk, so that
+        clients can process items as they arrive.
+        """
+        self.send_response(HTTPStatus.OK)
+
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+
+        self.send_header("Content-Type", LocalServerRequestHandler._NDJSON_MEDIA_TYPE)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        for item in items:
+            line = json.dumps(item).encode("utf-8") + b"\n"
+            self.wfile.write(f"{len(line):x}\r\n".encode("latin-1") + line + b"\r\n")
+            self.wfile.flush()
+
+        self.wfile.write(b"0\r\n\r\n")
+
+    def end_headers(self) -> None:
+        """
+        Advertises the content codings that request bodies may be
+        compressed with (RFC 7694), and the media types they may be
+        sent in, on every response.
+        """
+        self.send_header(
+            "Accept-Encoding", ", ".join(LocalServerRequestHandler._CONTENT_ENCODINGS)
+        )
+        self.send_header(
+            "Accept-Post",
+            ", ".join(
+                [
+                    *LocalServerRequestHandler._MEDIA_TYPES,
+                    LocalServerRequestHandler._MULTIPART_MEDIA_TYPE,
+                ]
+            ),
+        )
+        super().end_headers()
+
+    def _send_unsupported_media_type(self, accept_encoding: bool) -> None:
+        self.send_response(HTTPStatus.UNSUPPORTED_MEDIA_TYPE)
+
+        if not accept_encoding:
+            self.send_header(
+                "Accept", ", ".join(LocalServerRequestHandler._MEDIA_TYPES)
+            )
+
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _read_content(self) -> bytes:
+        content = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        match self.headers.get("Content-Encoding", "identity"):
+            case "identity":
+                return content
+            case "gzip":
+                return gzip.decompress(content)
+            case "zstd" if zstandard is not None:
+                return zstandard.ZstdDecompressor().decompress(content)
+            case _:
+                raise LocalServerRequestHandler._UnsupportedContentEncodingError
+
+    def _parse_multipart(self, content: bytes) -> dict:
+        message = BytesParser(policy=HTTP).parsebytes(
+            f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode("utf-8")
+            + content
+        )
+        parts = {
+            part.get_param("name", header="content-disposition"): part.get_payload(
+                decode=True
+            )
+            for part in message.iter_parts()
+        }
+        data = json.loads(parts["metadata"])
+
+        for chunk in data.get("files", {}).values():
+            chunk["content"] = parts[chunk["content"]]
+
+        return data
+
+    def _read_body(self) -> dict:
+        content = self._read_content()
+        content_type = self.headers.get("Content-Type", "application/json")
+
+        if content_type.startswith(LocalServerRequestHandler._MULTIPART_MEDIA_TYPE):
+            return self._parse_multipart(content)
+
+        is_msgpack = content_type.startswith(
+            LocalServerRequestHandler._MSGPACK_MEDIA_TYPE
+        )
+
+        if is_msgpack and msgpack is not None:
+            data = msgpack.unpackb(content) if content else {}
+
+        elif content_type.startswith("application/json"):
+            data = json.loads(content or b"{}")
+
+        else:
+            raise LocalServerRequestHandler._UnsupportedMediaTypeError
+
+        for chunk in data.get("files", {}).values():
+            if isinstance(chunk, dict) and isinstance(chunk.get("content"), str):
+                chunk["content"] = base64.b64decode(chunk["content"])
+
+        return data
+
+    @property
+    def _session_id(self) -> str | None:
+        cookie = SimpleCookie(self.headers.get("Cookie", ""))
+        return cookie["session_id"].value if "session_id" in cookie else None
+
+    def _handle(self, method: str) -> None:
+        route = getattr(self, f"_{method}_{self.path.strip('/')}", None)
+
+        if route is None:
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            self._send_json(HTTPStatus.NOT_FOUND)
+            return
+
+        try:
+            body = self._read_body()
+        except LocalServerRequestHandler._UnsupportedContentEncodingError:
+            self._send_unsupported_media_type(accept_encoding=True)
+            return
+        except LocalServerRequestHandler._UnsupportedMediaTypeError:
+            self._send_unsupported_media_type(accept_encoding=False)
+            return
+
+        try:
+            route(body)
+        except KeyError:
+            self._send_json(HTTPStatus.BAD_REQUEST)
+
+    def do_HEAD(self) -> None:
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self) -> None:
+        self._handle("get")
+
+    def do_POST(self) -> None:
+        self._handle("post")
+
+    def do_PUT(self) -> None:
+        self._handle("put")
+
+    def do_DELETE(self) -> None:
+        self._handle("delete")
+
+    def _post_validate_repository_id(self, body: dict) -> None:
+        self._send_json(
+            HTTPStatus.OK,
+            {
+                "repository_id_is_valid": body["repository_id"]
+                in self.server.state.repositories
+            },
+        )
+
+    def _post_initialize_repository_manifest(self, body: dict) -> None:
+        session_id, missing_content_hashes = self.server.state.create_session(
+            body["files"], session_id=self._session_id
+        )
+        self._send_json(
+            HTTPStatus.OK,
+            {
+                "session_id": session_id,
+                "missing_content_hashes": missing_content_hashes,
+            },
+        )
+
+    def _post_initialize_repository(self, body: dict) -> None:
+        session = self.server.state.add_batch(self._session_id, body)
+
+        if session.get("is_complete"):
+            self.server.state.initialize(session)
+
+        self._send_json(HTTPStatus.OK, {"repository_id": session["repository_id"]})
+
+    def _put_reinitialize_repository_manifest(self, body: dict) -> None:
+        if body["repository_id"] not in self.server.state.repositories:
+            self._send_json(HTTPStatus.NOT_FOUND)
+            return
+
+        session_id, missing_content_hashes = self.server.state.create_session(
+            body["files"], body["repository_id"]
+        )
+        self._send_json(
+            HTTPStatus.OK,
+            {
+                "session_id": session_id,
+                "missing_content_hashes": missing_content_hashes,
+            },
+        )
+
+    def _put_reinitialize_repository(self, body: dict) -> None:
+        repository_id = body["repository_id"]
+
+        if repository_id not in self.server.state.repositories:
+            self._send_json(HTTPStatus.NOT_FOUND)
+            return
+
+        session = self.server.state.add_batch(
+            self._session_id or repository_id, body, repository_id
+        )
+        self.server.state.reinitialize(session)
+
+        self._send_json(HTTPStatus.OK)
+
+    def _put_reinitialize_repository_delta(self, body: dict) -> None:
+        repository_id = body["repository_id"]
+
+        if repository_id not in self.server.state.repositories:
+            self._send_json(HTTPStatus.NOT_FOUND)
+            return
+
+        self._send_json(
+            HTTPStatus.OK,
+            {
+                "conflicting_file_paths": self.server.state.apply_deltas(
+                    repository_id, body["files"]
+                )
+            },
+        )
+
+    def _delete_uninitialize_repository(self, body: dict) -> None:
+        with self.server.state.lock:
+            self.server.state.repositories.pop(body["repository_id"], None)
+
+        self._send_json(HTTPStatus.OK)
+
+    def _get_query_repository(self, body: dict) -> None:
+        """
+        The ETag of a response is a hash of its matches, so a repeated
+        query whose matches have not changed is answered with 304 Not
+        Modified. The revision sent by the client is not needed, since
+        every query is searched afresh. A query with a limit is answered
+        with a page of at most that many matches, starting at the offset
+        in its cursor, and the cursor of the next page if there is one.
+        A query with a scope only searches the files in it.
+        """
+        repository = self.server.state.repositories.get(body["repository_id"])
+
+        if repository is None:
+            self._send_json(HTTPStatus.NOT_FOUND)
+            return
+
+        if body.get("scope") is not None:
+            scope = QueryScope.from_predicate(body["scope"])
+            repository = {
+                file_path: content
+                for file_path, content in repository.items()
+                if scope.contains(Path(file_path))
+            }
+
+        matches = LocalServer.search(repository, body["query_string"])
+        headers = {}
+
+        if body.get("limit") is not None:
+            offset = int(body.get("cursor") or 0)
+            next_offset = offset + body["limit"]
+
+            if next_offset < len(matches):
+                headers["X-Next-Cursor"] = str(next_offset)
+
+            matches = matches[offset:next_offset]
+
+        etag = f'"{hashlib.sha256(json.dumps(matches).encode("utf-8")).hexdigest()}"'
+        headers["ETag"] = etag
+
+        if etag in self.headers.get("If-None-Match", ""):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header("ETag", etag)
+            self.end_headers()
+
+        elif LocalServerRequestHandler._NDJSON_MEDIA_TYPE in self.headers.get(
+            "Accept", ""
+        ):
+            self._send_ndjson(matches, headers)
+        else:
+            self._send_json(HTTPStatus.OK, matches, headers)
+
+
+class LocalServer(ThreadingHTTPServer):
+    """
+    A stand-in for the insight API that runs in-process, so the CLI
+    can be exercised end to end without network access. Queries are
+    answered with a keyword search instead of a semantic one.
+    """
+
+    daemon_threads = True
+    _POLL_INTERVAL_SECONDS = 0.05
+
+    @staticmethod
+    def search(repository: dict[str, bytes], query_string: str) -> list[dict]:
+        query_terms = set(re.findall(r"[a-z0-9]+", query_string.lower()))
+        matches = []
+
+        for file_path, content in sorted(repository.items()):
+            lines = content.decode("utf-8", errors="replace").splitlines()
+
+            for i, line in enumerate(lines, start=1):
+                score = len(
+                    query_terms & set(re.findall(r"[a-z0-9]+", line.lower()))
+                )
+
+                if score:
+                    matches.append(
+                        {
+                            "path": file_path,
+                            "start_line": i,
+                            "end_line": i,
+                            "content": line.strip(),
+                            "score": score,
+                        }
+                    )
+
+        matches.sort(key=lambda match: match["score"], reverse=True)
+
+        return [
+            {key: value for key, value in match.items() if key != "score"}
+            for match in matches
+        ]
+
+    def __init__(
+        self, host: str = "127.0.0.1", port: int = 0, socket_path: str | None = None
+    ):
+        """
+        Listens on a Unix domain socket at [socket_path] if it is
+        given, and on [host] and [port] otherwise.
+        """
+        if socket_path is not None:
+            self.address_family = socket.AF_UNIX
+
+        super().__init__(
+            socket_path if socket_path is not None else (host, port),
+            LocalServerRequestHandler,
+        )
+        self.state = LocalServerState()
+        self._thread: threading.Thread | None = None
+
+    def server_bind(self) -> None:
+        if self.address_family != socket.AF_UNIX:
+            super().server_bind()
+            return
+
+        socketserver.TCPServer.server_bind(self)
+        self.server_name, self.server_port = "localhost", 0
+
+    @property
+    def url(self) -> str:
+        if self.address_family == socket.AF_UNIX:
+            return f"unix://{self.server_address}"
+
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "LocalServer":
+        self._thread = threading.Thread(
+            target=self.serve_forever,
+            args=(LocalServer._POLL_INTERVAL_SECONDS,),
+            daemon=True,
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+        if self.address_family == socket.AF_UNIX:
+            os.remove(self.server_address)
+
+    def __enter__(self) -> "LocalServer":
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="insight local stand-in server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument(
+        "--socket", help="listen on a unix domain socket instead of host and port"
+    )
+    arguments = parser.parse_args()
+
+    with LocalServer(arguments.host, arguments.port, arguments.socket) as server:
+        print(f"insight local server listening on {server.url}")
+        server._thread.join()
+
+
+if __name__ == "__main__":
+    main()
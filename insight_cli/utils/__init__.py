@@ -1,5 +1,9 @@
 from .color import Color
+from .deadline import Deadline, DeadlineExceededError
 from .directory import Directory
-from .file_changes_detector import FileChangesDetector
+from .file import File
+from .file_changes_detector import FileChangesDetector, FileVersion
 from .file_chunkifier import FileChunkifier
 from .chunked_file_encoder import ChunkedFileEncoder
+from .content_defined_chunkifier import ContentDefinedChunkifier
+from .positive_int import PositiveInt
@@ -3,13 +3,19 @@ import base64
 
 class ChunkedFileEncoder:
     @staticmethod
-    def encode_with_metadata(file_content_chunks: list[bytes]) -> list[dict]:
-        return [
-            {
-                "content": base64.b64encode(file_content_chunk).decode("utf-8"),
-                "size_bytes": len(file_content_chunk),
-                "chunk_index": i,
-                "num_total_chunks": len(file_content_chunks),
-            }
-            for i, file_content_chunk in enumerate(file_content_chunks)
-        ]
+    def encode_chunk_with_metadata(
+        file_content_chunk: bytes,
+        chunk_index: int,
+        num_total_chunks: int,
+        as_base64: bool = True,
+    ) -> dict:
+        return {
+            "content": (
+                base64.b64encode(file_content_chunk).decode("utf-8")
+                if as_base64
+                else memoryview(file_content_chunk)
+            ),
+            "size_bytes": len(file_content_chunk),
+            "chunk_index": chunk_index,
+            "num_total_chunks": num_total_chunks,
+        }
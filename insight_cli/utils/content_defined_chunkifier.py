@@ -0,0 +1,185 @@
+import hashlib
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class ContentDefinedChunkifier:
+    """
+    Splits content into chunks with FastCDC, a gear-based rolling hash
+    that places chunk boundaries by content rather than by offset. An
+    edit therefore only changes the chunks around it, and every other
+    chunk, and its hash, is the same before and after the edit.
+
+    Chunks are between a quarter and four times the average chunk size.
+    Normalized chunking makes a boundary harder to find before the
+    average size and easier after it, keeping chunk sizes close to the
+    average.
+
+    When numpy is installed, the gear hash of every position is
+    computed at once, which finds the same boundaries as hashing byte
+    by byte in Python but many times faster.
+    """
+
+    _GEAR = tuple(
+        int.from_bytes(hashlib.sha256(bytes([byte])).digest()[:8], "big")
+        for byte in range(256)
+    )
+    _HASH_MASK = 2**64 - 1
+    _HASH_WINDOW_SIZE_BYTES = 64
+    _HASH_BLOCK_SIZE_BYTES = 64 * 1024
+    _NORMALIZATION_LEVEL = 2
+
+    @staticmethod
+    def _get_mask(num_bits: int) -> int:
+        """
+        The most significant bits of the gear hash depend on the last
+        64 bytes, while its least significant bits only depend on the
+        last few, so boundaries are found on the most significant bits.
+        """
+        return ((1 << num_bits) - 1) << (64 - num_bits)
+
+    @staticmethod
+    def _get_window_fingerprints(content: bytes) -> "numpy.ndarray":
+        """
+        Returns the gear hash of the 64 bytes ending at every position
+        of [content], which is the gear hash at that position once at
+        least 64 bytes have been hashed, since older bytes are shifted
+        out of it. The window is doubled in each step, adding the hash
+        of the preceding window shifted past the current one, and
+        uint64 arithmetic wraps as the hash mask does. Content is hashed
+        in blocks that fit in the CPU cache.
+        """
+        gear = numpy.array(ContentDefinedChunkifier._GEAR, dtype=numpy.uint64)
+        window_size_bytes = ContentDefinedChunkifier._HASH_WINDOW_SIZE_BYTES
+        content = numpy.frombuffer(content, dtype=numpy.uint8)
+        window_fingerprints = numpy.empty(len(content), dtype=numpy.uint64)
+
+        for block_start in range(
+            0, len(content), ContentDefinedChunkifier._HASH_BLOCK_SIZE_BYTES
+        ):
+            block_end = block_start + ContentDefinedChunkifier._HASH_BLOCK_SIZE_BYTES
+            history_start = max(block_start - window_size_bytes + 1, 0)
+            fingerprints = gear[content[history_start:block_end]]
+            num_hashed_bytes = 1
+
+            while num_hashed_bytes < window_size_bytes:
+                fingerprints[num_hashed_bytes:] += fingerprints[
+                    :-num_hashed_bytes
+                ] << numpy.uint64(num_hashed_bytes)
+                num_hashed_bytes *= 2
+
+            window_fingerprints[block_start:block_end] = fingerprints[
+                block_start - history_start :
+            ]
+
+        return window_fingerprints
+
+    @staticmethod
+    def _find_boundary(
+        content: bytes,
+        start: int,
+        end: int,
+        min_chunk_size_bytes: int,
+        average_chunk_size_bytes: int,
+        window_fingerprints: "numpy.ndarray | None" = None,
+    ) -> int:
+        """
+        Hashes byte by byte until the hash covers a whole window, and
+        looks the boundary up in [window_fingerprints] from there on, if
+        they are given.
+        """
+        if end - start <= min_chunk_size_bytes:
+            return end
+
+        num_bits = average_chunk_size_bytes.bit_length() - 1
+        strict_mask = ContentDefinedChunkifier._get_mask(
+            num_bits + ContentDefinedChunkifier._NORMALIZATION_LEVEL
+        )
+        loose_mask = ContentDefinedChunkifier._get_mask(
+            num_bits - ContentDefinedChunkifier._NORMALIZATION_LEVEL
+        )
+        gear, hash_mask = (
+            ContentDefinedChunkifier._GEAR,
+            ContentDefinedChunkifier._HASH_MASK,
+        )
+        normal_end = min(start + average_chunk_size_bytes, end)
+        hashed_end = (
+            end
+            if window_fingerprints is None
+            else min(
+                start
+                + min_chunk_size_bytes
+                + ContentDefinedChunkifier._HASH_WINDOW_SIZE_BYTES
+                - 1,
+                end,
+            )
+        )
+        fingerprint = 0
+
+        for i in range(start + min_chunk_size_bytes, min(normal_end, hashed_end)):
+            fingerprint = ((fingerprint << 1) + gear[content[i]]) & hash_mask
+
+            if not fingerprint & strict_mask:
+                return i + 1
+
+        for i in range(normal_end, hashed_end):
+            fingerprint = ((fingerprint << 1) + gear[content[i]]) & hash_mask
+
+            if not fingerprint & loose_mask:
+                return i + 1
+
+        if window_fingerprints is None:
+            return end
+
+        for range_start, range_end, mask in [
+            (hashed_end, normal_end, strict_mask),
+            (max(hashed_end, normal_end), end, loose_mask),
+        ]:
+            if range_start < range_end:
+                (boundaries,) = numpy.nonzero(
+                    window_fingerprints[range_start:range_end] & numpy.uint64(mask) == 0
+                )
+
+                if boundaries.size:
+                    return range_start + int(boundaries[0]) + 1
+
+        return end
+
+    @staticmethod
+    def chunkify_content(
+        content: bytes, average_chunk_size_bytes: int
+    ) -> list[tuple[int, int]]:
+        if average_chunk_size_bytes < 64 or average_chunk_size_bytes & (
+            average_chunk_size_bytes - 1
+        ):
+            raise ValueError(
+                f"Invalid average chunk size: {average_chunk_size_bytes}, "
+                "must be a power of two of at least 64"
+            )
+
+        min_chunk_size_bytes = average_chunk_size_bytes // 4
+        max_chunk_size_bytes = average_chunk_size_bytes * 4
+        window_fingerprints = (
+            ContentDefinedChunkifier._get_window_fingerprints(content)
+            if numpy is not None
+            else None
+        )
+        chunk_ranges = []
+        start = 0
+
+        while start < len(content):
+            end = ContentDefinedChunkifier._find_boundary(
+                content,
+                start,
+                min(start + max_chunk_size_bytes, len(content)),
+                min_chunk_size_bytes,
+                average_chunk_size_bytes,
+                window_fingerprints,
+            )
+            chunk_ranges.append((start, end))
+            start = end
+
+        return chunk_ranges
@@ -0,0 +1,84 @@
+from typing import Any, Awaitable
+import asyncio, requests, time
+
+
+class DeadlineExceededError(requests.Timeout):
+    def __init__(self, timeout_seconds: float):
+        self.message = f"the command did not finish within {timeout_seconds:g} seconds"
+        super().__init__(self.message)
+
+
+class Deadline:
+    """
+    The time by which the running command must finish. Every network
+    call limits its own timeouts to the time remaining, and every long
+    scan checks it as it goes, so that a single budget bounds all of
+    the work a command does.
+    """
+
+    _timeout_seconds: float | None = None
+    _expires_at: float | None = None
+
+    @staticmethod
+    def start(timeout_seconds: float | None) -> None:
+        if timeout_seconds is not None and timeout_seconds <= 0:
+            raise ValueError(f"{timeout_seconds} must be a positive number of seconds")
+
+        Deadline._timeout_seconds = timeout_seconds
+        Deadline._expires_at = (
+            time.monotonic() + timeout_seconds if timeout_seconds is not None else None
+        )
+
+    @staticmethod
+    def clear() -> None:
+        Deadline.start(None)
+
+    @staticmethod
+    def get_remaining_seconds() -> float | None:
+        if Deadline._expires_at is None:
+            return None
+
+        return max(Deadline._expires_at - time.monotonic(), 0.0)
+
+    @staticmethod
+    def is_expired() -> bool:
+        return Deadline.get_remaining_seconds() == 0
+
+    @staticmethod
+    def limit(timeout_seconds: float | None) -> float | None:
+        """
+        Returns the lesser of [timeout_seconds] and the time remaining,
+        where None means no limit.
+        """
+        remaining_seconds = Deadline.get_remaining_seconds()
+
+        if remaining_seconds is None:
+            return timeout_seconds
+
+        if timeout_seconds is None:
+            return remaining_seconds
+
+        return min(timeout_seconds, remaining_seconds)
+
+    @staticmethod
+    def raise_if_expired() -> None:
+        if Deadline.is_expired():
+            raise DeadlineExceededError(Deadline._timeout_seconds)
+
+    @staticmethod
+    async def wait_for(
+        awaitable: Awaitable,
+        timeout_seconds: float | None,
+        timeout_error_type: type[requests.Timeout] = requests.Timeout,
+    ) -> Any:
+        """
+        Awaits [awaitable] for at most [timeout_seconds], limited to the
+        time remaining. Raises DeadlineExceededError if the deadline is
+        reached first and [timeout_error_type] otherwise.
+        """
+        try:
+            return await asyncio.wait_for(awaitable, Deadline.limit(timeout_seconds))
+
+        except asyncio.TimeoutError as e:
+            Deadline.raise_if_expired()
+            raise timeout_error_type(e) from e
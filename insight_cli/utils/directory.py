@@ -1,9 +1,9 @@
-from concurrent.futures import ThreadPoolExecutor
-from datetime import datetime
 from pathlib import Path
 import os
 
+from .deadline import Deadline
 from .file import File
+from .file_changes_detector import FileChangesDetector, FileVersion
 from .string_matcher import StringMatcher
 
 
@@ -13,11 +13,22 @@ class Directory:
         path: Path,
         ignorable_regex_patterns: dict[str, set],
         allowed_file_extensions: set[str],
+        scope_path: Path | None = None,
     ):
+        """
+        If [scope_path] is given, only the subdirectory of [path] at
+        [scope_path] is walked, and nothing is if it or a directory
+        between the two is ignorable.
+        """
         self._path: Path = path
         self._ignorable_regex_patterns = ignorable_regex_patterns
         self._allowed_file_extensions = allowed_file_extensions
-        self._files: list[File] = self._get_files(self._path)
+        self._file_stats: dict[Path, os.stat_result] = (
+            self._get_file_stats(self._path)
+            if scope_path is None
+            else self._get_scoped_file_stats(scope_path)
+        )
+        self._files: list[File] = [File(file_path) for file_path in self._file_stats]
 
     def _entry_path_is_ignorable(self, entry_path: Path, pattern_scope: str) -> bool:
         if pattern_scope == "file":
@@ -29,24 +40,72 @@ class Directory:
             str(entry_path), self._ignorable_regex_patterns[pattern_scope]
         )
 
-    def _get_files(self, dir_path: Path) -> list[File]:
-        files = []
+    def _get_file_stats(self, dir_path: Path) -> dict[Path, os.stat_result]:
+        """
+        Walks [dir_path] in the same order as os.walk, but with
+        os.scandir directly, so that entry types come from the directory
+        listing and each file that is not ignorable is stat'ed exactly
+        once. The stat results are kept so that change detection and
+        tracking never stat the files again. Symbolic links to
+        directories are not followed, and files that vanish during the
+        walk or are broken symbolic links are skipped.
+        """
+        Deadline.raise_if_expired()
+        file_stats = {}
+        subdir_paths = []
+
+        try:
+            with os.scandir(dir_path) as entries:
+                for entry in entries:
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+
+                    if is_dir:
+                        entry_path = dir_path / entry.name
+
+                        if not entry.is_symlink() and not self._entry_path_is_ignorable(
+                            entry_path, "directory"
+                        ):
+                            subdir_paths.append(entry_path)
+
+                        continue
+
+                    # most files are skipped by extension alone, before any
+                    # path is built for them
+                    _, file_extension = os.path.splitext(entry.name)
+
+                    if file_extension not in self._allowed_file_extensions:
+                        continue
+
+                    entry_path = dir_path / entry.name
 
-        for root, directories, file_names in os.walk(dir_path):
-            root_path = Path(root)
+                    if not self._entry_path_is_ignorable(entry_path, "file"):
+                        try:
+                            file_stats[entry_path] = entry.stat()
+                        except OSError:
+                            continue
 
-            directories[:] = [
-                directory
-                for directory in directories
-                if not self._entry_path_is_ignorable(root_path / directory, "directory")
-            ]
+        except OSError:
+            return {}
 
-            for file_name in file_names:
-                file_path = root_path / file_name
-                if not self._entry_path_is_ignorable(file_path, "file"):
-                    files.append(File(file_path))
+        for subdir_path in subdir_paths:
+            file_stats.update(self._get_file_stats(subdir_path))
 
-        return files
+        return file_stats
+
+    def _get_scoped_file_stats(self, scope_path: Path) -> dict[Path, os.stat_result]:
+        scope_dir_paths = [scope_path, *scope_path.parents]
+        scope_dir_paths = scope_dir_paths[: scope_dir_paths.index(self._path)]
+
+        if any(
+            self._entry_path_is_ignorable(dir_path, "directory")
+            for dir_path in scope_dir_paths
+        ):
+            return {}
+
+        return self._get_file_stats(scope_path)
 
     @property
     def files(self) -> list[File]:
@@ -57,16 +116,19 @@ class Directory:
         return [file.path for file in self._files]
 
     @property
-    def file_modified_times(self) -> dict[Path, datetime]:
+    def file_stats(self) -> dict[Path, os.stat_result]:
+        return self._file_stats
+
+    @property
+    def file_versions(self) -> dict[Path, FileVersion]:
         return {
-            file_path: datetime.fromtimestamp(os.path.getmtime(file_path))
-            for file_path in self.file_paths
+            file_path: FileChangesDetector.get_file_version(file_stat)
+            for file_path, file_stat in self._file_stats.items()
         }
 
     @property
-    def file_paths_to_content(self) -> dict[str, bytes]:
-        with ThreadPoolExecutor() as executor:
-            path_content_pairs = executor.map(
-                lambda file: (file.path, file.content), self._files
-            )
-            return {str(path): content for path, content in path_content_pairs}
+    def file_paths_to_size(self) -> dict[str, int]:
+        return {
+            str(file_path): file_stat.st_size
+            for file_path, file_stat in self._file_stats.items()
+        }
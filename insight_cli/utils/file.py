@@ -1,8 +1,9 @@
 from pathlib import Path
-import functools
+import functools, hashlib, os
 
 
 class File:
+    _HASH_BLOCK_SIZE_BYTES = 1024**2
     _instances: dict[Path, "File"] = {}
 
     def __new__(cls, path: Path):
@@ -31,3 +32,31 @@ class File:
 
         with open(self._path, "rb") as file:
             return file.read()
+
+    @property
+    def size(self) -> int:
+        if not self._path.is_file():
+            return 0
+
+        return os.path.getsize(self._path)
+
+    def read(self, start: int, end: int) -> bytes:
+        if not self._path.is_file():
+            return b""
+
+        with open(self._path, "rb") as file:
+            file.seek(start)
+            return file.read(end - start)
+
+    @property
+    def content_hash(self) -> str:
+        content_hash = hashlib.sha256()
+
+        if not self._path.is_file():
+            return content_hash.hexdigest()
+
+        with open(self._path, "rb") as file:
+            while block := file.read(File._HASH_BLOCK_SIZE_BYTES):
+                content_hash.update(block)
+
+        return content_hash.hexdigest()
@@ -1,50 +1,90 @@
-from datetime import datetime
 from pathlib import Path
-import concurrent, functools
+import functools, os
 
 from .file import File
 
+FileVersion = tuple[int, int | None]
+
 
 class FileChangesDetector:
+    """
+    Detects changed files by their version, the modified time in
+    nanoseconds and the inode of each file. A file replaced by another
+    one, such as by a rename over it, has a different inode even if its
+    modified time is unchanged.
+    """
+
+    _LEGACY_MODIFIED_TIME_TOLERANCE_NS = 1000
+
+    @staticmethod
+    def get_file_version(file_stat: os.stat_result) -> FileVersion:
+        return file_stat.st_mtime_ns, file_stat.st_ino
+
+    @staticmethod
+    def _is_same_version(
+        previous_file_version: FileVersion, current_file_version: FileVersion
+    ) -> bool:
+        """
+        Versions tracked before inodes were have no inode, and a
+        modified time converted from float seconds, which is only
+        accurate to within a microsecond.
+        """
+        previous_modified_time_ns, previous_inode = previous_file_version
+
+        if previous_inode is None:
+            return (
+                abs(previous_modified_time_ns - current_file_version[0])
+                < FileChangesDetector._LEGACY_MODIFIED_TIME_TOLERANCE_NS
+            )
+
+        return previous_file_version == current_file_version
+
     @staticmethod
-    def _get_file_content(change, path) -> tuple[str, bytes]:
+    def _get_file_size(
+        change, path, file_stats: dict[Path, os.stat_result] | None = None
+    ) -> tuple[str, int]:
         match change:
-            case "add":
-                content = File(path).content
-            case "update":
-                content = File(path).content
+            case "add" | "update":
+                size = (
+                    file_stats[path].st_size
+                    if file_stats is not None and path in file_stats
+                    else File(path).size
+                )
             case "delete":
-                content = b""
+                size = 0
             case _:
                 raise ValueError(f"Invalid change: {change}")
 
-        return str(path), content
+        return str(path), size
 
     def __init__(
         self,
-        previous_file_modified_times: dict[Path, datetime],
-        current_file_modified_times: dict[Path, datetime],
+        previous_file_versions: dict[Path, FileVersion],
+        current_file_versions: dict[Path, FileVersion],
+        current_file_stats: dict[Path, os.stat_result] | None = None,
     ):
         """
         Initializes with immutable dictionaries for file paths and
-        modification times. Once provided, these dictionaries remain
+        versions. Once provided, these dictionaries remain
         unmodifiable to facilitate caching in the file_path_changes
-        mechanism.
+        mechanism. The sizes of changed files are taken from
+        [current_file_stats] when given, instead of stat'ing them again.
         """
-        self._previous_file_modified_times: dict[
-            Path, datetime
-        ] = previous_file_modified_times
-        self._current_file_modified_times: dict[
-            Path, datetime
-        ] = current_file_modified_times
+        self._previous_file_versions: dict[Path, FileVersion] = previous_file_versions
+        self._current_file_versions: dict[Path, FileVersion] = current_file_versions
+        self._current_file_stats = current_file_stats
+
+    @property
+    def current_file_stats(self) -> dict[Path, os.stat_result] | None:
+        return self._current_file_stats
 
     @property
     def _current_file_paths(self) -> set[Path]:
-        return set(self._current_file_modified_times.keys())
+        return set(self._current_file_versions.keys())
 
     @property
     def _previous_file_paths(self) -> set[Path]:
-        return set(self._previous_file_modified_times.keys())
+        return set(self._previous_file_versions.keys())
 
     @property
     def _added_files(self) -> list[Path]:
@@ -59,8 +99,9 @@ class FileChangesDetector:
         return [
             path
             for path in self._current_file_paths & self._previous_file_paths
-            if self._current_file_modified_times[path]
-            != self._previous_file_modified_times[path]
+            if not FileChangesDetector._is_same_version(
+                self._previous_file_versions[path], self._current_file_versions[path]
+            )
         ]
 
     @property
@@ -73,18 +114,16 @@ class FileChangesDetector:
         }
 
     @property
-    def file_changes(self) -> dict[str, list[tuple[str, bytes]]]:
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            return {
-                change: list(
-                    executor.map(
-                        FileChangesDetector._get_file_content,
-                        [change] * len(paths),
-                        paths,
-                    )
+    def file_size_changes(self) -> dict[str, list[tuple[str, int]]]:
+        return {
+            change: [
+                FileChangesDetector._get_file_size(
+                    change, path, self._current_file_stats
                 )
-                for change, paths in self.file_path_changes.items()
-            }
+                for path in paths
+            ]
+            for change, paths in self.file_path_changes.items()
+        }
 
     @property
     def no_files_changes_exist(self) -> bool:
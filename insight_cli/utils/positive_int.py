@@ -0,0 +1,17 @@
+class PositiveInt(int):
+    """
+    An int of at least 1, such as a number of matches, which can be
+    used as the type of a command option so that anything else is
+    rejected when the option is parsed.
+    """
+
+    def __new__(cls, value: int | str) -> "PositiveInt":
+        try:
+            number = int(value)
+        except ValueError:
+            number = 0
+
+        if number < 1:
+            raise ValueError(f"{value!r} is not a positive integer")
+
+        return super().__new__(cls, number)
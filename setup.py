@@ -12,8 +12,14 @@ def main():
         },
         install_requires=[
             "colorama==0.4.6",
+            "httpx==0.27.0",
             "requests==2.31.0",
         ],
+        extras_require={
+            "msgpack": ["msgpack>=1.0.0"],
+            "numpy": ["numpy>=1.22.0"],
+            "zstd": ["zstandard>=0.22.0"],
+        },
         python_requires=">=3.10.0",
     )
 
@@ -0,0 +1,128 @@
+from unittest.mock import patch, AsyncMock, MagicMock
+import asyncio, requests, unittest
+
+from insight_cli.api import API
+from insight_cli.api.base import AsyncSession, LatencyHistory, RequestBody
+from insight_cli.config import config
+
+
+class TestAPI(unittest.IsolatedAsyncioTestCase):
+    async def test_session_is_shared(self) -> None:
+        self.assertIs(API.session(), API.session())
+
+    async def test_session_is_per_event_loop(self) -> None:
+        session = API.session()
+
+        self.assertIsNot(
+            await asyncio.to_thread(asyncio.run, self._get_session()), session
+        )
+
+    @staticmethod
+    async def _get_session() -> AsyncSession:
+        return API.session()
+
+    def test_run_reuses_event_loop(self) -> None:
+        self.assertIs(API._run(self._get_session()), API._run(self._get_session()))
+
+    @patch.object(AsyncSession, "request", new_callable=AsyncMock)
+    def test_warm_up(self, mock_request) -> None:
+        API.warm_up().result()
+
+        mock_request.assert_called_once_with("HEAD", config.INSIGHT_API_BASE_URL)
+
+    @patch.object(AsyncSession, "request", new_callable=AsyncMock)
+    def test_warm_up_with_connection_error(self, mock_request) -> None:
+        mock_request.side_effect = requests.ConnectionError("error message")
+
+        API.warm_up().result()
+
+        mock_request.assert_called_once()
+
+    @patch.object(AsyncSession, "request", new_callable=AsyncMock)
+    async def test_send(self, mock_request) -> None:
+        mock_request.return_value = MagicMock(status_code=200)
+        body = RequestBody({"files": {}}, "gzip")
+
+        self.assertIs(
+            await API._send("PUT", config.INSIGHT_API_BASE_URL, body),
+            mock_request.return_value,
+        )
+        mock_request.assert_called_once_with(
+            "PUT", config.INSIGHT_API_BASE_URL, data=body.content, headers=body.headers
+        )
+
+    @patch.object(AsyncSession, "request", new_callable=AsyncMock)
+    async def test_send_with_unsupported_content_encoding(self, mock_request) -> None:
+        mock_request.side_effect = [
+            MagicMock(status_code=415, headers={"Accept-Encoding": "identity"}),
+            MagicMock(status_code=200),
+        ]
+        body = RequestBody({"files": {}}, "gzip")
+
+        try:
+            await API._send("PUT", config.INSIGHT_API_BASE_URL, body)
+
+            self.assertEqual(mock_request.call_count, 2)
+            self.assertNotIn(
+                "Content-Encoding", mock_request.call_args.kwargs["headers"]
+            )
+            self.assertEqual(RequestBody.preferred_content_encoding(), "identity")
+
+        finally:
+            RequestBody._accepted_content_encodings = set()
+            RequestBody._rejected_content_encodings = set()
+
+    async def test_hedge_without_latency_history(self) -> None:
+        make_attempt = AsyncMock(return_value="result")
+
+        self.assertEqual(await API._hedge(make_attempt, "endpoint", None), "result")
+        make_attempt.assert_called_once()
+
+    @patch("insight_cli.config.INSIGHT_API_HEDGE_MIN_NUM_LATENCIES", 1)
+    async def test_hedge_with_slow_attempt(self) -> None:
+        latency_history = LatencyHistory()
+        latency_history.record("endpoint", 0.01)
+        attempt_delays_seconds = [1, 0]
+        discarded_results = []
+
+        async def make_attempt() -> float:
+            delay_seconds = attempt_delays_seconds.pop(0)
+            await asyncio.sleep(delay_seconds)
+            return delay_seconds
+
+        async def discard(result: float) -> None:
+            discarded_results.append(result)
+
+        self.assertEqual(
+            await API._hedge(make_attempt, "endpoint", latency_history, discard), 0
+        )
+        self.assertEqual(attempt_delays_seconds, [])
+        self.assertEqual(discarded_results, [])
+        self.assertGreaterEqual(latency_history.get_percentile("endpoint", 100), 0.01)
+
+    @patch("insight_cli.config.INSIGHT_API_HEDGE_MIN_NUM_LATENCIES", 1)
+    async def test_hedge_with_fast_attempt(self) -> None:
+        latency_history = LatencyHistory()
+        latency_history.record("endpoint", 1)
+        make_attempt = AsyncMock(return_value="result")
+
+        self.assertEqual(
+            await API._hedge(make_attempt, "endpoint", latency_history), "result"
+        )
+        make_attempt.assert_called_once()
+
+    @patch("insight_cli.config.INSIGHT_API_HEDGE_MIN_NUM_LATENCIES", 1)
+    async def test_hedge_with_failed_attempts(self) -> None:
+        latency_history = LatencyHistory()
+        latency_history.record("endpoint", 0.01)
+
+        async def make_attempt() -> None:
+            await asyncio.sleep(0.02)
+            raise requests.ConnectionError()
+
+        with self.assertRaises(requests.ConnectionError):
+            await API._hedge(make_attempt, "endpoint", latency_history)
+
+
+if __name__ == "__main__":
+    unittest.main()
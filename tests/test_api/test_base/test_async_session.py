@@ -0,0 +1,375 @@
+from pathlib import Path
+from unittest.mock import patch
+import asyncio, base64, gzip, json, os, requests, tempfile, unittest, zlib
+
+from insight_cli.api.base import AsyncSession
+from insight_cli.utils import Deadline, DeadlineExceededError
+
+
+class TestAsyncSession(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self._responses: list[bytes] = []
+        self._requests: list[bytes] = []
+        self._num_connections = 0
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self._url = "http://127.0.0.1:%d" % self._server.sockets[0].getsockname()[1]
+        self._session = AsyncSession(4)
+
+    async def asyncTearDown(self) -> None:
+        await self._session.close()
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        self._num_connections += 1
+
+        while self._responses:
+            head = await reader.readuntil(b"\r\n\r\n")
+            content_length = next(
+                (
+                    int(line.split(b":")[1])
+                    for line in head.split(b"\r\n")
+                    if line.lower().startswith(b"content-length")
+                ),
+                0,
+            )
+            self._requests.append(head + await reader.readexactly(content_length))
+            response = self._responses.pop(0)
+            writer.write(response)
+            await writer.drain()
+
+            if b"Connection: close" in response:
+                break
+
+        writer.close()
+
+    @staticmethod
+    def _response(content: bytes, headers: str = "") -> bytes:
+        return (
+            f"HTTP/1.1 200 OK\r\nContent-Length: {len(content)}\r\n{headers}\r\n"
+        ).encode("latin-1") + content
+
+    async def test_request(self) -> None:
+        self._responses = [self._response(b'{"a": 1}')]
+
+        response = await self._session.request(
+            "POST", f"{self._url}/path?x=1", json={"b": 2}, cookies={"id": "3"}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"a": 1})
+        self.assertTrue(self._requests[0].startswith(b"POST /path?x=1 HTTP/1.1\r\n"))
+        self.assertIn(b"Cookie: id=3\r\n", self._requests[0])
+        self.assertTrue(self._requests[0].endswith(json.dumps({"b": 2}).encode()))
+
+    async def test_request_with_streamed_data(self) -> None:
+        self._responses = [self._response(b"")]
+
+        class Content:
+            def __iter__(self):
+                return iter([b"ab", memoryview(b"cd")])
+
+            def __len__(self):
+                return 4
+
+        await self._session.request("PUT", self._url, data=Content())
+
+        self.assertIn(b"Content-Length: 4\r\n", self._requests[0])
+        self.assertTrue(self._requests[0].endswith(b"\r\n\r\nabcd"))
+
+    async def test_connections_are_reused(self) -> None:
+        self._responses = [self._response(b"1"), self._response(b"2")]
+
+        await self._session.request("GET", self._url)
+        await self._session.request("GET", self._url)
+
+        self.assertEqual(self._num_connections, 1)
+
+    async def test_closed_connections_are_not_reused(self) -> None:
+        self._responses = [
+            self._response(b"1", "Connection: close\r\n"),
+            self._response(b"2"),
+        ]
+
+        await self._session.request("GET", self._url)
+        response = await self._session.request("GET", self._url)
+
+        self.assertEqual(response.content, b"2")
+        self.assertEqual(self._num_connections, 2)
+
+    async def test_stale_connection_is_replaced(self) -> None:
+        self._responses = [self._response(b"1")]
+        await self._session.request("GET", self._url)
+        self._responses = [self._response(b"2")]
+
+        response = await self._session.request("GET", self._url)
+
+        self.assertEqual(response.content, b"2")
+        self.assertEqual(self._num_connections, 2)
+
+    async def test_chunked_response(self) -> None:
+        self._responses = [
+            b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n"
+            b"3\r\nabc\r\n2;ext=1\r\nde\r\n0\r\n\r\n",
+            self._response(b"f"),
+        ]
+
+        self.assertEqual(
+            (await self._session.request("GET", self._url)).content, b"abcde"
+        )
+        self.assertEqual((await self._session.request("GET", self._url)).content, b"f")
+
+    async def test_gzip_response(self) -> None:
+        self._responses = [
+            self._response(gzip.compress(b"abc"), "Content-Encoding: gzip\r\n")
+        ]
+
+        self.assertEqual(
+            (await self._session.request("GET", self._url)).content, b"abc"
+        )
+
+    async def test_stream_lines(self) -> None:
+        content = gzip.compress(b'{"a": 1}\r\n{"b": 2}\n\n{"c": 3}')
+        self._responses = [
+            b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n"
+            b"Content-Encoding: gzip\r\n\r\n"
+            + b"".join(
+                b"%x\r\n%s\r\n" % (len(content[i : i + 5]), content[i : i + 5])
+                for i in range(0, len(content), 5)
+            )
+            + b"0\r\n\r\n",
+            self._response(b"next"),
+        ]
+
+        async with self._session.stream("GET", self._url) as response:
+            lines = [line async for line in response.iter_lines()]
+
+        self.assertEqual(lines, [b'{"a": 1}', b'{"b": 2}', b'{"c": 3}'])
+        self.assertEqual(
+            (await self._session.request("GET", self._url)).content, b"next"
+        )
+        self.assertEqual(self._num_connections, 1)
+
+    async def test_partially_read_stream_is_not_reused(self) -> None:
+        self._responses = [self._response(b"abc"), self._response(b"next")]
+
+        async with self._session.stream("GET", self._url):
+            pass
+
+        self.assertEqual(
+            (await self._session.request("GET", self._url)).content, b"next"
+        )
+        self.assertEqual(self._num_connections, 2)
+
+    async def test_head_response(self) -> None:
+        self._responses = [
+            b"HTTP/1.1 200 OK\r\nContent-Length: 10\r\n\r\n",
+            self._response(b"abc"),
+        ]
+
+        self.assertEqual((await self._session.request("HEAD", self._url)).content, b"")
+        self.assertEqual(
+            (await self._session.request("GET", self._url)).content, b"abc"
+        )
+
+    async def test_raise_for_status(self) -> None:
+        self._responses = [
+            b"HTTP/1.1 503 Service Unavailable\r\nRetry-After: 3\r\n"
+            b"Content-Length: 0\r\n\r\n"
+        ]
+
+        response = await self._session.request("GET", self._url)
+
+        with self.assertRaises(requests.HTTPError) as context:
+            response.raise_for_status()
+
+        self.assertIs(context.exception.response, response)
+        self.assertEqual(response.headers["retry-after"], "3")
+
+    async def test_connection_error(self) -> None:
+        self._server.close()
+        await self._server.wait_closed()
+
+        with self.assertRaises(requests.ConnectionError):
+            await self._session.request("GET", self._url)
+
+    async def _start_stalled_server(self, response_head: bytes) -> str:
+        async def handle(
+            reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+        ) -> None:
+            await reader.readuntil(b"\r\n\r\n")
+            writer.write(response_head)
+            await asyncio.sleep(1)
+            writer.close()
+
+        server = await asyncio.start_server(handle, "127.0.0.1", 0)
+        self.addAsyncCleanup(server.wait_closed)
+        self.addCleanup(server.close)
+
+        return "http://127.0.0.1:%d" % server.sockets[0].getsockname()[1]
+
+    @patch("insight_cli.config.INSIGHT_API_READ_TIMEOUT_SECONDS", 0.05)
+    async def test_read_timeout(self) -> None:
+        url = await self._start_stalled_server(
+            b"HTTP/1.1 200 OK\r\nContent-Length: 10\r\n\r\n"
+        )
+
+        with self.assertRaises(requests.ReadTimeout):
+            await self._session.request("GET", url)
+
+    async def test_deadline_exceeded(self) -> None:
+        url = await self._start_stalled_server(b"HTTP/1.1 200 OK\r\n")
+        Deadline.start(0.05)
+
+        try:
+            with self.assertRaises(DeadlineExceededError):
+                await self._session.request("GET", url)
+
+        finally:
+            Deadline.clear()
+
+    async def test_unix_socket(self) -> None:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            socket_path = Path(temp_dir) / "insight.sock"
+            server = await asyncio.start_unix_server(self._handle, socket_path)
+            self._responses = [self._response(b'{"a": 1}'), self._response(b"2")]
+
+            try:
+                response = await self._session.request(
+                    "GET", f"unix://{socket_path}/path?x=1"
+                )
+                await self._session.request("GET", f"unix://{socket_path}")
+
+            finally:
+                await self._session.close()
+                server.close()
+                await server.wait_closed()
+
+        self.assertEqual(response.json(), {"a": 1})
+        self.assertTrue(self._requests[0].startswith(b"GET /path?x=1 HTTP/1.1\r\n"))
+        self.assertIn(b"Host: localhost\r\n", self._requests[0])
+        self.assertTrue(self._requests[1].startswith(b"GET / HTTP/1.1\r\n"))
+        self.assertEqual(self._num_connections, 1)
+
+    async def test_unix_socket_without_socket(self) -> None:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with self.assertRaises(requests.ConnectionError):
+                await self._session.request("GET", f"unix://{temp_dir}/insight.sock")
+
+    async def test_truncated_chunked_response(self) -> None:
+        self._responses = [
+            b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n3\r\nabc\r\n"
+        ]
+
+        with self.assertRaises(requests.ConnectionError):
+            await self._session.request("GET", self._url)
+
+    async def test_malformed_status_line(self) -> None:
+        self._responses = [b"HTTP/1.1 abc OK\r\n\r\n"]
+
+        with self.assertRaises(requests.ConnectionError):
+            await self._session.request("GET", self._url)
+
+    async def test_interim_response_is_skipped(self) -> None:
+        self._responses = [b"HTTP/1.1 100 Continue\r\n\r\n" + self._response(b"a")]
+
+        response = await self._session.request("GET", self._url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b"a")
+
+    async def test_http_proxy(self) -> None:
+        self._responses = [self._response(b"a")]
+        proxy = self._url.replace("http://", "http://user:p%40ss@")
+
+        with patch.dict(os.environ, {"HTTP_PROXY": proxy, "NO_PROXY": ""}):
+            response = await self._session.request(
+                "GET", "http://insight.invalid/path?x=1"
+            )
+
+        self.assertEqual(response.content, b"a")
+        self.assertTrue(
+            self._requests[0].startswith(
+                b"GET http://insight.invalid/path?x=1 HTTP/1.1\r\n"
+            )
+        )
+        self.assertIn(
+            b"Proxy-Authorization: Basic " + base64.b64encode(b"user:p@ss"),
+            self._requests[0],
+        )
+
+    async def test_no_proxy(self) -> None:
+        self._responses = [self._response(b"a")]
+
+        with patch.dict(
+            os.environ,
+            {"HTTP_PROXY": "http://insight.invalid", "NO_PROXY": "127.0.0.1"},
+        ):
+            response = await self._session.request("GET", f"{self._url}/path")
+
+        self.assertEqual(response.content, b"a")
+        self.assertTrue(self._requests[0].startswith(b"GET /path HTTP/1.1\r\n"))
+
+    async def test_https_proxy_refuses_tunnel(self) -> None:
+        self._responses = [
+            b"HTTP/1.1 407 Proxy Authentication Required\r\n"
+            b"Content-Length: 0\r\n\r\n"
+        ]
+
+        with patch.dict(os.environ, {"HTTPS_PROXY": self._url, "NO_PROXY": ""}):
+            with self.assertRaises(requests.exceptions.ProxyError):
+                await self._session.request("GET", "https://insight.invalid/path")
+
+        self.assertTrue(
+            self._requests[0].startswith(b"CONNECT insight.invalid:443 HTTP/1.1\r\n")
+        )
+
+    def test_ca_bundle(self) -> None:
+        with patch.dict(
+            os.environ, {"REQUESTS_CA_BUNDLE": "", "CURL_CA_BUNDLE": "/ca.pem"}
+        ):
+            self.assertEqual(AsyncSession._get_ca_bundle(), "/ca.pem")
+
+        with patch.dict(os.environ, {"REQUESTS_CA_BUNDLE": "", "CURL_CA_BUNDLE": ""}):
+            self.assertIs(AsyncSession._get_ca_bundle(), True)
+
+    async def test_redirect_is_followed(self) -> None:
+        self._responses = [
+            b"HTTP/1.1 307 Temporary Redirect\r\nLocation: /moved\r\n"
+            b"Content-Length: 0\r\n\r\n",
+            self._response(b"a"),
+        ]
+
+        response = await self._session.request("POST", f"{self._url}/path", data=b"b")
+
+        self.assertEqual(response.content, b"a")
+        self.assertTrue(self._requests[1].startswith(b"POST /moved HTTP/1.1\r\n"))
+        self.assertTrue(self._requests[1].endswith(b"\r\n\r\nb"))
+
+    async def test_deflate_response(self) -> None:
+        self._responses = [
+            self._response(zlib.compress(b"a" * 100), "Content-Encoding: deflate\r\n")
+        ]
+
+        response = await self._session.request("GET", self._url)
+
+        self.assertEqual(response.content, b"a" * 100)
+
+    async def test_close(self) -> None:
+        self._responses = [self._response(b"a")]
+        await self._session.request("GET", self._url)
+        client = self._session._client
+
+        await self._session.close()
+
+        self.assertTrue(client.is_closed)
+
+    async def test_unsupported_scheme(self) -> None:
+        with self.assertRaises(requests.exceptions.InvalidSchema):
+            await self._session.request("GET", "ftp://127.0.0.1")
+
+
+if __name__ == "__main__":
+    unittest.main()
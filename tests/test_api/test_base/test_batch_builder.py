@@ -0,0 +1,202 @@
+from unittest.mock import patch
+import random, unittest
+
+from insight_cli.api.base import BatchBuilder, MultipartRequestBody, RequestBody
+from insight_cli.utils import ChunkedFileEncoder
+
+
+class TestBatchBuilder(unittest.TestCase):
+    _BASE_REQUEST_BODY = {
+        "files": {},
+        "batch_index": BatchBuilder.MAX_NUM_BATCHES,
+        "num_total_batches": BatchBuilder.MAX_NUM_BATCHES,
+    }
+
+    @staticmethod
+    def _get_wire_size_bytes(batch: dict) -> int:
+        def get_request_body(as_base64: bool) -> dict:
+            return {
+                **TestBatchBuilder._BASE_REQUEST_BODY,
+                **batch,
+                "files": {
+                    file_path: ChunkedFileEncoder.encode_chunk_with_metadata(
+                        bytes(chunk["end"] - chunk["start"]),
+                        chunk["chunk_index"],
+                        chunk["num_total_chunks"],
+                        as_base64,
+                    )
+                    for file_path, chunk in batch["files"].items()
+                },
+            }
+
+        return max(
+            len(RequestBody(get_request_body(True), "identity").content),
+            len(MultipartRequestBody(get_request_body(False), "identity").content),
+        )
+
+    def _build(
+        self, file_sizes: dict[str, int], max_batch_size_bytes: int
+    ) -> list[dict]:
+        batch_builder = BatchBuilder(
+            max_batch_size_bytes, TestBatchBuilder._BASE_REQUEST_BODY
+        )
+
+        for file_path, file_size_bytes in file_sizes.items():
+            batch_builder.add_file(file_path, file_size_bytes)
+
+        return batch_builder.build()
+
+    def test_build_without_files(self) -> None:
+        self.assertEqual(self._build({}, 1024), [])
+
+    def test_batches_fit_on_the_wire(self) -> None:
+        random.seed(0)
+        file_sizes = {
+            f"dir/file_{i}.py": random.choice([0, 1, 10, 100, 1000, 10_000])
+            + random.randrange(100)
+            for i in range(300)
+        }
+
+        batches = self._build(file_sizes, 4096)
+
+        for batch in batches:
+            self.assertLessEqual(self._get_wire_size_bytes(batch), 4096)
+
+    def test_batch_size_is_exact(self) -> None:
+        batch = {
+            "files": {
+                "file1": {
+                    "start": 0,
+                    "end": 500,
+                    "chunk_index": 0,
+                    "num_total_chunks": 1,
+                },
+                "file2": {
+                    "start": 0,
+                    "end": 3,
+                    "chunk_index": 0,
+                    "num_total_chunks": 1,
+                },
+            }
+        }
+        wire_size_bytes = self._get_wire_size_bytes(batch)
+
+        self.assertEqual(
+            self._build({"file1": 500, "file2": 3}, wire_size_bytes), [batch]
+        )
+        self.assertEqual(
+            len(self._build({"file1": 500, "file2": 3}, wire_size_bytes - 1)), 2
+        )
+
+    def test_small_files_are_not_split(self) -> None:
+        file_sizes = {f"file_{i}": 300 + i for i in range(20)}
+
+        batches = self._build(file_sizes, 1024)
+
+        self.assertEqual(
+            sorted(file_path for batch in batches for file_path in batch["files"]),
+            sorted(file_sizes),
+        )
+        for batch in batches:
+            for chunk in batch["files"].values():
+                self.assertEqual(chunk["num_total_chunks"], 1)
+
+    def test_large_files_are_split(self) -> None:
+        batches = self._build({"large_file": 5000, "small_file": 10}, 1024)
+        chunks = sorted(
+            [
+                batch["files"]["large_file"]
+                for batch in batches
+                if "large_file" in batch["files"]
+            ],
+            key=lambda chunk: chunk["chunk_index"],
+        )
+
+        self.assertEqual(chunks[0]["start"], 0)
+        self.assertEqual(chunks[-1]["end"], 5000)
+        for i, chunk in enumerate(chunks):
+            self.assertEqual(chunk["chunk_index"], i)
+            self.assertEqual(chunk["num_total_chunks"], len(chunks))
+            if i > 0:
+                self.assertEqual(chunk["start"], chunks[i - 1]["end"])
+        for batch in batches:
+            self.assertLessEqual(self._get_wire_size_bytes(batch), 1024)
+
+    def test_best_fit_decreasing(self) -> None:
+        file_sizes = {"a": 1000, "b": 4000, "c": 2000, "d": 4000, "e": 2000, "f": 1000}
+        max_batch_size_bytes = self._get_wire_size_bytes(
+            {
+                "files": {
+                    file_path: {
+                        "start": 0,
+                        "end": file_sizes[file_path],
+                        "chunk_index": 0,
+                        "num_total_chunks": 1,
+                    }
+                    for file_path in ["b", "c", "a"]
+                }
+            }
+        )
+
+        batches = self._build(file_sizes, max_batch_size_bytes)
+
+        self.assertEqual(
+            [list(batch["files"]) for batch in batches],
+            [["b", "c", "a"], ["d", "e", "f"]],
+        )
+
+    def test_entry_sizes_are_computed_once(self) -> None:
+        file_sizes = {f"file_{i}": 10 * i for i in range(200)}
+
+        with patch.object(
+            BatchBuilder,
+            "_get_file_size_bytes",
+            wraps=BatchBuilder._get_file_size_bytes,
+        ) as mock_get_file_size_bytes:
+            batches = self._build(file_sizes, 4096)
+
+        self.assertEqual(mock_get_file_size_bytes.call_count, len(file_sizes))
+        self.assertEqual(
+            sorted(file_path for batch in batches for file_path in batch["files"]),
+            sorted(file_sizes),
+        )
+        for batch in batches:
+            self.assertLessEqual(self._get_wire_size_bytes(batch), 4096)
+
+    def test_batches_are_ordered_largest_first(self) -> None:
+        batches = self._build({f"file_{i}": 100 * i for i in range(1, 10)}, 1024)
+
+        wire_sizes_bytes = [self._get_wire_size_bytes(batch) for batch in batches]
+
+        self.assertEqual(wire_sizes_bytes, sorted(wire_sizes_bytes, reverse=True))
+
+    def test_changes(self) -> None:
+        base_request_body = {**TestBatchBuilder._BASE_REQUEST_BODY, "changes": {}}
+        batch_builder = BatchBuilder(1024, base_request_body, includes_changes=True)
+        batch_builder.add_file("file1", 10, "add")
+        batch_builder.add_change("file2", "delete")
+
+        self.assertEqual(
+            batch_builder.build(),
+            [
+                {
+                    "files": {
+                        "file1": {
+                            "start": 0,
+                            "end": 10,
+                            "chunk_index": 0,
+                            "num_total_chunks": 1,
+                        }
+                    },
+                    "changes": {"file1": "add", "file2": "delete"},
+                }
+            ],
+        )
+
+    def test_file_path_too_long_for_a_batch(self) -> None:
+        with self.assertRaises(ValueError):
+            self._build({"f" * 2000: 10}, 1024)
+
+
+if __name__ == "__main__":
+    unittest.main()
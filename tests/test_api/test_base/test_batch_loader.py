@@ -0,0 +1,64 @@
+from unittest.mock import patch
+import threading, unittest
+
+from insight_cli.api.base import BatchLoader, RequestBody
+
+
+class TestBatchLoader(unittest.TestCase):
+    @staticmethod
+    def _batch(i: int) -> dict:
+        return {
+            "batch_index": i,
+            "files": {
+                f"file{i}": {
+                    "start": 0,
+                    "end": 0,
+                    "chunk_index": 0,
+                    "num_total_chunks": 1,
+                }
+            },
+        }
+
+    @staticmethod
+    def _get_request_body(batch: dict) -> dict:
+        return {"files": batch["files"], "batch_index": batch["batch_index"]}
+
+    @patch("insight_cli.config.INSIGHT_API_MULTIPART_UPLOADS", False)
+    def test_load(self) -> None:
+        batches = list(
+            BatchLoader.load(
+                [self._batch(i) for i in range(10)], self._get_request_body
+            )
+        )
+
+        self.assertEqual([batch["batch_index"] for batch in batches], list(range(10)))
+        self.assertTrue(
+            all(isinstance(batch["body"], RequestBody) for batch in batches)
+        )
+
+    @patch("insight_cli.config.INSIGHT_API_MULTIPART_UPLOADS", False)
+    def test_load_reads_batches_lazily(self) -> None:
+        read_batch = BatchLoader._read_batch
+        num_read_batches, lock = 0, threading.Lock()
+
+        def count_read_batch(batch: dict) -> dict:
+            nonlocal num_read_batches
+            with lock:
+                num_read_batches += 1
+            return read_batch(batch)
+
+        with patch.object(BatchLoader, "_read_batch", side_effect=count_read_batch):
+            loaded_batches = BatchLoader.load(
+                (self._batch(i) for i in range(50)), self._get_request_body
+            )
+
+            for num_pulled_batches in range(1, 51):
+                next(loaded_batches)
+                self.assertLessEqual(
+                    num_read_batches - num_pulled_batches,
+                    BatchLoader._NUM_LOAD_WORKERS,
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()
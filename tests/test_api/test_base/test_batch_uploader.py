@@ -0,0 +1,237 @@
+from unittest.mock import AsyncMock, MagicMock, patch
+import asyncio, requests, unittest
+
+from insight_cli.api.base import BatchUploader
+from insight_cli.utils import Deadline, DeadlineExceededError
+
+
+class TestBatchUploader(unittest.IsolatedAsyncioTestCase):
+    @staticmethod
+    def _http_error(status_code: int, headers: dict = {}) -> requests.HTTPError:
+        return requests.HTTPError(
+            response=MagicMock(status_code=status_code, headers=headers)
+        )
+
+    @staticmethod
+    async def _get_batch_index(batch: dict) -> int:
+        return batch["batch_index"]
+
+    async def test_upload(self) -> None:
+        batches = [{"batch_index": i} for i in range(10)]
+
+        self.assertEqual(
+            await BatchUploader(self._get_batch_index).upload(batches),
+            list(range(10)),
+        )
+
+    async def test_upload_consumes_batches_lazily(self) -> None:
+        num_produced_batches = 0
+        max_num_unsent_batches = 0
+        num_sent_batches = 0
+
+        def produce():
+            nonlocal num_produced_batches, max_num_unsent_batches
+            for i in range(50):
+                num_produced_batches += 1
+                max_num_unsent_batches = max(
+                    max_num_unsent_batches, num_produced_batches - num_sent_batches
+                )
+                yield {}
+
+        async def make_batch_request(batch: dict) -> None:
+            nonlocal num_sent_batches
+            await asyncio.sleep(0.001)
+            num_sent_batches += 1
+
+        await BatchUploader(make_batch_request, max_concurrent_requests=4).upload(
+            produce()
+        )
+
+        self.assertEqual(num_sent_batches, 50)
+        self.assertLessEqual(max_num_unsent_batches, 5)
+
+    @patch.object(BatchUploader, "_get_backoff_seconds", return_value=0)
+    async def test_upload_bounds_pending_batches_by_window(self, _) -> None:
+        num_alive_batches, max_num_alive_batches = 0, 0
+        max_num_excess_batches = float("-inf")
+        uploader: BatchUploader
+
+        def produce():
+            nonlocal num_alive_batches, max_num_alive_batches, max_num_excess_batches
+            for i in range(50):
+                num_alive_batches += 1
+                max_num_alive_batches = max(max_num_alive_batches, num_alive_batches)
+                max_num_excess_batches = max(
+                    max_num_excess_batches,
+                    num_alive_batches - uploader._controller.limit,
+                )
+                yield {"batch_index": i}
+
+        async def make_batch_request(batch: dict) -> None:
+            nonlocal num_alive_batches
+            await asyncio.sleep(0.001)
+
+            if batch["batch_index"] % 5 == 0 and not batch.setdefault("retried", False):
+                batch["retried"] = True
+                raise self._http_error(503)
+
+            num_alive_batches -= 1
+
+        uploader = BatchUploader(make_batch_request, max_concurrent_requests=16)
+        await uploader.upload(produce())
+
+        self.assertEqual(num_alive_batches, 0)
+        self.assertLessEqual(max_num_excess_batches, 0)
+        self.assertLess(max_num_alive_batches, 16)
+
+    async def test_upload_with_no_batches(self) -> None:
+        self.assertEqual(await BatchUploader(self._get_batch_index).upload([]), [])
+
+    async def test_upload_respects_max_concurrent_requests(self) -> None:
+        num_in_flight, max_num_in_flight = 0, 0
+
+        async def make_batch_request(batch: dict) -> None:
+            nonlocal num_in_flight, max_num_in_flight
+            num_in_flight += 1
+            max_num_in_flight = max(max_num_in_flight, num_in_flight)
+            await asyncio.sleep(0.01)
+            num_in_flight -= 1
+
+        await BatchUploader(make_batch_request, max_concurrent_requests=3).upload(
+            [{}] * 30
+        )
+
+        self.assertLessEqual(max_num_in_flight, 3)
+
+    def test_get_backoff_seconds(self) -> None:
+        for attempt in range(1, 20):
+            backoff_seconds = BatchUploader._get_backoff_seconds(attempt)
+
+            self.assertGreaterEqual(backoff_seconds, 0)
+            self.assertLessEqual(
+                backoff_seconds,
+                min(
+                    BatchUploader._MAX_BACKOFF_SECONDS,
+                    BatchUploader._INITIAL_BACKOFF_SECONDS * 2 ** (attempt - 1),
+                ),
+            )
+
+    @patch.object(BatchUploader, "_get_backoff_seconds", return_value=0)
+    async def test_upload_retries_transient_errors(
+        self, mock_get_backoff_seconds
+    ) -> None:
+        make_batch_request = AsyncMock(
+            side_effect=[
+                self._http_error(503),
+                requests.ConnectionError(),
+                requests.Timeout(),
+                "result",
+            ]
+        )
+
+        self.assertEqual(
+            await BatchUploader(make_batch_request).upload([{}]), ["result"]
+        )
+        self.assertEqual(make_batch_request.call_count, 4)
+        self.assertEqual(
+            [call.args[0] for call in mock_get_backoff_seconds.call_args_list],
+            [1, 2, 3],
+        )
+
+    async def test_upload_calls_on_batch_uploaded(self) -> None:
+        on_batch_uploaded = MagicMock()
+
+        await BatchUploader(
+            self._get_batch_index, on_batch_uploaded=on_batch_uploaded
+        ).upload([{"batch_index": 0}])
+
+        on_batch_uploaded.assert_called_once_with({"batch_index": 0}, 0)
+
+    @patch.object(BatchUploader, "_get_backoff_seconds", return_value=0)
+    async def test_upload_retries_throttled_batches(self, _) -> None:
+        make_batch_request = AsyncMock(
+            side_effect=[self._http_error(429, {"Retry-After": "0"}), "result"]
+        )
+
+        self.assertEqual(
+            await BatchUploader(make_batch_request).upload([{}]), ["result"]
+        )
+        self.assertEqual(make_batch_request.call_count, 2)
+
+    @patch.object(BatchUploader, "_get_backoff_seconds", return_value=0)
+    async def test_upload_gives_up_on_persistent_throttling(self, _) -> None:
+        make_batch_request = AsyncMock(side_effect=self._http_error(429))
+
+        with self.assertRaises(requests.HTTPError):
+            await BatchUploader(make_batch_request).upload([{}])
+
+        self.assertEqual(make_batch_request.call_count, BatchUploader._MAX_NUM_ATTEMPTS)
+
+    async def test_upload_raises_client_errors(self) -> None:
+        make_batch_request = AsyncMock(side_effect=self._http_error(400))
+
+        with self.assertRaises(requests.HTTPError):
+            await BatchUploader(make_batch_request).upload([{}])
+
+        make_batch_request.assert_called_once()
+
+    @patch.object(BatchUploader, "_get_backoff_seconds", return_value=0)
+    @patch("insight_cli.config.INSIGHT_API_UPLOAD_BATCH_TIMEOUT_SECONDS", 0.01)
+    async def test_upload_retries_batches_past_their_deadline(self, _) -> None:
+        num_attempts = 0
+
+        async def make_batch_request(batch: dict) -> str:
+            nonlocal num_attempts
+            num_attempts += 1
+
+            if num_attempts == 1:
+                await asyncio.sleep(1)
+
+            return "result"
+
+        self.assertEqual(
+            await BatchUploader(make_batch_request).upload([{}]), ["result"]
+        )
+        self.assertEqual(num_attempts, 2)
+
+    @patch.object(BatchUploader, "_get_backoff_seconds", return_value=0)
+    async def test_upload_stops_at_command_deadline(self, _) -> None:
+        async def make_batch_request(batch: dict) -> None:
+            nonlocal num_attempts
+            num_attempts += 1
+            await asyncio.sleep(1)
+
+        num_attempts = 0
+        Deadline.start(0.01)
+
+        try:
+            with self.assertRaises(DeadlineExceededError):
+                await BatchUploader(make_batch_request).upload([{}])
+
+        finally:
+            Deadline.clear()
+
+        self.assertEqual(num_attempts, 1)
+
+    async def test_upload_finishes_in_flight_batches_on_error(self) -> None:
+        on_batch_uploaded = MagicMock()
+
+        async def make_batch_request(batch: dict) -> int:
+            if batch["batch_index"] == 0:
+                raise ValueError("failed batch")
+
+            await asyncio.sleep(0.01)
+            return batch["batch_index"]
+
+        with self.assertRaises(ValueError):
+            await BatchUploader(
+                make_batch_request,
+                max_concurrent_requests=2,
+                on_batch_uploaded=on_batch_uploaded,
+            ).upload([{"batch_index": i} for i in range(10)])
+
+        on_batch_uploaded.assert_called_once_with({"batch_index": 1}, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
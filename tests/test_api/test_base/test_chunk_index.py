@@ -0,0 +1,81 @@
+from pathlib import Path
+from unittest.mock import patch
+import hashlib, tempfile, unittest
+
+from insight_cli.api.base import ChunkIndex
+
+
+class TestChunkIndex(unittest.TestCase):
+    def setUp(self) -> None:
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self._temp_dir_path = Path(self._temp_dir.name)
+
+    def tearDown(self) -> None:
+        self._temp_dir.cleanup()
+
+    def test_get_recipe(self) -> None:
+        content = bytes(range(256)) * 64
+        recipe = ChunkIndex.get_recipe(content)
+
+        self.assertEqual(recipe["content_hash"], hashlib.sha256(content).hexdigest())
+        self.assertEqual(sum(size for _, size in recipe["chunks"]), len(content))
+
+    def test_get_without_recipe(self) -> None:
+        self.assertIsNone(ChunkIndex(self._temp_dir_path).get("file"))
+
+    def test_update(self) -> None:
+        recipe = ChunkIndex.get_recipe(b"content")
+        ChunkIndex(self._temp_dir_path).update({"file": recipe})
+
+        chunk_index = ChunkIndex(self._temp_dir_path)
+        self.assertEqual(
+            chunk_index.get("file")["content_hash"], recipe["content_hash"]
+        )
+
+        chunk_index.update({"file": None})
+        self.assertIsNone(ChunkIndex(self._temp_dir_path).get("file"))
+
+    @patch("insight_cli.config.INSIGHT_DELTA_SYNC_MIN_FILE_SIZE_BYTES", 8)
+    def test_record(self) -> None:
+        (self._temp_dir_path / "large").write_bytes(b"large content")
+        (self._temp_dir_path / "small").write_bytes(b"small")
+        chunk_index = ChunkIndex()
+        chunk_index.update({str(self._temp_dir_path / "small"): {}})
+
+        chunk_index.record(
+            [str(self._temp_dir_path / "large"), str(self._temp_dir_path / "small")]
+        )
+
+        self.assertEqual(
+            chunk_index.get(str(self._temp_dir_path / "large")),
+            ChunkIndex.get_recipe(b"large content"),
+        )
+        self.assertIsNone(chunk_index.get(str(self._temp_dir_path / "small")))
+
+    @patch("insight_cli.config.INSIGHT_DELTA_SYNC_MIN_FILE_SIZE_BYTES", 8)
+    def test_record_with_known_recipes(self) -> None:
+        file_path = str(self._temp_dir_path / "large")
+        (self._temp_dir_path / "large").write_bytes(b"large content")
+        recipe = ChunkIndex.get_recipe(b"large content")
+        chunk_index = ChunkIndex()
+
+        with patch.object(ChunkIndex, "get_recipe") as mock_get_recipe:
+            chunk_index.record([file_path], {file_path: recipe})
+
+        mock_get_recipe.assert_not_called()
+        self.assertEqual(chunk_index.get(file_path), recipe)
+
+    def test_clear(self) -> None:
+        chunk_index = ChunkIndex(self._temp_dir_path)
+        chunk_index.update({"file": ChunkIndex.get_recipe(b"content")})
+
+        chunk_index.clear()
+
+        self.assertIsNone(ChunkIndex(self._temp_dir_path).get("file"))
+
+    def test_in_memory_index(self) -> None:
+        chunk_index = ChunkIndex()
+        chunk_index.update({"file": ChunkIndex.get_recipe(b"content")})
+
+        self.assertIsNotNone(chunk_index.get("file"))
+        self.assertEqual(list(self._temp_dir_path.iterdir()), [])
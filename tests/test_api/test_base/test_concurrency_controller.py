@@ -0,0 +1,84 @@
+from email.utils import formatdate
+import asyncio, time, unittest
+
+from insight_cli.api.base import ConcurrencyController
+
+
+class TestConcurrencyController(unittest.IsolatedAsyncioTestCase):
+    def test_init_with_invalid_max_limit(self) -> None:
+        with self.assertRaises(ValueError):
+            ConcurrencyController(0)
+
+    def test_initial_limit_is_capped(self) -> None:
+        self.assertEqual(ConcurrencyController(1).limit, 1)
+        self.assertEqual(ConcurrencyController(16).limit, 2)
+
+    async def test_additive_increase(self) -> None:
+        controller = ConcurrencyController(4)
+
+        for _ in range(20):
+            controller.on_success(await controller.acquire())
+
+        self.assertEqual(controller.limit, 4)
+
+    async def test_multiplicative_decrease(self) -> None:
+        controller = ConcurrencyController(16)
+
+        for _ in range(40):
+            controller.on_success(await controller.acquire())
+
+        limit = controller.limit
+        controller.on_congestion(await controller.acquire())
+
+        self.assertEqual(controller.limit, limit // 2)
+
+    async def test_decrease_once_per_congestion_event(self) -> None:
+        controller = ConcurrencyController(16)
+
+        for _ in range(40):
+            controller.on_success(await controller.acquire())
+
+        limit = controller.limit
+        started_at = [await controller.acquire() for _ in range(3)]
+
+        for start in started_at:
+            controller.on_congestion(start)
+
+        self.assertEqual(controller.limit, limit // 2)
+
+    async def test_acquire_blocks_at_limit(self) -> None:
+        controller = ConcurrencyController(1)
+        started_at = await controller.acquire()
+        acquire_task = asyncio.create_task(controller.acquire())
+
+        await asyncio.sleep(0.05)
+
+        self.assertFalse(acquire_task.done())
+
+        controller.on_success(started_at)
+
+        await asyncio.wait_for(acquire_task, 1)
+
+    async def test_acquire_waits_for_retry_after(self) -> None:
+        controller = ConcurrencyController(4)
+        controller.on_congestion(await controller.acquire(), retry_after=0.1)
+
+        started_at = time.monotonic()
+        await controller.acquire()
+
+        self.assertGreaterEqual(time.monotonic() - started_at, 0.09)
+
+    def test_parse_retry_after(self) -> None:
+        self.assertIsNone(ConcurrencyController.parse_retry_after(None))
+        self.assertIsNone(ConcurrencyController.parse_retry_after("invalid"))
+        self.assertEqual(ConcurrencyController.parse_retry_after("3"), 3.0)
+        self.assertEqual(ConcurrencyController.parse_retry_after("-3"), 0.0)
+        self.assertAlmostEqual(
+            ConcurrencyController.parse_retry_after(formatdate(time.time() + 60)),
+            60,
+            delta=2,
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
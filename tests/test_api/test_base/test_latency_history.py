@@ -0,0 +1,51 @@
+from pathlib import Path
+from unittest.mock import patch
+import tempfile, unittest
+
+from insight_cli.api.base import LatencyHistory
+
+
+class TestLatencyHistory(unittest.TestCase):
+    def setUp(self) -> None:
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self._temp_dir_path = Path(self._temp_dir.name)
+
+    def tearDown(self) -> None:
+        self._temp_dir.cleanup()
+
+    @patch("insight_cli.config.INSIGHT_API_HEDGE_MIN_NUM_LATENCIES", 10)
+    def test_get_percentile(self) -> None:
+        latency_history = LatencyHistory(self._temp_dir_path)
+
+        for latency_seconds in range(1, 10):
+            latency_history.record("endpoint", latency_seconds)
+
+        self.assertIsNone(latency_history.get_percentile("endpoint", 50))
+
+        latency_history.record("endpoint", 10)
+
+        latency_history = LatencyHistory(self._temp_dir_path)
+        self.assertEqual(latency_history.get_percentile("endpoint", 50), 5)
+        self.assertEqual(latency_history.get_percentile("endpoint", 95), 10)
+        self.assertEqual(latency_history.get_percentile("endpoint", 0), 1)
+        self.assertIsNone(latency_history.get_percentile("other_endpoint", 50))
+
+    @patch("insight_cli.config.INSIGHT_API_HEDGE_MIN_NUM_LATENCIES", 1)
+    @patch("insight_cli.config.INSIGHT_API_HEDGE_MAX_NUM_LATENCIES", 2)
+    def test_record_keeps_most_recent_latencies(self) -> None:
+        latency_history = LatencyHistory()
+
+        for latency_seconds in [9, 1, 2]:
+            latency_history.record("endpoint", latency_seconds)
+
+        self.assertEqual(latency_history.get_percentile("endpoint", 100), 2)
+
+    @patch("insight_cli.config.INSIGHT_API_HEDGE_MIN_NUM_LATENCIES", 1)
+    def test_get_hedge_delay_seconds(self) -> None:
+        latency_history = LatencyHistory()
+        latency_history.record("endpoint", 1)
+
+        self.assertEqual(latency_history.get_hedge_delay_seconds("endpoint"), 1)
+
+        with patch("insight_cli.config.INSIGHT_API_HEDGE_PERCENTILE", None):
+            self.assertIsNone(latency_history.get_hedge_delay_seconds("endpoint"))
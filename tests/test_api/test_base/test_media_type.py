@@ -0,0 +1,74 @@
+from unittest.mock import patch
+import json, unittest
+
+from insight_cli.api.base import MediaType
+from insight_cli.api.base import media_type
+
+
+class TestMediaType(unittest.TestCase):
+    def setUp(self) -> None:
+        MediaType._supported_media_types = set()
+        MediaType._rejected_media_types = set()
+
+    def tearDown(self) -> None:
+        self.setUp()
+
+    def test_parse(self) -> None:
+        self.assertEqual(MediaType.parse(None), "application/json")
+        self.assertEqual(
+            MediaType.parse("Application/JSON; charset=utf-8"), "application/json"
+        )
+        self.assertEqual(
+            MediaType.parse("application/x-msgpack"), "application/msgpack"
+        )
+
+    @patch.object(media_type, "msgpack", None)
+    def test_without_msgpack(self) -> None:
+        MediaType.record_response("application/msgpack")
+
+        self.assertEqual(MediaType.accept_header(), "application/json")
+        self.assertEqual(
+            MediaType.accept_header("application/x-ndjson"),
+            "application/x-ndjson, application/json;q=0.9",
+        )
+        self.assertEqual(MediaType.preferred_media_type(), "application/json")
+
+    def test_json(self) -> None:
+        data = {"files": {"file1": "content"}}
+        content = MediaType.encode(data, "application/json")
+
+        self.assertEqual(content, json.dumps(data).encode("utf-8"))
+        self.assertEqual(MediaType.decode(content, "application/json"), data)
+        self.assertEqual(MediaType.decode(content, None), data)
+
+    def test_invalid_media_type(self) -> None:
+        with self.assertRaises(ValueError):
+            MediaType.encode({}, "text/plain")
+
+    @unittest.skipUnless(media_type.msgpack, "msgpack is not installed")
+    def test_msgpack(self) -> None:
+        data = {"files": {"file1": "a" * 1000}}
+        content = MediaType.encode(data, "application/msgpack")
+
+        self.assertLess(len(content), len(json.dumps(data)))
+        self.assertEqual(MediaType.decode(content, "application/msgpack"), data)
+        self.assertEqual(
+            MediaType.accept_header(), "application/msgpack, application/json;q=0.9"
+        )
+
+    @unittest.skipUnless(media_type.msgpack, "msgpack is not installed")
+    def test_preferred_media_type(self) -> None:
+        self.assertEqual(MediaType.preferred_media_type(), "application/json")
+
+        MediaType.record_response("application/json")
+        self.assertEqual(MediaType.preferred_media_type(), "application/json")
+
+        MediaType.record_response("application/msgpack")
+        self.assertEqual(MediaType.preferred_media_type(), "application/msgpack")
+
+        MediaType.reject("application/msgpack")
+        self.assertEqual(MediaType.preferred_media_type(), "application/json")
+
+
+if __name__ == "__main__":
+    unittest.main()
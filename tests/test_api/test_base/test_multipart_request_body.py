@@ -0,0 +1,163 @@
+from email.parser import BytesParser
+from email.policy import HTTP
+from unittest.mock import patch
+import base64, gzip, json, unittest
+
+from insight_cli.api.base import MultipartRequestBody, RequestBody
+
+
+class TestMultipartRequestBody(unittest.TestCase):
+    @staticmethod
+    def _parse(body: MultipartRequestBody) -> dict[str, bytes]:
+        content = (
+            body.content
+            if isinstance(body.content, bytes)
+            else b"".join(bytes(part) for part in body.content)
+        )
+
+        if body.content_encoding == "gzip":
+            content = gzip.decompress(content)
+
+        message = BytesParser(policy=HTTP).parsebytes(
+            f"Content-Type: {body.headers['Content-Type']}\r\n\r\n".encode("utf-8")
+            + content
+        )
+
+        return {
+            part.get_param("name", header="content-disposition"): part.get_payload(
+                decode=True
+            )
+            for part in message.iter_parts()
+        }
+
+    def setUp(self) -> None:
+        MultipartRequestBody._is_advertised = False
+        MultipartRequestBody._is_rejected = False
+        RequestBody._accepted_content_encodings = set()
+        RequestBody._rejected_content_encodings = set()
+        self._data = {
+            "files": {
+                "file1": {
+                    "content": memoryview(b"content1\r\n--"),
+                    "size_bytes": 12,
+                    "chunk_index": 0,
+                    "num_total_chunks": 1,
+                },
+                "file2": {
+                    "content": memoryview(bytes(range(256))),
+                    "size_bytes": 256,
+                    "chunk_index": 1,
+                    "num_total_chunks": 2,
+                },
+            },
+            "batch_index": 0,
+            "num_total_batches": 1,
+        }
+
+    def tearDown(self) -> None:
+        self.setUp()
+
+    def _assert_parts(self, body: MultipartRequestBody) -> None:
+        parts = self._parse(body)
+
+        self.assertEqual(
+            json.loads(parts["metadata"]),
+            {
+                "files": {
+                    "file1": {
+                        "content": "file_0",
+                        "size_bytes": 12,
+                        "chunk_index": 0,
+                        "num_total_chunks": 1,
+                    },
+                    "file2": {
+                        "content": "file_1",
+                        "size_bytes": 256,
+                        "chunk_index": 1,
+                        "num_total_chunks": 2,
+                    },
+                },
+                "batch_index": 0,
+                "num_total_batches": 1,
+            },
+        )
+        self.assertEqual(parts["file_0"], b"content1\r\n--")
+        self.assertEqual(parts["file_1"], bytes(range(256)))
+
+    def test_identity_content_is_streamed(self) -> None:
+        body = MultipartRequestBody(self._data, "identity")
+
+        self.assertNotIn("Content-Encoding", body.headers)
+        self.assertTrue(body.headers["Content-Type"].startswith("multipart/form-data"))
+        self.assertEqual(len(body.content), sum(len(part) for part in body.content))
+        self.assertTrue(any(isinstance(part, memoryview) for part in body.content))
+        self._assert_parts(body)
+
+    def test_part_header_size(self) -> None:
+        data = {"files": {}, "batch_index": 0, "num_total_batches": 1}
+        body = MultipartRequestBody(data, "identity")
+
+        self.assertEqual(
+            len(body.content),
+            MultipartRequestBody.part_header_size("metadata", "application/json")
+            + len(json.dumps(data))
+            + MultipartRequestBody.closing_delimiter_size(),
+        )
+
+    def test_gzip_content(self) -> None:
+        body = MultipartRequestBody(self._data, "gzip")
+
+        self.assertEqual(body.headers["Content-Encoding"], "gzip")
+        self._assert_parts(body)
+
+    def test_is_supported(self) -> None:
+        self.assertFalse(MultipartRequestBody.is_supported())
+
+        MultipartRequestBody.record_response(None)
+
+        self.assertFalse(MultipartRequestBody.is_supported())
+
+        MultipartRequestBody.record_response(
+            "application/json, Multipart/Form-Data; charset=utf-8"
+        )
+
+        self.assertTrue(MultipartRequestBody.is_supported())
+
+        with patch("insight_cli.config.INSIGHT_API_MULTIPART_UPLOADS", False):
+            self.assertFalse(MultipartRequestBody.is_supported())
+
+        MultipartRequestBody.reject()
+
+        self.assertFalse(MultipartRequestBody.is_supported())
+
+    def test_record_response_without_multipart(self) -> None:
+        MultipartRequestBody.record_response("multipart/form-data")
+        MultipartRequestBody.record_response("application/json")
+
+        self.assertFalse(MultipartRequestBody.is_supported())
+
+    def test_fallback_to_json(self) -> None:
+        body = MultipartRequestBody(self._data, "gzip")
+
+        fallback_body = body.fallback("gzip, identity")
+
+        self.assertFalse(MultipartRequestBody.is_supported())
+        self.assertNotIsInstance(fallback_body, MultipartRequestBody)
+        self.assertEqual(
+            fallback_body.data["files"]["file2"]["content"],
+            base64.b64encode(bytes(range(256))).decode("utf-8"),
+        )
+
+    def test_fallback_with_rejected_content_encoding(self) -> None:
+        MultipartRequestBody.record_response("multipart/form-data")
+        body = MultipartRequestBody(self._data, "gzip")
+
+        fallback_body = body.fallback("identity")
+
+        self.assertTrue(MultipartRequestBody.is_supported())
+        self.assertIsInstance(fallback_body, MultipartRequestBody)
+        self.assertEqual(fallback_body.content_encoding, "identity")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+from unittest.mock import patch
+import gzip, json, unittest
+
+from insight_cli.api.base import MediaType, RequestBody
+from insight_cli.api.base import media_type, request_body
+
+
+class TestRequestBody(unittest.TestCase):
+    def setUp(self) -> None:
+        RequestBody._accepted_content_encodings = set()
+        RequestBody._rejected_content_encodings = set()
+        MediaType._supported_media_types = set()
+        MediaType._rejected_media_types = set()
+
+    def tearDown(self) -> None:
+        self.setUp()
+
+    def test_gzip_content(self) -> None:
+        data = {"files": {"file1": "a" * 1000}}
+        body = RequestBody(data, "gzip")
+
+        self.assertEqual(json.loads(gzip.decompress(body.content)), data)
+        self.assertLess(len(body.content), len(json.dumps(data)))
+        self.assertEqual(
+            body.headers,
+            {"Content-Type": "application/json", "Content-Encoding": "gzip"},
+        )
+        self.assertEqual(body.data, data)
+
+    def test_identity_content(self) -> None:
+        data = {"files": {}}
+        body = RequestBody(data, "identity")
+
+        self.assertEqual(body.content, json.dumps(data).encode("utf-8"))
+        self.assertEqual(body.headers, {"Content-Type": "application/json"})
+
+    def test_invalid_content_encoding(self) -> None:
+        with self.assertRaises(ValueError):
+            RequestBody({}, "br")
+
+    @unittest.skipUnless(request_body.zstandard, "zstandard is not installed")
+    def test_zstd_content(self) -> None:
+        data = {"files": {"file1": "a" * 1000}}
+        body = RequestBody(data, "zstd")
+        RequestBody.record_response("zstd, gzip")
+
+        self.assertEqual(RequestBody.preferred_content_encoding(), "zstd")
+        self.assertEqual(body.headers["Content-Encoding"], "zstd")
+        self.assertEqual(body.data, data)
+
+    @patch.object(request_body, "zstandard", None)
+    def test_preferred_content_encoding_without_zstandard(self) -> None:
+        RequestBody.record_response("zstd, gzip")
+        self.assertEqual(RequestBody.preferred_content_encoding(), "gzip")
+
+    @patch("insight_cli.config.INSIGHT_API_REQUEST_COMPRESSION_LEVEL", 0)
+    def test_preferred_content_encoding_with_compression_disabled(self) -> None:
+        RequestBody.record_response("zstd, gzip")
+        self.assertEqual(RequestBody.preferred_content_encoding(), "identity")
+
+    @patch.object(request_body, "zstandard", None)
+    def test_reject_content_encoding(self) -> None:
+        RequestBody.record_response("*")
+        RequestBody.reject_content_encoding("zstd")
+        self.assertEqual(RequestBody.preferred_content_encoding(), "gzip")
+
+        RequestBody.reject_content_encoding("gzip")
+        self.assertEqual(RequestBody.preferred_content_encoding(), "identity")
+
+    def test_reject_content_encoding_with_accept_encoding(self) -> None:
+        RequestBody.record_response("zstd, gzip")
+        RequestBody.reject_content_encoding("zstd", "identity")
+        self.assertEqual(RequestBody.preferred_content_encoding(), "identity")
+
+    def test_preferred_content_encoding_without_accept_encoding(self) -> None:
+        RequestBody.record_response(None)
+
+        self.assertEqual(RequestBody.preferred_content_encoding(), "identity")
+        self.assertNotIn("Content-Encoding", RequestBody({}).headers)
+
+    @patch.object(request_body, "zstandard", None)
+    def test_record_response(self) -> None:
+        RequestBody.record_response("br, GZIP;q=0.5")
+        self.assertEqual(RequestBody.preferred_content_encoding(), "gzip")
+
+        RequestBody.record_response("gzip;q=0, identity")
+        self.assertEqual(RequestBody.preferred_content_encoding(), "identity")
+
+    def test_fallback(self) -> None:
+        data = {"files": {"file1": "content"}}
+        body = RequestBody(data, "gzip")
+        RequestBody.reject_content_encoding("zstd")
+
+        fallback_body = body.fallback()
+
+        self.assertEqual(fallback_body.content_encoding, "identity")
+        self.assertEqual(fallback_body.data, data)
+        self.assertIsNone(fallback_body.fallback())
+
+    def test_fallback_with_accepted_content_encoding(self) -> None:
+        body = RequestBody({}, "gzip")
+        RequestBody.record_response("gzip, identity")
+
+        self.assertIsNone(body.fallback("gzip, identity"))
+        self.assertEqual(RequestBody.preferred_content_encoding(), "gzip")
+
+    @unittest.skipUnless(media_type.msgpack, "msgpack is not installed")
+    def test_msgpack_content(self) -> None:
+        data = {"files": {"file1": "content"}}
+        MediaType.record_response("application/msgpack")
+        body = RequestBody(data, "identity")
+
+        self.assertEqual(body.headers, {"Content-Type": "application/msgpack"})
+        self.assertEqual(body.data, data)
+
+    @unittest.skipUnless(media_type.msgpack, "msgpack is not installed")
+    def test_fallback_with_unsupported_media_type(self) -> None:
+        data = {"files": {"file1": "content"}}
+        body = RequestBody(data, "gzip", "application/msgpack")
+
+        self.assertIsNone(
+            body.fallback("gzip", "application/json, application/x-msgpack")
+        )
+
+        fallback_body = body.fallback("gzip", "application/json")
+
+        self.assertEqual(fallback_body.media_type, "application/json")
+        self.assertEqual(fallback_body.content_encoding, "gzip")
+        self.assertEqual(fallback_body.data, data)
+        self.assertEqual(MediaType.preferred_media_type(), "application/json")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+from pathlib import Path
+import tempfile, unittest
+
+from insight_cli.api.base import UploadJournal
+
+
+class TestUploadJournal(unittest.TestCase):
+    def setUp(self) -> None:
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self._temp_dir_path = Path(self._temp_dir.name)
+
+    def tearDown(self) -> None:
+        self._temp_dir.cleanup()
+
+    def test_fingerprint(self) -> None:
+        self.assertEqual(
+            UploadJournal.fingerprint("endpoint", {"a": "1", "b": "2"}),
+            UploadJournal.fingerprint("endpoint", {"b": "2", "a": "1"}),
+        )
+        self.assertNotEqual(
+            UploadJournal.fingerprint("endpoint", {"a": "1"}),
+            UploadJournal.fingerprint("endpoint", {"a": "2"}),
+        )
+        self.assertNotEqual(
+            UploadJournal.fingerprint("endpoint", {"a": "1"}),
+            UploadJournal.fingerprint("other_endpoint", {"a": "1"}),
+        )
+
+    def test_start(self) -> None:
+        session = UploadJournal(self._temp_dir_path).start(
+            "fingerprint", "session", ["hash"]
+        )
+
+        self.assertEqual(
+            session,
+            {
+                "fingerprint": "fingerprint",
+                "session_id": "session",
+                "missing_content_hashes": ["hash"],
+                "acknowledged_batch_indexes": [],
+                "repository_id": None,
+            },
+        )
+
+    def test_resume_without_journaled_session(self) -> None:
+        self.assertIsNone(UploadJournal(self._temp_dir_path).resume("fingerprint"))
+
+    def test_resume_with_journaled_session(self) -> None:
+        upload_journal = UploadJournal(self._temp_dir_path)
+        upload_journal.start("fingerprint", "session", None)
+        upload_journal.acknowledge(0, "repository_id")
+
+        session = UploadJournal(self._temp_dir_path).resume("fingerprint")
+
+        self.assertEqual(session["session_id"], "session")
+        self.assertEqual(session["acknowledged_batch_indexes"], [0])
+        self.assertEqual(session["repository_id"], "repository_id")
+
+    def test_resume_with_different_fingerprint(self) -> None:
+        upload_journal = UploadJournal(self._temp_dir_path)
+        upload_journal.start("fingerprint", "session", None)
+        upload_journal.acknowledge(0)
+
+        self.assertIsNone(
+            UploadJournal(self._temp_dir_path).resume("other_fingerprint")
+        )
+
+    def test_resume_with_corrupt_journal(self) -> None:
+        (self._temp_dir_path / "upload_journal.json").write_text("{")
+
+        self.assertIsNone(UploadJournal(self._temp_dir_path).resume("fingerprint"))
+
+    def test_clear(self) -> None:
+        upload_journal = UploadJournal(self._temp_dir_path)
+        upload_journal.start("fingerprint", "session", None)
+
+        upload_journal.clear()
+
+        self.assertFalse((self._temp_dir_path / "upload_journal.json").exists())
+        self.assertIsNone(upload_journal.resume("fingerprint"))
+
+    def test_in_memory_journal(self) -> None:
+        upload_journal = UploadJournal()
+        upload_journal.start("fingerprint", "session", None)
+        upload_journal.acknowledge(1)
+
+        self.assertEqual(
+            upload_journal.resume("fingerprint")["acknowledged_batch_indexes"], [1]
+        )
+        self.assertEqual(list(self._temp_dir_path.iterdir()), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
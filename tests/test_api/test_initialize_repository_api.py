@@ -1,88 +1,189 @@
-from unittest.mock import patch, MagicMock
-import unittest
+from pathlib import Path
+from unittest.mock import patch, AsyncMock, MagicMock
+import asyncio, hashlib, json, tempfile, threading, unittest
 
 from insight_cli.api import InitializeRepositoryAPI
+from insight_cli.api.base import RequestBody
+from insight_cli.utils import ChunkedFileEncoder
 from insight_cli.config import config
 
 
 class TestInitializeRepositoryAPI(unittest.TestCase):
     def test_batch_repository_files(self) -> None:
-        repository_files = {
-            "file1": bytes(10 * 1024**2),
-            "file2": bytes(5 * 1024**2),
-            "file3": bytes(5 * 1024**2),
-            "file4": bytes(4 * 1024**2),
-            "file5": bytes(4 * 1024**2),
-            "file6": bytes(4 * 1024**2),
+        repository_file_sizes = {
+            "file1": 10 * 1024**2,
+            "file2": 5 * 1024**2,
+            "file3": 5 * 1024**2,
+            "file4": 4 * 1024**2,
+            "file5": 4 * 1024**2,
+            "file6": 4 * 1024**2,
         }
 
-        batched_repository_files = (
-            InitializeRepositoryAPI._batch_repository_files(repository_files)
+        batched_repository_files = InitializeRepositoryAPI._batch_repository_files(
+            repository_file_sizes
         )
 
-        self.assertEqual(len(batched_repository_files), 4)
         self.assertEqual(
             [sorted(batch["files"].keys()) for batch in batched_repository_files],
-            [["file1"], ["file2", "file3"], ["file4", "file5", "file6"], ["file6"]],
+            [["file1"], ["file1", "file4"], ["file2"], ["file3"], ["file5"], ["file6"]],
+        )
+        self.assertEqual(
+            [batch["files"]["file1"] for batch in batched_repository_files[:2]],
+            [
+                {"start": 0, "end": 7864185, "chunk_index": 0, "num_total_chunks": 2},
+                {
+                    "start": 7864185,
+                    "end": 10 * 1024**2,
+                    "chunk_index": 1,
+                    "num_total_chunks": 2,
+                },
+            ],
+        )
+
+    def test_get_request_body(self) -> None:
+        batch = {
+            "files": {"file2": {"content": "", "chunk_index": 0}},
+            "session_id": "1234asdfdasfas",
+            "batch_index": 2,
+            "num_total_batches": 4,
+        }
+
+        self.assertEqual(
+            InitializeRepositoryAPI._get_request_body(batch),
+            {
+                "files": batch["files"],
+                "batch_index": batch["batch_index"],
+                "num_total_batches": batch["num_total_batches"],
+            },
         )
 
-    @patch("requests.post")
-    def test_make_batch_request(self, mock_request_post) -> None:
+    @patch.object(InitializeRepositoryAPI, "_make_manifest_request")
+    def test_deduplicate_batch(self, mock_make_manifest_request) -> None:
+        mock_make_manifest_request.side_effect = [
+            {"missing_content_hashes": [hashlib.sha256(b"new").hexdigest()]},
+            None,
+        ]
+        batch = {
+            "files": {
+                "known": {"content": b"old", "chunk_index": 0, "num_total_chunks": 1},
+                "new": {"content": b"new", "chunk_index": 0, "num_total_chunks": 1},
+                "split": {"content": b"a", "chunk_index": 1, "num_total_chunks": 2},
+            },
+        }
+        manifest_is_unsupported = threading.Event()
+
+        self.assertEqual(
+            list(
+                InitializeRepositoryAPI._deduplicate_batch(
+                    batch, "session", manifest_is_unsupported
+                )["files"]
+            ),
+            ["new", "split"],
+        )
+        mock_make_manifest_request.assert_called_once_with(
+            "session",
+            {
+                "known": hashlib.sha256(b"old").hexdigest(),
+                "new": hashlib.sha256(b"new").hexdigest(),
+            },
+        )
+
+        for _ in range(2):
+            self.assertEqual(
+                InitializeRepositoryAPI._deduplicate_batch(
+                    batch, "session", manifest_is_unsupported
+                ),
+                batch,
+            )
+
+        self.assertTrue(manifest_is_unsupported.is_set())
+        self.assertEqual(mock_make_manifest_request.call_count, 2)
+
+    @patch("insight_cli.api.base.AsyncSession.request", new_callable=AsyncMock)
+    def test_make_batch_request(self, mock_request) -> None:
         expected_response = {"repository_id": "1234123"}
-        mock_request_post.return_value = MagicMock(
+        mock_request.return_value = MagicMock(
+            status_code=200,
             json=lambda: expected_response,
             raise_for_status=lambda: None,
         )
 
         payload = {
-            "files": {
-                "file2": {
-                    "content": bytes(5 * 1024**2),
-                    "chunk_index": 1,
-                    "num_total_chunks": 1,
-                },
-                "file3": {
-                    "content": bytes(5 * 1024**2),
-                    "chunk_index": 1,
-                    "num_total_chunks": 1,
-                },
-            },
+            "body": RequestBody(
+                {
+                    "files": {
+                        "file2": {
+                            "content": "",
+                            "chunk_index": 1,
+                            "num_total_chunks": 1,
+                        },
+                    },
+                    "batch_index": 2,
+                    "num_total_batches": 4,
+                }
+            ),
             "session_id": "1234asdfdasfas",
-            "batch_index": "2",
-            "num_total_batches": "4",
+            "batch_index": 2,
+            "num_total_batches": 4,
         }
 
-        result = InitializeRepositoryAPI._make_batch_request(payload)
+        result = asyncio.run(InitializeRepositoryAPI._make_batch_request(payload))
 
-        mock_request_post.assert_called_once_with(
-            url=f"{config.INSIGHT_API_BASE_URL}/initialize_repository",
+        mock_request.assert_called_once_with(
+            "POST",
+            f"{config.INSIGHT_API_BASE_URL}/initialize_repository",
+            data=payload["body"].content,
+            headers=payload["body"].headers,
             cookies={"session_id": payload["session_id"]},
-            json={
-                "files": payload["files"],
-                "batch_index": payload["batch_index"],
-                "num_total_batches": payload["num_total_batches"],
-            },
         )
 
         self.assertEqual(result, expected_response)
 
-    @patch("requests.post")
-    def test_make_request(self, mock_post):
+    @patch("insight_cli.config.INSIGHT_API_MULTIPART_UPLOADS", False)
+    @patch("insight_cli.api.base.AsyncSession.request", new_callable=AsyncMock)
+    def test_make_request(self, mock_request):
         mock_response_data = {"repository_id": "mock_repository_id"}
-        mock_post.return_value = MagicMock(
-            json=lambda: mock_response_data,
-            raise_for_status=lambda: None,
+        mock_request.side_effect = lambda method, url, **kwargs: (
+            MagicMock(status_code=405)
+            if url.endswith("_manifest")
+            else MagicMock(
+                status_code=200,
+                json=lambda: mock_response_data,
+                raise_for_status=lambda: None,
+            )
         )
 
-        repository_files = {
-            "file1.txt": b"File content 1",
-            "file2.txt": b"File content 2",
-        }
+        with tempfile.TemporaryDirectory() as temp_dir:
+            repository_files = {
+                str(Path(temp_dir, "file1.txt")): b"File content 1",
+                str(Path(temp_dir, "file2.txt")): b"File content 2",
+            }
 
+            for file_path, file_content in repository_files.items():
+                Path(file_path).write_bytes(file_content)
+
+            self.assertEqual(
+                InitializeRepositoryAPI().make_request(
+                    {path: len(content) for path, content in repository_files.items()}
+                ),
+                mock_response_data,
+            )
+
+        self.assertEqual(mock_request.call_count, 2)
+        request_kwargs = mock_request.call_args.kwargs
+        request_body = RequestBody._decompress(
+            request_kwargs["data"],
+            request_kwargs["headers"].get("Content-Encoding", "identity"),
+        )
         self.assertEqual(
-            InitializeRepositoryAPI().make_request(repository_files), mock_response_data
+            json.loads(request_body)["files"],
+            {
+                file_path: ChunkedFileEncoder.encode_chunk_with_metadata(
+                    file_content, 0, 1
+                )
+                for file_path, file_content in repository_files.items()
+            },
         )
-        mock_post.assert_called_once()
 
 
 if __name__ == "__main__":
@@ -1,15 +1,15 @@
-from unittest.mock import patch, MagicMock
-import unittest
+from unittest.mock import patch, AsyncMock, MagicMock
+import asyncio, requests, unittest
 
 from insight_cli.api import QueryRepositoryAPI
 from insight_cli.config import config
 
 
-class TestQueryRepositoryAPI(unittest.TestCase):
-    @patch("requests.get")
-    def test_make_request(self, mock_request_get):
+class TestQueryRepositoryAPI(unittest.IsolatedAsyncioTestCase):
+    @patch("insight_cli.api.base.AsyncSession.request", new_callable=AsyncMock)
+    def test_make_request(self, mock_request):
         expected_response = []
-        mock_request_get.return_value = MagicMock(
+        mock_request.return_value = MagicMock(
             json=lambda: expected_response,
             raise_for_status=lambda: None,
         )
@@ -22,11 +22,101 @@ class TestQueryRepositoryAPI(unittest.TestCase):
             expected_response,
         )
 
-        mock_request_get.assert_called_once_with(
-            url=f"{config.INSIGHT_API_BASE_URL}/query_repository",
+        mock_request.assert_called_once_with(
+            "GET",
+            f"{config.INSIGHT_API_BASE_URL}/query_repository",
             json={"repository_id": repository_id, "query_string": query_string},
         )
 
+    @patch("insight_cli.api.base.AsyncSession.request", new_callable=AsyncMock)
+    async def test_make_request_async(self, mock_request):
+        mock_request.return_value = MagicMock(json=lambda: [])
+
+        self.assertEqual(
+            await QueryRepositoryAPI.make_request_async("test_repo_id", "water"), []
+        )
+        mock_request.assert_awaited_once()
+
+    @patch("insight_cli.api.base.AsyncSession.request", new_callable=AsyncMock)
+    def test_make_requests(self, mock_request):
+        num_concurrent_requests, max_num_concurrent_requests = 0, 0
+
+        async def request(method: str, url: str, json: dict) -> MagicMock:
+            nonlocal num_concurrent_requests, max_num_concurrent_requests
+            num_concurrent_requests += 1
+            max_num_concurrent_requests = max(
+                max_num_concurrent_requests, num_concurrent_requests
+            )
+            await asyncio.sleep(0.01)
+            num_concurrent_requests -= 1
+
+            if json["query_string"] == "fail":
+                raise requests.ConnectionError("connection refused")
+
+            return MagicMock(json=lambda: [json["query_string"]])
+
+        mock_request.side_effect = request
+        queries = [(i, f"query {i}") for i in range(10)] + [(10, "fail")]
+
+        results = sorted(
+            QueryRepositoryAPI.make_requests("test_repo_id", iter(queries), 3),
+            key=lambda result: result["index"],
+        )
+
+        self.assertEqual(max_num_concurrent_requests, 3)
+        self.assertEqual(
+            [result["matches"] for result in results[:10]],
+            [[f"query {i}"] for i in range(10)],
+        )
+        self.assertIsNone(results[10]["matches"])
+        self.assertEqual(results[10]["error"], "connection refused")
+        self.assertTrue(all(result["latency_seconds"] > 0 for result in results))
+
+    @patch("insight_cli.config.INSIGHT_QUERY_PAGE_SIZE", 2)
+    @patch("insight_cli.api.QueryRepositoryAPI.stream_request_async")
+    async def test_stream_top_matches_async(self, mock_stream_request_async):
+        requested_pages = []
+
+        async def stream_request_async(*_, on_response, limit, cursor, **__):
+            offset = int(cursor or 0)
+            requested_pages.append((offset, limit))
+            on_response(MagicMock(headers={"X-Next-Cursor": str(offset + limit)}))
+
+            for index in range(offset, offset + limit):
+                yield index
+
+        mock_stream_request_async.side_effect = stream_request_async
+        matches = QueryRepositoryAPI.stream_top_matches_async(
+            "test_repo_id", "water", 5
+        )
+
+        self.assertEqual(await anext(matches), 0)
+        await asyncio.sleep(0)
+        self.assertEqual(requested_pages, [(0, 2), (2, 2)])
+        self.assertEqual([match async for match in matches], [1, 2, 3, 4])
+        self.assertEqual(requested_pages, [(0, 2), (2, 2), (4, 1)])
+
+    @patch("insight_cli.api.QueryRepositoryAPI.stream_request_async")
+    async def test_stream_top_matches_async_without_pagination(
+        self, mock_stream_request_async
+    ):
+        async def stream_request_async(*_, **__):
+            for index in range(10):
+                yield index
+
+        mock_stream_request_async.side_effect = stream_request_async
+
+        self.assertEqual(
+            [
+                match
+                async for match in QueryRepositoryAPI.stream_top_matches_async(
+                    "test_repo_id", "water", 3
+                )
+            ],
+            [0, 1, 2],
+        )
+        mock_stream_request_async.assert_called_once()
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,176 +1,313 @@
-from unittest.mock import patch
-import base64, unittest
+from pathlib import Path
+from unittest.mock import patch, AsyncMock, MagicMock
+import asyncio, base64, random, requests, tempfile, time, unittest
 
-from insight_cli.api import ReinitializeRepositoryAPI
+from insight_cli.api import IncompleteUploadError, ReinitializeRepositoryAPI
+from insight_cli.api.base import BatchLoader, ChunkIndex, RequestBody
 from insight_cli.config import config
+from insight_cli.utils import DeadlineExceededError, content_defined_chunkifier
 
 
 class TestReinitializeRepositoryAPI(unittest.TestCase):
-    def test_batch_repository_file_changes(self) -> None:
-        repository_id = "123"
-        repository_file_changes = {
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self._temp_dir_path = Path(self._temp_dir.name)
+        self._file_contents = {
+            "file1": bytes(range(256)) * (11 * 1024**2 // 256),
+            "file2": bytes(10 * 1024**2),
+            "file3": bytes(5 * 1024**2),
+            "file4": bytes(2 * 1024**2),
+        }
+
+        for file_name, file_content in self._file_contents.items():
+            (self._temp_dir_path / file_name).write_bytes(file_content)
+
+    def tearDown(self):
+        self._temp_dir.cleanup()
+
+    def _path(self, file_name: str) -> str:
+        return str(self._temp_dir_path / file_name)
+
+    def _repository_file_changes(self) -> dict[str, list[tuple[str, int]]]:
+        return {
             "add": [
-                ("file1", bytes(11 * 1024**2)),
-                ("file2", bytes(10 * 1024**2)),
+                (self._path("file1"), 11 * 1024**2),
+                (self._path("file2"), 10 * 1024**2),
             ],
             "update": [
-                ("file3", bytes(5 * 1024**2)),
-                ("file4", bytes(2 * 1024**2)),
+                (self._path("file3"), 5 * 1024**2),
+                (self._path("file4"), 2 * 1024**2),
             ],
             "delete": [
-                ("file5", bytes(0)),
-                ("file6", bytes(0)),
+                (self._path("file5"), 0),
+                (self._path("file6"), 0),
             ],
         }
 
-        self.assertEqual(
-            ReinitializeRepositoryAPI._add_metadata_to_batches(
-                ReinitializeRepositoryAPI._batch_repository_file_changes(
-                    repository_file_changes
+    @patch("insight_cli.config.INSIGHT_API_MULTIPART_UPLOADS", False)
+    def test_batch_repository_file_changes(self) -> None:
+        repository_id = "123"
+        request_bodies = [
+            batch["body"]
+            for batch in BatchLoader.load(
+                ReinitializeRepositoryAPI._add_metadata_to_batches(
+                    ReinitializeRepositoryAPI._batch_repository_file_changes(
+                        repository_id,
+                        self._repository_file_changes(),
+                        {self._path("file7"): "add"},
+                    ),
+                    repository_id,
                 ),
-                repository_id,
-            ),
-            [
-                {
-                    "files": {
-                        "file1": {
-                            "content": base64.b64encode(
-                                repository_file_changes["add"][0][1][: 10 * 1024**2]
-                            ).decode("utf-8"),
-                            "size_bytes": 10 * 1024**2,
-                            "chunk_index": 0,
-                            "num_total_chunks": 2,
-                        }
-                    },
-                    "changes": {
-                        "file1": "add",
-                    },
-                    "repository_id": repository_id,
-                    "batch_index": 0,
-                    "num_total_batches": 3,
-                },
-                {
-                    "files": {
-                        "file1": {
-                            "content": base64.b64encode(
-                                repository_file_changes["add"][0][1][10 * 1024**2 :]
-                            ).decode("utf-8"),
-                            "size_bytes": 1 * 1024**2,
-                            "chunk_index": 1,
-                            "num_total_chunks": 2,
-                        },
-                        "file2": {
-                            "content": base64.b64encode(
-                                repository_file_changes["add"][1][1][: 9 * 1024**2]
-                            ).decode("utf-8"),
-                            "size_bytes": 9 * 1024**2,
-                            "chunk_index": 0,
-                            "num_total_chunks": 2,
-                        },
-                    },
-                    "changes": {
-                        "file1": "add",
-                        "file2": "add",
-                    },
-                    "repository_id": repository_id,
-                    "batch_index": 1,
-                    "num_total_batches": 3,
-                },
-                {
-                    "files": {
-                        "file2": {
-                            "content": base64.b64encode(
-                                repository_file_changes["add"][1][1][9 * 1024**2 :]
-                            ).decode("utf-8"),
-                            "size_bytes": 1 * 1024**2,
-                            "chunk_index": 1,
-                            "num_total_chunks": 2,
-                        },
-                        "file3": {
-                            "content": base64.b64encode(
-                                repository_file_changes["update"][0][1]
-                            ).decode("utf-8"),
-                            "size_bytes": 5 * 1024**2,
-                            "chunk_index": 0,
-                            "num_total_chunks": 1,
-                        },
-                        "file4": {
-                            "content": base64.b64encode(
-                                repository_file_changes["update"][1][1]
-                            ).decode("utf-8"),
-                            "size_bytes": 2 * 1024**2,
-                            "chunk_index": 0,
-                            "num_total_chunks": 1,
-                        },
-                    },
-                    "changes": {
-                        "file2": "add",
-                        "file3": "update",
-                        "file4": "update",
-                        "file5": "delete",
-                        "file6": "delete",
-                    },
-                    "repository_id": repository_id,
-                    "batch_index": 2,
-                    "num_total_batches": 3,
-                },
-            ],
-        )
+                ReinitializeRepositoryAPI._get_request_body,
+            )
+        ]
+        file_chunks, changes = {}, {}
 
-    @patch("requests.put")
-    def test_make_batch_request(self, mock_request_put) -> None:
-        payload = {
-            "files": {
-                "file3": bytes(5 * 1024**2),
-                "file4": bytes(2 * 1024**2),
-                "file5": bytes(0),
-                "file6": bytes(0),
+        for request_body in request_bodies:
+            self.assertLessEqual(
+                len(
+                    RequestBody._decompress(
+                        request_body.content, request_body.content_encoding
+                    )
+                ),
+                config.INSIGHT_API_MAX_BATCH_SIZE_BYTES,
+            )
+            self.assertEqual(request_body.data["repository_id"], repository_id)
+            self.assertEqual(request_body.data["num_total_batches"], 4)
+            changes.update(request_body.data["changes"])
+
+            for file_path, chunk in request_body.data["files"].items():
+                file_chunks.setdefault(file_path, {})[chunk["chunk_index"]] = (
+                    base64.b64decode(chunk["content"])
+                )
+
+        self.assertEqual(
+            {
+                file_path: b"".join(chunks[i] for i in range(len(chunks)))
+                for file_path, chunks in file_chunks.items()
             },
-            "changes": {
-                "file3": "update",
-                "file4": "update",
-                "file5": "delete",
-                "file6": "delete",
+            {
+                self._path(file_name): file_content
+                for file_name, file_content in self._file_contents.items()
             },
+        )
+        self.assertEqual({len(chunks) for chunks in file_chunks.values()}, {1, 2})
+        self.assertEqual(
+            changes,
+            {
+                self._path("file1"): "add",
+                self._path("file2"): "add",
+                self._path("file3"): "update",
+                self._path("file4"): "update",
+                self._path("file5"): "delete",
+                self._path("file6"): "delete",
+                self._path("file7"): "add",
+            },
+        )
+
+    @patch("insight_cli.api.base.AsyncSession.request", new_callable=AsyncMock)
+    def test_make_batch_request(self, mock_request) -> None:
+        mock_request.return_value = MagicMock(status_code=200)
+        payload = {
+            "body": RequestBody(
+                {
+                    "repository_id": "12312",
+                    "files": {},
+                    "changes": {"file5": "delete", "file6": "delete"},
+                    "batch_index": 0,
+                    "num_total_batches": 1,
+                }
+            ),
+            "changes": {"file5": "delete", "file6": "delete"},
             "repository_id": "12312",
-            "batch_index": 1,
+            "batch_index": 0,
             "num_total_batches": 1,
         }
 
-        ReinitializeRepositoryAPI._make_batch_request(payload)
+        asyncio.run(ReinitializeRepositoryAPI._make_batch_request(payload))
 
-        mock_request_put.assert_called_once_with(
-            url=f"{config.INSIGHT_API_BASE_URL}/reinitialize_repository",
-            json={
-                "repository_id": payload["repository_id"],
-                "files": payload["files"],
-                "changes": payload["changes"],
-                "batch_index": payload["batch_index"],
-                "num_total_batches": payload["num_total_batches"],
-            },
+        mock_request.assert_called_once_with(
+            "PUT",
+            f"{config.INSIGHT_API_BASE_URL}/reinitialize_repository",
+            data=payload["body"].content,
+            headers=payload["body"].headers,
+            cookies=None,
         )
 
-    @patch("requests.put")
-    def test_make_request(self, mock_put):
+    @patch("insight_cli.api.base.AsyncSession.request", new_callable=AsyncMock)
+    def test_make_request(self, mock_request):
+        mock_request.side_effect = lambda method, url, **kwargs: MagicMock(
+            status_code=405 if url.endswith("_manifest") else 200
+        )
         repository_id = "123"
-        repository_file_changes = {
-            "add": [
-                ("file1", bytes(11 * 1024**2)),
-                ("file2", bytes(10 * 1024**2)),
-            ],
-            "update": [
-                ("file3", bytes(5 * 1024**2)),
-                ("file4", bytes(2 * 1024**2)),
-            ],
-            "delete": [
-                ("file5", bytes(0)),
-                ("file6", bytes(0)),
-            ],
-        }
 
-        ReinitializeRepositoryAPI().make_request(repository_id, repository_file_changes)
+        ReinitializeRepositoryAPI().make_request(
+            repository_id, self._repository_file_changes()
+        )
+
+        self.assertEqual(
+            [call.args[1] for call in mock_request.call_args_list].count(
+                f"{config.INSIGHT_API_BASE_URL}/reinitialize_repository"
+            ),
+            4,
+        )
+
+    @patch("insight_cli.api.base.AsyncSession.request", new_callable=AsyncMock)
+    def test_requests_with_unknown_repository(self, mock_request):
+        mock_request.return_value = MagicMock(
+            status_code=404, raise_for_status=MagicMock(side_effect=requests.HTTPError)
+        )
+
+        with self.assertRaises(requests.HTTPError):
+            asyncio.run(
+                ReinitializeRepositoryAPI._make_manifest_request("123", {"a": "b"})
+            )
+
+        with self.assertRaises(requests.HTTPError):
+            asyncio.run(
+                ReinitializeRepositoryAPI._make_delta_request(
+                    {"file_paths": ["a"], "body": RequestBody({})}
+                )
+            )
+
+    @patch.object(
+        ReinitializeRepositoryAPI,
+        "_get_file_deltas",
+        return_value=({"file1": ({"instructions": []}, {"chunks": []})}, {}),
+    )
+    def test_sync_file_deltas_with_failed_delta(self, _) -> None:
+        def sync_file_deltas(error: Exception) -> tuple:
+            with patch.object(
+                ReinitializeRepositoryAPI, "_make_delta_request", side_effect=error
+            ):
+                return asyncio.run(
+                    ReinitializeRepositoryAPI._sync_file_deltas(
+                        "123", ["file1"], ChunkIndex()
+                    )
+                )
+
+        self.assertEqual(
+            sync_file_deltas(
+                requests.HTTPError(response=MagicMock(status_code=409, headers={}))
+            ),
+            (set(), {}),
+        )
+
+        for error in [
+            requests.HTTPError(response=MagicMock(status_code=400, headers={})),
+            DeadlineExceededError(1),
+        ]:
+            with self.assertRaises(IncompleteUploadError) as context:
+                sync_file_deltas(error)
+
+            self.assertIs(context.exception.__cause__, error)
+            self.assertEqual(context.exception.acknowledged_file_paths, set())
+
+    def test_get_acknowledged_file_paths(self) -> None:
+        request_batches = [
+            {"batch_index": 0, "changes": {"file1": "add", "file2": "delete"}},
+            {"batch_index": 1, "changes": {"file1": "add", "file3": "update"}},
+            {"batch_index": 2, "changes": {"file4": "add"}},
+        ]
+
+        self.assertEqual(
+            ReinitializeRepositoryAPI._get_acknowledged_file_paths(
+                request_batches, {0, 2}
+            ),
+            {"file2", "file4"},
+        )
+
+    def test_get_file_delta(self) -> None:
+        content = bytes(range(256)) * 256
+        edited_content = content[:30000] + b"x = 1\n" + content[30000:]
+
+        file_delta, recipe = ReinitializeRepositoryAPI._get_file_delta(
+            ChunkIndex.get_recipe(content), edited_content
+        )
+
+        self.assertEqual(recipe, ChunkIndex.get_recipe(edited_content))
+        self.assertEqual(
+            file_delta["base_content_hash"],
+            ChunkIndex.get_recipe(content)["content_hash"],
+        )
+        self.assertEqual(
+            b"".join(
+                (
+                    content[instruction[1] : instruction[2]]
+                    if instruction[0] == "copy"
+                    else base64.b64decode(instruction[1])
+                )
+                for instruction in file_delta["instructions"]
+            ),
+            edited_content,
+        )
+        self.assertLess(
+            sum(
+                len(base64.b64decode(instruction[1]))
+                for instruction in file_delta["instructions"]
+                if instruction[0] == "insert"
+            ),
+            len(edited_content) // 4,
+        )
+
+    def test_get_file_delta_of_largest_synced_file(self) -> None:
+        content = random.Random(0).randbytes(
+            config.INSIGHT_DELTA_SYNC_MAX_FILE_SIZE_BYTES
+        )
+        edited_content = content[:2000000] + b"x = 1\n" + content[2000000:]
+        previous_recipe = ChunkIndex.get_recipe(content)
+
+        started_at = time.monotonic()
+        file_delta, _ = ReinitializeRepositoryAPI._get_file_delta(
+            previous_recipe, edited_content
+        )
+        duration_seconds = time.monotonic() - started_at
+
+        self.assertLessEqual(
+            sum(
+                len(base64.b64decode(instruction[1]))
+                for instruction in file_delta["instructions"]
+                if instruction[0] == "insert"
+            ),
+            2 * 4 * config.INSIGHT_DELTA_SYNC_AVERAGE_CHUNK_SIZE_BYTES,
+        )
+
+        if content_defined_chunkifier.numpy is not None:
+            self.assertLess(duration_seconds, 0.5)
+
+    def test_get_file_delta_with_rewritten_content(self) -> None:
+        self.assertIsNone(
+            ReinitializeRepositoryAPI._get_file_delta(
+                ChunkIndex.get_recipe(bytes(range(256)) * 256),
+                bytes(reversed(range(256))) * 256,
+            )
+        )
+
+    @patch("insight_cli.api.base.AsyncSession.request", new_callable=AsyncMock)
+    def test_make_request_with_failed_batch(self, mock_request):
+        mock_request.return_value = MagicMock(status_code=405)
+        make_batch_request = ReinitializeRepositoryAPI._make_batch_request
 
-        self.assertEqual(mock_put.call_count, 3)
+        async def fail_last_batch(payload: dict) -> None:
+            if payload["batch_index"] == payload["num_total_batches"] - 1:
+                raise ValueError("failed batch")
+
+            await make_batch_request(payload)
+
+        with patch.object(
+            ReinitializeRepositoryAPI,
+            "_make_batch_request",
+            side_effect=fail_last_batch,
+        ):
+            with self.assertRaises(IncompleteUploadError) as context:
+                ReinitializeRepositoryAPI().make_request(
+                    "123", self._repository_file_changes()
+                )
+
+        self.assertEqual(
+            context.exception.acknowledged_file_paths,
+            {self._path(f"file{i}") for i in range(3, 7)},
+        )
 
 
 if __name__ == "__main__":
@@ -1,4 +1,4 @@
-from unittest.mock import patch
+from unittest.mock import patch, AsyncMock, MagicMock
 import unittest
 
 from insight_cli.api import ValidateRepositoryIdAPI
@@ -6,14 +6,16 @@ from insight_cli.config import config
 
 
 class TestValidateRepositoryIdAPI(unittest.TestCase):
-    @patch("requests.post")
-    def test_make_request(self, mock_request_get):
+    @patch("insight_cli.api.base.AsyncSession.request", new_callable=AsyncMock)
+    def test_make_request(self, mock_request):
+        mock_request.return_value = MagicMock()
         repository_id = "test_repo_id"
 
         ValidateRepositoryIdAPI().make_request(repository_id),
 
-        mock_request_get.assert_called_once_with(
-            url=f"{config.INSIGHT_API_BASE_URL}/validate_repository_id",
+        mock_request.assert_called_once_with(
+            "POST",
+            f"{config.INSIGHT_API_BASE_URL}/validate_repository_id",
             json={"repository_id": repository_id},
         )
 
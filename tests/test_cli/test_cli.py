@@ -184,7 +184,7 @@ class TestCLI(unittest.TestCase):
 
         self.assertEqual(
             [action.dest for action in cli._parser._actions],
-            ["help", "initialize", "query"],
+            ["help", "initialize", "query", "limit", "path", "glob", "timeout"],
         )
 
         for command_name in cli._parsed_commands:
@@ -225,7 +225,15 @@ class TestCLI(unittest.TestCase):
         cli.parse_arguments()
 
         self.assertEqual(
-            cli._arguments, argparse.Namespace(initialize=None, query=None)
+            cli._arguments,
+            argparse.Namespace(
+                initialize=None,
+                query=None,
+                limit=None,
+                path=None,
+                glob=None,
+                timeout=None,
+            ),
         )
 
     @patch("sys.argv", ["", "--query", "water"])
@@ -235,7 +243,15 @@ class TestCLI(unittest.TestCase):
         cli.parse_arguments()
 
         self.assertEqual(
-            cli._arguments, argparse.Namespace(initialize=None, query=["water"])
+            cli._arguments,
+            argparse.Namespace(
+                initialize=None,
+                query=["water"],
+                limit=None,
+                path=None,
+                glob=None,
+                timeout=None,
+            ),
         )
 
     @patch("sys.argv", ["", "--query", "water", "-i"])
@@ -245,7 +261,15 @@ class TestCLI(unittest.TestCase):
         cli.parse_arguments()
 
         self.assertEqual(
-            cli._arguments, argparse.Namespace(initialize=[], query=["water"])
+            cli._arguments,
+            argparse.Namespace(
+                initialize=[],
+                query=["water"],
+                limit=None,
+                path=None,
+                glob=None,
+                timeout=None,
+            ),
         )
 
     @patch("builtins.print")
@@ -269,6 +293,121 @@ class TestCLI(unittest.TestCase):
 
         mock_print.assert_called_with("command 1 executor")
 
+    @patch("builtins.print")
+    @patch("sys.argv", ["", "--batch-query", "queries.txt"])
+    def test_execute_invoked_commands_with_hyphenated_flag(self, mock_print) -> None:
+        class Command1(Command):
+            def __init__(self):
+                super().__init__(
+                    flags=["-b", "--batch-query"],
+                    description="command1",
+                )
+
+            def execute(self, queries_file_path: str) -> None:
+                print(f"command 1 executor with {queries_file_path}")
+
+        cli = CLI(commands=[Command1()])
+
+        cli.parse_arguments()
+
+        cli.execute_invoked_commands()
+
+        mock_print.assert_called_once_with("command 1 executor with queries.txt")
+
+    @patch("builtins.print")
+    @patch("insight_cli.utils.Deadline.start")
+    @patch("sys.argv", ["", "--c", "--timeout", "2.5"])
+    def test_execute_invoked_commands_with_timeout(
+        self, mock_deadline_start, mock_print
+    ) -> None:
+        class Command1(Command):
+            def __init__(self):
+                super().__init__(
+                    flags=["--c"],
+                    description="command1",
+                )
+
+            def execute(self) -> None:
+                print("command 1 executor")
+
+        cli = CLI(commands=[Command1()])
+
+        cli.parse_arguments()
+
+        cli.execute_invoked_commands()
+
+        mock_deadline_start.assert_called_once_with(2.5)
+        mock_print.assert_called_once_with("command 1 executor")
+
+    @patch("builtins.print")
+    @patch("sys.argv", ["", "--c", "--limit", "5"])
+    def test_execute_invoked_commands_with_option(self, mock_print) -> None:
+        class Command1(Command):
+            def __init__(self):
+                super().__init__(
+                    flags=["--c"],
+                    description="command1",
+                )
+
+            def execute(self, *, limit: int | None = None) -> None:
+                print(f"command 1 executor with limit {limit!r}")
+
+        cli = CLI(commands=[Command1()])
+
+        cli.parse_arguments()
+
+        cli.execute_invoked_commands()
+
+        mock_print.assert_called_once_with("command 1 executor with limit 5")
+
+    @patch("sys.stderr")
+    @patch("sys.argv", ["", "--query", "water", "--timeout", "0"])
+    def test_parse_arguments_with_non_positive_timeout(self, _) -> None:
+        cli = CLI(commands=[QueryCommand()])
+
+        with self.assertRaises(SystemExit):
+            cli.parse_arguments()
+
+    @patch("sys.stderr")
+    @patch("sys.argv", ["", "--limit", "5"])
+    def test_parse_arguments_with_option_without_command(self, mock_stderr) -> None:
+        cli = CLI(commands=[QueryCommand()])
+
+        with self.assertRaises(SystemExit) as context_manager:
+            cli.parse_arguments()
+
+        self.assertEqual(context_manager.exception.code, 2)
+        self.assertIn(
+            "--limit requires --query",
+            "".join(call.args[0] for call in mock_stderr.write.call_args_list),
+        )
+
+    @patch("sys.stderr")
+    @patch("sys.argv", ["", "--query", "water", "--limit", "0"])
+    def test_parse_arguments_with_non_positive_limit(self, mock_stderr) -> None:
+        cli = CLI(commands=[QueryCommand()])
+
+        with self.assertRaises(SystemExit) as context_manager:
+            cli.parse_arguments()
+
+        self.assertEqual(context_manager.exception.code, 2)
+        self.assertIn(
+            "'0' is not a positive integer",
+            "".join(call.args[0] for call in mock_stderr.write.call_args_list),
+        )
+
+    def test_option_help(self) -> None:
+        query_command = QueryCommand()
+        cli = CLI(commands=[query_command])
+        limit_action = next(
+            action for action in cli._parser._actions if action.dest == "limit"
+        )
+
+        self.assertEqual(
+            limit_action.help,
+            query_command.executor_options[0]["description"] + " (with --query)",
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -158,6 +158,36 @@ class TestCommand(unittest.TestCase):
         command = TestConcreteCommand(["--test", "-t"], "descr")
         self.assertEqual(command.executor_params, [{"name": "num", "type": int}])
 
+    def test_executor_options(self) -> None:
+        class TestConcreteCommand(Command):
+            def execute(self, num: int, *, limit: int | None = None) -> int:
+                return num
+
+        command = TestConcreteCommand(["--test", "-t"], "descr")
+        self.assertEqual(command.executor_params, [{"name": "num", "type": int}])
+        self.assertEqual(
+            command.executor_options,
+            [{"name": "limit", "type": int, "default": None, "description": None}],
+        )
+
+    def test_executor_options_with_descriptions(self) -> None:
+        class TestConcreteCommand(Command):
+            def execute(self, *, limit: int | None = None) -> None:
+                pass
+
+        command = TestConcreteCommand(
+            ["--test"], "descr", option_descriptions={"limit": "a limit"}
+        )
+        self.assertEqual(command.executor_options[0]["description"], "a limit")
+
+    def test_raise_for_invalid_option_descriptions_with_unknown_option(self) -> None:
+        class TestConcreteCommand(Command):
+            def execute(self, num: int) -> None:
+                pass
+
+        with self.assertRaises(ValueError):
+            TestConcreteCommand(["--test"], "descr", option_descriptions={"num": "a"})
+
     def test_executor_param_names_with_no_executor_params(self) -> None:
         class TestConcreteCommand(Command):
             def execute(self) -> int:
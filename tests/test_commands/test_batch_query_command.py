@@ -0,0 +1,71 @@
+from unittest.mock import patch
+import contextlib, io, json, unittest
+
+from insight_cli.commands import BatchQueryCommand
+
+
+class TestBatchQueryCommand(unittest.TestCase):
+    def test_parse_queries(self) -> None:
+        lines = [
+            "where is water defined\n",
+            "\n",
+            '{"id": "q-1", "query": "drink water"}\n',
+            '{"query": "fire"}\n',
+            '{"id": 1}\n',
+        ]
+
+        self.assertEqual(
+            BatchQueryCommand._parse_queries(lines),
+            [
+                (1, "where is water defined"),
+                ("q-1", "drink water"),
+                (4, "fire"),
+                (5, '{"id": 1}'),
+            ],
+        )
+
+    @patch("insight_cli.repository.Repository.query_batch")
+    @patch("insight_cli.repository.Repository.__init__", return_value=None)
+    def test_execute(self, _, mock_query_batch) -> None:
+        mock_query_batch.return_value = iter(
+            [
+                {
+                    "index": 1,
+                    "query_string": "fire",
+                    "matches": None,
+                    "error": "connection refused",
+                    "latency_seconds": 0.5,
+                },
+                {
+                    "index": 0,
+                    "query_string": "water",
+                    "matches": [],
+                    "error": None,
+                    "latency_seconds": 0.25,
+                },
+            ]
+        )
+
+        with patch(
+            "sys.stdin", io.StringIO('{"id": "a", "query": "water"}\nfire\n')
+        ), io.StringIO() as buffer, contextlib.redirect_stdout(buffer):
+            BatchQueryCommand().execute("-")
+            output = buffer.getvalue().strip().split("\n")
+
+        mock_query_batch.assert_called_once_with(["water", "fire"])
+        self.assertEqual(
+            [json.loads(line) for line in output],
+            [
+                {
+                    "id": 2,
+                    "query": "fire",
+                    "latency_ms": 500.0,
+                    "error": "connection refused",
+                },
+                {"id": "a", "query": "water", "latency_ms": 250.0, "matches": []},
+            ],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,6 +2,7 @@ from pathlib import Path
 from unittest.mock import patch
 import contextlib, io, unittest
 
+from insight_cli import config
 from insight_cli.repository import InvalidRepositoryError
 from insight_cli.commands import QueryCommand
 from insight_cli.utils import Color
@@ -18,6 +19,30 @@ class TestQueryCommand(unittest.TestCase):
 
         self.assertEqual(output, [Color.yellow("0 matches found")])
 
+    def test_print_matches_prints_matches_as_they_arrive(self) -> None:
+        Color.init()
+        printed_lines = []
+
+        def matches():
+            for i in range(2):
+                yield {
+                    "path": f"/file{i}.py",
+                    "start_line": 1,
+                    "end_line": 1,
+                    "content": "x = 1",
+                }
+                self.assertEqual(len(printed_lines), i + 1)
+
+        with patch(
+            "builtins.print",
+            side_effect=lambda output, **_: printed_lines.append(output),
+        ):
+            QueryCommand._print_matches(matches())
+
+        self.assertEqual(
+            printed_lines[-1], "\n" + Color.yellow("2 matches found in 2 files")
+        )
+
     def test_print_matches_with_one_match(self) -> None:
         Color.init()
         matches = [
@@ -36,9 +61,10 @@ class TestQueryCommand(unittest.TestCase):
         self.assertEqual(
             output,
             [
-                Color.yellow("1 match found in the following file:"),
                 "/example_path",
                 f"\tLine 3 - 4: {Color.green('const x = () => {...};')}",
+                "",
+                Color.yellow("1 match found in 1 file"),
             ],
         )
 
@@ -65,17 +91,18 @@ class TestQueryCommand(unittest.TestCase):
         self.assertEqual(
             output,
             [
-                Color.yellow("2 matches found in the following files:"),
                 "/server/insight_cli/config/database.js",
                 f"\tLine 3 - 15: {Color.green('const connectToDatabase = async () => {...};')}",
                 "",
                 "/server/insight_cli/server.js",
                 f"\tLine 25: {Color.green('await connectToDatabase(app);')}",
+                "",
+                Color.yellow("2 matches found in 2 files"),
             ],
         )
 
     @patch("insight_cli.commands.QueryCommand._print_matches")
-    @patch("insight_cli.repository.Repository.query")
+    @patch("insight_cli.repository.Repository.query_stream")
     @patch("insight_cli.api.ValidateRepositoryIdAPI.make_request")
     def test_execute_with_valid_repository(
         self,
@@ -95,11 +122,71 @@ class TestQueryCommand(unittest.TestCase):
         query_command.execute(query_string)
 
         mock_validate_repository_id_api_make_request.assert_called_once()
-        mock_repository_query.assert_called_once_with(query_string)
+        mock_repository_query.assert_called_once_with(
+            query_string,
+            config.INSIGHT_QUERY_SYNC_TIMEOUT_SECONDS,
+            limit=None,
+            scope=None,
+        )
         mock_print_matches.assert_called_once()
 
+    @patch("insight_cli.commands.QueryCommand._print_matches")
+    @patch("insight_cli.repository.Repository.query_stream")
+    @patch("insight_cli.api.ValidateRepositoryIdAPI.make_request")
+    def test_execute_with_limit(
+        self,
+        mock_validate_repository_id_api_make_request,
+        mock_repository_query,
+        mock_print_matches,
+    ) -> None:
+        query_command = QueryCommand()
+        query_string = "sample_query_string"
+
+        mock_validate_repository_id_api_make_request.return_value = {
+            "repository_id_is_valid": True
+        }
+        mock_repository_query.return_value = []
+
+        query_command.execute(query_string, limit=5)
+
+        mock_repository_query.assert_called_once_with(
+            query_string,
+            config.INSIGHT_QUERY_SYNC_TIMEOUT_SECONDS,
+            limit=5,
+            scope=None,
+        )
+        mock_print_matches.assert_called_once()
+
+    @patch("insight_cli.commands.QueryCommand._print_matches")
+    @patch("insight_cli.repository.Repository.query_stream")
+    def test_execute_with_scope(self, mock_repository_query, _) -> None:
+        query_command = QueryCommand()
+        mock_repository_query.return_value = []
+
+        query_command.execute("sample_query_string", path="services", glob="**/*.py")
+
+        scope = mock_repository_query.call_args.kwargs["scope"]
+
+        self.assertTrue(scope.contains(Path("services/billing/water.py")))
+        self.assertFalse(scope.contains(Path("water.py")))
+
     @patch("builtins.print")
-    @patch("insight_cli.repository.Repository.query")
+    @patch("insight_cli.repository.Repository.query_stream")
+    def test_execute_with_path_outside_repository(
+        self, mock_repository_query, mock_print
+    ) -> None:
+        Color.init()
+        query_command = QueryCommand()
+
+        query_command.execute("sample_query_string", path="..")
+
+        mock_repository_query.assert_not_called()
+        mock_print.assert_called_once_with(
+            Color.red(".. is not in the insight repository")
+        )
+
+    @patch("builtins.print")
+    @patch("insight_cli.repository.Repository.query_stream")
     @patch("insight_cli.api.ValidateRepositoryIdAPI.make_request")
     def test_execute_with_invalid_repository(
         self,
@@ -119,12 +206,17 @@ class TestQueryCommand(unittest.TestCase):
         query_command.execute(query_string)
 
         mock_validate_repository_id_api_make_request.assert_called_once()
-        mock_repository_query.assert_called_once_with(query_string)
+        mock_repository_query.assert_called_once_with(
+            query_string,
+            config.INSIGHT_QUERY_SYNC_TIMEOUT_SECONDS,
+            limit=None,
+            scope=None,
+        )
         mock_print.assert_called_once_with(
             Color.red(f"{Path.cwd()} is not an insight repository")
         )
 
-    @patch("insight_cli.repository.Repository.query")
+    @patch("insight_cli.repository.Repository.query_stream")
     @patch("insight_cli.api.ValidateRepositoryIdAPI.make_request")
     def test_execute_with_connection_error(
         self, mock_validate_repository_id_api_make_request, mock_repository_query
@@ -142,7 +234,12 @@ class TestQueryCommand(unittest.TestCase):
             query_command.execute(query_string)
 
         mock_validate_repository_id_api_make_request.assert_called_once()
-        mock_repository_query.assert_called_once_with(query_string)
+        mock_repository_query.assert_called_once_with(
+            query_string,
+            config.INSIGHT_QUERY_SYNC_TIMEOUT_SECONDS,
+            limit=None,
+            scope=None,
+        )
 
 
 if __name__ == "__main__":
@@ -142,6 +142,57 @@ class Testauthenticator(unittest.TestCase):
 
         self.assertTrue(authenticator.is_valid)
 
+    @patch("insight_cli.api.ValidateRepositoryIdAPI.make_request")
+    def test_is_valid_with_cached_validation(
+        self, mock_validate_repository_id_request
+    ) -> None:
+        authenticator = Authenticator(self._temp_dir_path)
+        authenticator.create({"repository_id": "example"})
+        mock_validate_repository_id_request.return_value = {
+            "repository_id_is_valid": True
+        }
+
+        self.assertTrue(authenticator.is_valid)
+        self.assertTrue(Authenticator(self._temp_dir_path).is_valid)
+        mock_validate_repository_id_request.assert_called_once_with(
+            "example", latency_history=None
+        )
+
+        authenticator.invalidate()
+
+        self.assertTrue(authenticator.is_valid)
+        self.assertEqual(mock_validate_repository_id_request.call_count, 2)
+
+    @patch("insight_cli.api.ValidateRepositoryIdAPI.make_request")
+    def test_is_valid_with_expired_validation(
+        self, mock_validate_repository_id_request
+    ) -> None:
+        authenticator = Authenticator(self._temp_dir_path)
+        authenticator.create({"repository_id": "example"})
+        authenticator.validate("example")
+        mock_validate_repository_id_request.return_value = {
+            "repository_id_is_valid": False
+        }
+
+        with patch("insight_cli.config.INSIGHT_REPOSITORY_VALIDATION_TTL_SECONDS", 0):
+            self.assertFalse(authenticator.is_valid)
+
+        self.assertFalse(authenticator.is_valid)
+        self.assertEqual(mock_validate_repository_id_request.call_count, 2)
+
+    @patch("insight_cli.api.ValidateRepositoryIdAPI.make_request")
+    def test_is_valid_with_validation_of_other_repository_id(
+        self, mock_validate_repository_id_request
+    ) -> None:
+        authenticator = Authenticator(self._temp_dir_path)
+        authenticator.create({"repository_id": "example"})
+        authenticator.validate("other")
+        mock_validate_repository_id_request.return_value = {
+            "repository_id_is_valid": False
+        }
+
+        self.assertFalse(authenticator.is_valid)
+
 
 if __name__ == "__main__":
     unittest.main()
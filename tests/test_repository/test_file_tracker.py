@@ -1,5 +1,5 @@
-from datetime import datetime
 from pathlib import Path
+from unittest.mock import patch
 import json, os, tempfile, unittest
 
 
@@ -39,62 +39,85 @@ class TestFileTracker(unittest.TestCase):
         for file_path in file_paths:
             file_path.touch()
 
+        file_stats = {file_path: os.stat(file_path) for file_path in file_paths}
         file_tracker = FileTracker(self.temp_dir_path)
 
-        file_tracker.create(file_paths)
+        with patch("os.stat") as mock_stat:
+            file_tracker.create(file_paths, file_stats)
 
+        mock_stat.assert_not_called()
         self.assertEqual(
-            file_tracker.tracked_file_modified_times,
+            file_tracker.tracked_file_versions,
             {
-                Path(file_path): datetime.fromtimestamp(os.path.getmtime(file_path))
+                file_path: (
+                    file_stats[file_path].st_mtime_ns,
+                    file_stats[file_path].st_ino,
+                )
                 for file_path in file_paths
             },
         )
 
-    def change_file_paths(self) -> None:
+    def test_create_without_file_stat(self) -> None:
+        file_path = self.temp_dir_path / "file1"
+        file_path.touch()
+        file_tracker = FileTracker(self.temp_dir_path)
+
+        with self.assertRaises(FileNotFoundError):
+            file_tracker.create([file_path], {})
+
+    def test_read_legacy_modified_times(self) -> None:
+        with open(self.temp_dir_path / FileTracker._FILE_NAME, "w") as file:
+            file.write(json.dumps({"LICENSE": 1701634560.5}))
+
+        file_tracker = FileTracker(self.temp_dir_path)
+
+        self.assertEqual(
+            file_tracker.tracked_file_versions,
+            {Path("LICENSE"): (1701634560500000000, None)},
+        )
+
+    def test_change_file_paths(self) -> None:
         with open(self.temp_dir_path / FileTracker._FILE_NAME, "w") as file:
             file.write(
                 json.dumps(
                     {
-                        ".gitignore": 1702751393.8241253,
-                        "LICENSE": 1701634560.0,
-                        "README.md": 1702698126.458091,
-                        "requirements.txt": 1701913276.0,
+                        "LICENSE": [1701634560000000000, 1],
+                        "README.md": [1702698126458091000, 2],
                         "setup.py": 1702696466.8386028,
                     }
                 )
             )
 
-        paths_to_add = [Path("file1"), Path("file2")]
+        file_paths = [Path(self.temp_dir_path / name) for name in ("file1", "setup.py")]
 
-        for path in paths_to_add:
-            path.touch()
-
-        paths_to_update = [Path("setup.py")]
-        paths_to_delete = [Path("LICENSE")]
+        for file_path in file_paths:
+            file_path.touch()
 
+        file_stats = {file_path: os.stat(file_path) for file_path in file_paths}
         file_tracker = FileTracker(self.temp_dir_path)
 
         file_tracker.change_file_paths(
-            paths_to_add=paths_to_add,
-            paths_to_update=paths_to_update,
-            paths_to_delete=paths_to_delete,
+            paths_to_add=[Path(self.temp_dir_path / "file1")],
+            paths_to_update=[Path("setup.py")],
+            paths_to_delete=[Path("LICENSE")],
+            file_stats={
+                Path(self.temp_dir_path / "file1"): file_stats[file_paths[0]],
+                Path("setup.py"): file_stats[file_paths[1]],
+            },
         )
 
-        new_file_paths = [
-            Path(".gitignore"),
-            Path("README.md"),
-            Path("requirements.txt"),
-            Path("file1"),
-            Path("file2"),
-            Path("setup.py"),
-        ]
-
         self.assertEqual(
-            file_tracker.tracked_file_modified_times,
+            file_tracker.tracked_file_versions,
             {
-                Path(file_path): datetime.fromtimestamp(os.path.getmtime(file_path))
-                for file_path in new_file_paths
+                Path("README.md"): (1702698126458091000, 2),
+                Path(self.temp_dir_path / "file1"): (
+                    file_stats[file_paths[0]].st_mtime_ns,
+                    file_stats[file_paths[0]].st_ino,
+                ),
+                Path("setup.py"): (
+                    file_stats[file_paths[1]].st_mtime_ns,
+                    file_stats[file_paths[1]].st_ino,
+                ),
             },
         )
 
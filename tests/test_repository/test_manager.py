@@ -1,7 +1,6 @@
-import unittest
+import os, unittest
 from unittest.mock import patch, MagicMock, PropertyMock
 from pathlib import Path
-from datetime import datetime
 from tempfile import TemporaryDirectory
 from insight_cli.repository.manager import Manager
 
@@ -23,11 +22,13 @@ class TestManager(unittest.TestCase):
         ]
 
         manager = Manager(Path(self.temp_dir.name))
-        manager.create(repository_id, nested_repository_file_paths)
+        manager.create(repository_id, nested_repository_file_paths, {})
         mock_authenticator_create.assert_called_once_with(
             {"repository_id": repository_id}
         )
-        mock_file_tracker_create.assert_called_once_with(nested_repository_file_paths)
+        mock_file_tracker_create.assert_called_once_with(
+            nested_repository_file_paths, {}
+        )
 
     @patch("insight_cli.repository.file_tracker.FileTracker.change_file_paths")
     def test_update(self, mock_change_file_paths):
@@ -37,16 +38,32 @@ class TestManager(unittest.TestCase):
             "delete": [self.temp_dir.name + "/file2"],
         }
         manager = Manager(Path(self.temp_dir.name))
-        manager.update(repository_file_changes)
+        manager.update(repository_file_changes, {})
         mock_change_file_paths.assert_called_once_with(
             paths_to_add=[Path(self.temp_dir.name + "/file3")],
             paths_to_update=[Path(self.temp_dir.name + "/file1")],
             paths_to_delete=[Path(self.temp_dir.name + "/file2")],
+            file_stats={},
+        )
+
+    def test_update_increments_revision(self):
+        file_path = Path(self.temp_dir.name, "file1")
+        file_path.touch()
+        manager = Manager(Path(self.temp_dir.name))
+        manager.create("test_repo_id", [], {})
+
+        manager.update({"add": [], "update": [], "delete": []}, {})
+        self.assertEqual(manager.revision, 0)
+
+        manager.update(
+            {"add": [str(file_path)], "update": [], "delete": []},
+            {file_path: os.stat(file_path)},
         )
+        self.assertEqual(manager.revision, 1)
 
     def test_delete(self):
         manager = Manager(Path(self.temp_dir.name))
-        manager.create("", [])
+        manager.create("", [], {})
         manager.delete()
         self.assertFalse(Path(manager._path).exists())
 
@@ -71,14 +88,14 @@ class TestManager(unittest.TestCase):
         mock_authenticator_data.assert_called_once()
 
     @patch(
-        "insight_cli.repository.file_tracker.FileTracker.tracked_file_modified_times",
+        "insight_cli.repository.file_tracker.FileTracker.tracked_file_versions",
         new_callable=PropertyMock,
         return_value={},
     )
-    def test_tracked_file_modified_times(self, mock_tracked_file_modified_times):
+    def test_tracked_file_versions(self, mock_tracked_file_versions):
         manager = Manager(Path(self.temp_dir.name))
-        self.assertEqual(manager.tracked_file_modified_times, {})
-        mock_tracked_file_modified_times.assert_called_once()
+        self.assertEqual(manager.tracked_file_versions, {})
+        mock_tracked_file_versions.assert_called_once()
 
 
 if __name__ == "__main__":
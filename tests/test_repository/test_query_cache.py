@@ -0,0 +1,106 @@
+from pathlib import Path
+from unittest.mock import patch
+import json, tempfile, unittest
+
+from insight_cli.repository.query_cache import QueryCache
+
+
+class TestQueryCache(unittest.TestCase):
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self._temp_dir_path = Path(self._temp_dir.name)
+
+    def tearDown(self):
+        self._temp_dir.cleanup()
+
+    def _get_matches(self, *file_paths: str) -> list[dict]:
+        return [
+            {"path": file_path, "start_line": 1, "end_line": 1, "content": "water"}
+            for file_path in file_paths
+        ]
+
+    def test_get_without_entry(self):
+        self.assertIsNone(QueryCache(self._temp_dir_path).get("123", "water"))
+
+    def test_set_and_get(self):
+        matches = self._get_matches("water.py")
+        QueryCache(self._temp_dir_path).set("123", "drink  water ", matches)
+
+        query_cache = QueryCache(self._temp_dir_path)
+        self.assertEqual(query_cache.get("123", "drink water"), matches)
+        self.assertIsNone(query_cache.get("456", "drink water"))
+        self.assertIsNone(query_cache.get("123", "drink"))
+
+    def test_set_evicts_least_recently_used_entries(self):
+        matches = self._get_matches("water.py")
+        query_cache = QueryCache(self._temp_dir_path)
+
+        with patch(
+            "insight_cli.config.INSIGHT_QUERY_CACHE_MAX_SIZE_BYTES",
+            2 * len(json.dumps(matches)),
+        ):
+            query_cache.set("123", "water", matches)
+            query_cache.set("123", "fire", matches)
+            query_cache.get("123", "water")
+            query_cache.set("123", "earth", matches)
+
+        self.assertEqual(query_cache.get("123", "water"), matches)
+        self.assertIsNone(query_cache.get("123", "fire"))
+        self.assertEqual(query_cache.get("123", "earth"), matches)
+
+    def test_evict(self):
+        query_cache = QueryCache(self._temp_dir_path)
+        query_cache.set("123", "water", self._get_matches("water.py", "ocean.py"))
+        query_cache.set("123", "fire", self._get_matches("fire.py"))
+        query_cache.set("123", "nothing", [])
+
+        query_cache.evict([Path("ocean.py")])
+
+        query_cache = QueryCache(self._temp_dir_path)
+        self.assertIsNone(query_cache.get("123", "water"))
+        self.assertEqual(query_cache.get("123", "fire"), self._get_matches("fire.py"))
+        self.assertEqual(query_cache.get("123", "nothing"), [])
+
+    def test_get_at_revision(self):
+        matches = self._get_matches("water.py")
+        query_cache = QueryCache(self._temp_dir_path)
+        query_cache.set("123", "water", matches, revision=1, etag='"water"')
+
+        self.assertEqual(query_cache.get("123", "water", revision=1), matches)
+        self.assertIsNone(query_cache.get("123", "water", revision=2))
+        self.assertEqual(
+            query_cache.get_many("123", ["water", "fire"], revision=1),
+            {"water": matches},
+        )
+
+        entry = QueryCache(self._temp_dir_path).get_entry("123", "water")
+
+        self.assertEqual(entry["revision"], 1)
+        self.assertEqual(entry["etag"], '"water"')
+
+    def test_get_entry_with_limit(self):
+        matches = self._get_matches("water.py", "fire.py")
+        query_cache = QueryCache(self._temp_dir_path)
+        query_cache.set("123", "water", matches[:1], limit=1)
+
+        self.assertIsNone(query_cache.get_entry("123", "water"))
+        self.assertEqual(
+            query_cache.get_entry("123", "water", limit=1)["matches"], matches[:1]
+        )
+
+        query_cache.set("123", "water", matches)
+
+        self.assertEqual(query_cache.get("123", "water"), matches)
+        self.assertIsNone(query_cache.get_entry("123", "water", limit=2))
+
+    def test_clear(self):
+        query_cache = QueryCache(self._temp_dir_path)
+        query_cache.set("123", "water", self._get_matches("water.py"))
+
+        query_cache.clear()
+
+        self.assertIsNone(QueryCache(self._temp_dir_path).get("123", "water"))
+
+
+if __name__ == "__main__":
+    unittest.main()
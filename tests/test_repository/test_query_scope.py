@@ -0,0 +1,96 @@
+from pathlib import Path
+import tempfile, unittest
+
+from insight_cli.repository import QueryScope, PathNotInRepositoryError
+
+
+class TestQueryScope(unittest.TestCase):
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self._temp_dir_path = Path(self._temp_dir.name)
+        (self._temp_dir_path / "services" / "billing").mkdir(parents=True)
+        (self._temp_dir_path / "services" / "billing" / "water.py").touch()
+
+    def tearDown(self):
+        self._temp_dir.cleanup()
+
+    def test_contains_with_path(self):
+        scope = QueryScope(self._temp_dir_path, path="services/billing/")
+
+        self.assertTrue(
+            scope.contains(self._temp_dir_path / "services/billing/water.py")
+        )
+        self.assertTrue(
+            scope.contains(self._temp_dir_path / "services/billing/api/fire.py")
+        )
+        self.assertFalse(
+            scope.contains(self._temp_dir_path / "services/billing_v2/water.py")
+        )
+        self.assertFalse(scope.contains(self._temp_dir_path / "water.py"))
+
+    def test_contains_with_glob(self):
+        scope = QueryScope(self._temp_dir_path, glob="services/**/test_*.py")
+
+        self.assertTrue(scope.contains(self._temp_dir_path / "services/test_water.py"))
+        self.assertTrue(
+            scope.contains(self._temp_dir_path / "services/billing/test_water.py")
+        )
+        self.assertFalse(
+            scope.contains(self._temp_dir_path / "services/billing/water.py")
+        )
+        self.assertFalse(scope.contains(self._temp_dir_path / "test_water.py"))
+
+    def test_contains_with_path_and_glob(self):
+        scope = QueryScope(self._temp_dir_path, path="services", glob="*/*/water.py")
+
+        self.assertTrue(
+            scope.contains(self._temp_dir_path / "services/billing/water.py")
+        )
+        self.assertFalse(scope.contains(self._temp_dir_path / "tools/billing/water.py"))
+
+    def test_root_path(self):
+        self.assertEqual(
+            QueryScope(self._temp_dir_path, path="services").root_path,
+            self._temp_dir_path / "services",
+        )
+        self.assertEqual(
+            QueryScope(self._temp_dir_path, path="services/billing/water.py").root_path,
+            self._temp_dir_path / "services/billing",
+        )
+        self.assertEqual(
+            QueryScope(
+                self._temp_dir_path, path="services", glob="services/billing/*.py"
+            ).root_path,
+            self._temp_dir_path / "services/billing",
+        )
+        self.assertEqual(
+            QueryScope(self._temp_dir_path, glob="**/water.py").root_path,
+            self._temp_dir_path,
+        )
+
+    def test_from_predicate(self):
+        scope = QueryScope.from_predicate(
+            QueryScope(self._temp_dir_path, glob="services/**/test_*.py").predicate
+        )
+
+        self.assertEqual(
+            scope.key, QueryScope(self._temp_dir_path, glob="services/**/test_*.py").key
+        )
+        self.assertTrue(
+            scope.contains(self._temp_dir_path / "services/billing/test_water.py")
+        )
+        self.assertFalse(
+            scope.contains(self._temp_dir_path / "services/billing/water.py")
+        )
+
+    def test_path_not_in_repository(self):
+        with self.assertRaises(PathNotInRepositoryError):
+            QueryScope(self._temp_dir_path / "services", path="../water.py")
+
+    def test_without_path_or_glob(self):
+        with self.assertRaises(ValueError):
+            QueryScope(self._temp_dir_path)
+
+
+if __name__ == "__main__":
+    unittest.main()
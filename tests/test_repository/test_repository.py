@@ -1,8 +1,9 @@
 from pathlib import Path
-from unittest.mock import patch
-import tempfile, unittest
+from unittest.mock import patch, MagicMock
+import os, requests, tempfile, threading, unittest
 
-from insight_cli.repository import Repository, InvalidRepositoryError
+from insight_cli.api import IncompleteUploadError
+from insight_cli.repository import QueryScope, Repository, InvalidRepositoryError
 
 
 class TestRepository(unittest.TestCase):
@@ -101,6 +102,143 @@ class TestRepository(unittest.TestCase):
         self.assertTrue(repository.is_valid)
         mock_reinitialize_repository_request.assert_called_once()
 
+    @patch("insight_cli.api.ReinitializeRepositoryAPI.make_request")
+    @patch("insight_cli.api.ValidateRepositoryIdAPI.make_request")
+    @patch("insight_cli.api.InitializeRepositoryAPI.make_request")
+    def test_reinitialize_with_incomplete_upload(
+        self,
+        mock_initialize_repository_request,
+        mock_make_validate_repository_id_request,
+        mock_reinitialize_repository_request,
+    ) -> None:
+        mock_make_validate_repository_id_request.return_value = {
+            "repository_id_is_valid": True
+        }
+        mock_initialize_repository_request.return_value = {"repository_id": "123"}
+        repository = Repository(self._temp_dir_path)
+        repository.initialize()
+
+        acknowledged_file_path = repository._path / "acknowledged_file.py"
+        unacknowledged_file_path = repository._path / "unacknowledged_file.py"
+        acknowledged_file_path.touch()
+        unacknowledged_file_path.touch()
+        mock_reinitialize_repository_request.side_effect = IncompleteUploadError(
+            {str(acknowledged_file_path)}
+        )
+
+        with self.assertRaises(IncompleteUploadError):
+            repository.reinitialize()
+
+        self.assertEqual(
+            list(repository._manager.tracked_file_versions),
+            [acknowledged_file_path],
+        )
+
+        mock_reinitialize_repository_request.side_effect = None
+        repository.reinitialize()
+
+        self.assertEqual(
+            [
+                path
+                for path, _ in mock_reinitialize_repository_request.call_args.kwargs[
+                    "repository_file_changes"
+                ]["add"]
+            ],
+            [str(unacknowledged_file_path)],
+        )
+
+    @patch("insight_cli.api.ReinitializeRepositoryAPI.make_request")
+    @patch("insight_cli.api.InitializeRepositoryAPI.make_request")
+    def test_reinitialize_with_unreachable_server(
+        self,
+        mock_initialize_repository_request,
+        mock_reinitialize_repository_request,
+    ) -> None:
+        mock_initialize_repository_request.return_value = {"repository_id": "123"}
+        repository = Repository(self._temp_dir_path)
+        repository.initialize()
+        edited_file_path = self._temp_dir_path / "edited_file.py"
+        deleted_file_path = self._temp_dir_path / "deleted_file.py"
+        edited_file_path.touch()
+        deleted_file_path.touch()
+        mock_reinitialize_repository_request.side_effect = requests.ConnectionError()
+
+        with self.assertRaises(requests.ConnectionError):
+            repository.reinitialize()
+
+        self.assertEqual(
+            sorted(repository._manager.sync_journal.file_paths),
+            [deleted_file_path, edited_file_path],
+        )
+
+        edited_file_path.write_text("water")
+        deleted_file_path.unlink()
+
+        with self.assertRaises(requests.ConnectionError):
+            repository.reinitialize()
+
+        self.assertEqual(
+            sorted(repository._manager.sync_journal.file_paths),
+            [deleted_file_path, edited_file_path],
+        )
+
+        mock_reinitialize_repository_request.reset_mock(side_effect=True)
+
+        with patch("os.stat", side_effect=os.stat) as mock_stat:
+            repository.reinitialize()
+
+        self.assertNotIn(
+            edited_file_path, [c.args[0] for c in mock_stat.call_args_list]
+        )
+
+        mock_reinitialize_repository_request.assert_called_once()
+        self.assertEqual(
+            mock_reinitialize_repository_request.call_args.kwargs[
+                "repository_file_changes"
+            ],
+            {"add": [(str(edited_file_path), 5)], "update": [], "delete": []},
+        )
+        self.assertEqual(repository._manager.sync_journal.file_paths, [])
+        self.assertEqual(
+            list(repository._manager.tracked_file_versions), [edited_file_path]
+        )
+
+    @patch("insight_cli.api.ReinitializeRepositoryAPI.make_request")
+    @patch("insight_cli.api.InitializeRepositoryAPI.make_request")
+    def test_reinitialize_with_journaled_files_outside_scope(
+        self,
+        mock_initialize_repository_request,
+        mock_reinitialize_repository_request,
+    ) -> None:
+        mock_initialize_repository_request.return_value = {"repository_id": "123"}
+        (self._temp_dir_path / "billing").mkdir()
+        edited_file_path = self._temp_dir_path / "edited_file.py"
+        deleted_file_path = self._temp_dir_path / "deleted_file.py"
+        edited_file_path.touch()
+        deleted_file_path.touch()
+        repository = Repository(self._temp_dir_path)
+        repository.initialize()
+        repository._manager.sync_journal.append([edited_file_path, deleted_file_path])
+        edited_file_path.write_text("water")
+        deleted_file_path.unlink()
+
+        repository.reinitialize(QueryScope(self._temp_dir_path, "billing"))
+
+        self.assertEqual(
+            mock_reinitialize_repository_request.call_args.kwargs[
+                "repository_file_changes"
+            ],
+            {
+                "add": [],
+                "update": [(str(edited_file_path), 5)],
+                "delete": [(str(deleted_file_path), 0)],
+            },
+        )
+        self.assertEqual(repository._manager.sync_journal.file_paths, [])
+        self.assertEqual(
+            list(repository._manager.tracked_file_versions), [edited_file_path]
+        )
+
     def test_uninitialize_with_non_existing_repository(self) -> None:
         repository = Repository(self._temp_dir_path)
 
@@ -129,7 +267,7 @@ class TestRepository(unittest.TestCase):
         self.assertTrue(repository.is_valid)
 
         repository.uninitialize()
-        
+
         mock_uninitialize_repository_request.assert_called_once()
 
         self.assertFalse(repository.is_valid)
@@ -141,7 +279,7 @@ class TestRepository(unittest.TestCase):
         with self.assertRaises(InvalidRepositoryError):
             repository.query(query_string)
 
-    @patch("insight_cli.api.QueryRepositoryAPI.make_request")
+    @patch("insight_cli.api.QueryRepositoryAPI.stream_request")
     @patch("insight_cli.api.ValidateRepositoryIdAPI.make_request")
     @patch("insight_cli.api.InitializeRepositoryAPI.make_request")
     def test_query_with_existing_repository(
@@ -168,6 +306,316 @@ class TestRepository(unittest.TestCase):
 
         self.assertTrue(repository.is_valid)
 
+    @patch("insight_cli.api.ReinitializeRepositoryAPI.make_request")
+    @patch("insight_cli.api.QueryRepositoryAPI.stream_request")
+    @patch("insight_cli.api.ValidateRepositoryIdAPI.make_request")
+    @patch("insight_cli.api.InitializeRepositoryAPI.make_request")
+    def test_query_with_cached_results(
+        self,
+        mock_initialize_repository_request,
+        mock_make_validate_repository_id_request,
+        mock_query_repository_request,
+        mock_reinitialize_repository_request,
+    ) -> None:
+        mock_make_validate_repository_id_request.return_value = {
+            "repository_id_is_valid": True
+        }
+        mock_initialize_repository_request.return_value = {"repository_id": "123"}
+        water_file_path = self._temp_dir_path / "water.py"
+        fire_file_path = self._temp_dir_path / "fire.py"
+        water_file_path.touch()
+        fire_file_path.touch()
+
+        def stream_request(_, query_string, etag, on_response, **__):
+            on_response(
+                MagicMock(
+                    status_code=304 if etag == query_string else 200,
+                    headers={"ETag": query_string},
+                )
+            )
+
+            if etag == query_string:
+                return iter([])
+
+            return iter(
+                [
+                    {
+                        "path": str(self._temp_dir_path / f"{query_string}.py"),
+                        "start_line": 1,
+                        "end_line": 1,
+                        "content": query_string,
+                    }
+                ]
+            )
+
+        mock_query_repository_request.side_effect = stream_request
+        repository = Repository(self._temp_dir_path)
+        repository.initialize()
+
+        water_matches = repository.query("water")
+        fire_matches = repository.query("fire")
+
+        self.assertEqual(repository.query("water"), water_matches)
+        self.assertEqual(mock_query_repository_request.call_count, 2)
+
+        os.utime(water_file_path, (0, 0))
+
+        self.assertEqual(repository.query("water"), water_matches)
+        self.assertIsNone(mock_query_repository_request.call_args.kwargs["etag"])
+        self.assertEqual(repository.query("fire"), fire_matches)
+        self.assertEqual(mock_query_repository_request.call_args.kwargs["etag"], "fire")
+        self.assertEqual(repository.query("fire"), fire_matches)
+        self.assertEqual(mock_query_repository_request.call_count, 4)
+        self.assertEqual(mock_query_repository_request.call_args.kwargs["revision"], 1)
+
+    @patch("insight_cli.api.QueryRepositoryAPI.stream_top_matches")
+    @patch("insight_cli.api.QueryRepositoryAPI.stream_request")
+    @patch("insight_cli.api.InitializeRepositoryAPI.make_request")
+    def test_query_with_limit(
+        self,
+        mock_initialize_repository_request,
+        mock_query_repository_request,
+        mock_query_repository_top_matches,
+    ) -> None:
+        mock_initialize_repository_request.return_value = {"repository_id": "123"}
+        matches = [
+            {"path": "water.py", "start_line": line, "end_line": line, "content": ""}
+            for line in range(1, 4)
+        ]
+        mock_query_repository_request.side_effect = lambda *_, **__: iter(matches)
+        mock_query_repository_top_matches.side_effect = (
+            lambda _, __, limit, **___: iter(matches[:limit])
+        )
+        repository = Repository(self._temp_dir_path)
+        repository.initialize()
+
+        self.assertEqual(repository.query("water", limit=2), matches[:2])
+        self.assertEqual(repository.query("water", limit=2), matches[:2])
+        mock_query_repository_top_matches.assert_called_once()
+        mock_query_repository_request.assert_not_called()
+
+        self.assertEqual(repository.query("water"), matches)
+        self.assertEqual(repository.query("water", limit=1), matches[:1])
+        mock_query_repository_top_matches.assert_called_once()
+        mock_query_repository_request.assert_called_once()
+
+    @patch("insight_cli.api.ReinitializeRepositoryAPI.make_request")
+    @patch("insight_cli.api.QueryRepositoryAPI.stream_request")
+    @patch("insight_cli.api.InitializeRepositoryAPI.make_request")
+    def test_query_with_scope(
+        self,
+        mock_initialize_repository_request,
+        mock_query_repository_request,
+        mock_reinitialize_repository_request,
+    ) -> None:
+        mock_initialize_repository_request.return_value = {"repository_id": "123"}
+        mock_query_repository_request.side_effect = lambda *_, **__: iter([])
+        (self._temp_dir_path / "billing").mkdir()
+        (self._temp_dir_path / "billing" / "water.py").touch()
+        (self._temp_dir_path / "fire.py").touch()
+        repository = Repository(self._temp_dir_path)
+        repository.initialize()
+        (self._temp_dir_path / "billing" / "steam.py").touch()
+        (self._temp_dir_path / "earth.py").touch()
+
+        repository.query("water", scope=QueryScope(self._temp_dir_path, "billing"))
+
+        file_size_changes = mock_reinitialize_repository_request.call_args.kwargs[
+            "repository_file_changes"
+        ]
+        self.assertEqual(
+            file_size_changes["add"],
+            [(str(self._temp_dir_path / "billing" / "steam.py"), 0)],
+        )
+        self.assertEqual(
+            mock_query_repository_request.call_args.kwargs["scope"],
+            {
+                "repository_path": str(self._temp_dir_path),
+                "path": "billing",
+                "glob": None,
+            },
+        )
+
+        self.assertEqual(
+            repository.query("water", scope=QueryScope(self._temp_dir_path, "air")),
+            [],
+        )
+        mock_query_repository_request.assert_called_once()
+
+    @patch("insight_cli.api.ReinitializeRepositoryAPI.make_request")
+    @patch("insight_cli.api.QueryRepositoryAPI.stream_request")
+    @patch("insight_cli.api.InitializeRepositoryAPI.make_request")
+    def test_query_with_sync_timeout(
+        self,
+        mock_initialize_repository_request,
+        mock_query_repository_request,
+        mock_reinitialize_repository_request,
+    ) -> None:
+        mock_initialize_repository_request.return_value = {"repository_id": "123"}
+        match = {"path": "water.py", "start_line": 1, "end_line": 1, "content": ""}
+        mock_query_repository_request.side_effect = lambda *_, **__: iter([match])
+        sync_is_unblocked = threading.Event()
+        mock_reinitialize_repository_request.side_effect = (
+            lambda **_: sync_is_unblocked.wait()
+        )
+        repository = Repository(self._temp_dir_path)
+        repository.initialize()
+        (self._temp_dir_path / "water.py").touch()
+
+        self.assertEqual(repository.query("water", sync_timeout_seconds=0.01), [match])
+        self.assertFalse(repository.is_synced)
+        self.assertIsNone(repository._manager.query_cache.get("123", "water"))
+
+        sync_is_unblocked.set()
+        repository.wait_for_sync()
+
+        self.assertTrue(repository.is_synced)
+        self.assertEqual(repository.query("water", sync_timeout_seconds=1), [match])
+        mock_reinitialize_repository_request.assert_called_once()
+        self.assertEqual(repository._manager.query_cache.get("123", "water"), [match])
+
+    @patch("insight_cli.api.ReinitializeRepositoryAPI.make_request")
+    @patch("insight_cli.api.QueryRepositoryAPI.stream_request")
+    @patch("insight_cli.api.InitializeRepositoryAPI.make_request")
+    def test_query_with_sync_timeout_uses_state_before_sync(
+        self,
+        mock_initialize_repository_request,
+        mock_query_repository_request,
+        mock_reinitialize_repository_request,
+    ) -> None:
+        mock_initialize_repository_request.return_value = {"repository_id": "123"}
+        mock_query_repository_request.side_effect = lambda *_, **__: iter([])
+        (self._temp_dir_path / "billing").mkdir()
+        (self._temp_dir_path / "billing" / "water.py").touch()
+        repository = Repository(self._temp_dir_path)
+        repository.initialize()
+        (self._temp_dir_path / "billing" / "steam.py").touch()
+        sync_is_unblocked = threading.Event()
+
+        def reinitialize(**_) -> None:
+            ice_file_path = self._temp_dir_path / "billing" / "ice.py"
+            ice_file_path.touch()
+            repository._manager.update(
+                {"add": [str(ice_file_path)], "update": [], "delete": []},
+                {ice_file_path: os.stat(ice_file_path)},
+            )
+            sync_is_unblocked.wait()
+
+        mock_reinitialize_repository_request.side_effect = reinitialize
+
+        repository.query(
+            "water",
+            sync_timeout_seconds=0.01,
+            scope=QueryScope(self._temp_dir_path, "billing"),
+        )
+        sync_is_unblocked.set()
+        repository.wait_for_sync()
+
+        self.assertEqual(
+            mock_query_repository_request.call_args.kwargs["scope"],
+            QueryScope(self._temp_dir_path, "billing").predicate,
+        )
+        self.assertEqual(mock_query_repository_request.call_args.kwargs["revision"], 0)
+        self.assertEqual(repository._manager.revision, 2)
+
+    @patch("insight_cli.api.ReinitializeRepositoryAPI.make_request")
+    @patch("insight_cli.api.InitializeRepositoryAPI.make_request")
+    def test_sync_with_failed_sync(
+        self,
+        mock_initialize_repository_request,
+        mock_reinitialize_repository_request,
+    ) -> None:
+        mock_initialize_repository_request.return_value = {"repository_id": "123"}
+        mock_reinitialize_repository_request.side_effect = ConnectionError()
+        repository = Repository(self._temp_dir_path)
+        repository.initialize()
+        (self._temp_dir_path / "water.py").touch()
+
+        with self.assertRaises(ConnectionError):
+            repository.sync(timeout_seconds=1)
+
+        self.assertTrue(repository.is_synced)
+
+    @patch("insight_cli.api.QueryRepositoryAPI.make_requests")
+    @patch("insight_cli.api.ValidateRepositoryIdAPI.make_request")
+    @patch("insight_cli.api.InitializeRepositoryAPI.make_request")
+    def test_query_batch(
+        self,
+        mock_initialize_repository_request,
+        mock_make_validate_repository_id_request,
+        mock_query_repository_requests,
+    ) -> None:
+        mock_make_validate_repository_id_request.return_value = {
+            "repository_id_is_valid": True
+        }
+        mock_initialize_repository_request.return_value = {"repository_id": "123"}
+        mock_query_repository_requests.side_effect = lambda _, queries, **__: (
+            {
+                "index": i,
+                "query_string": query_string,
+                "matches": [],
+                "error": None,
+                "latency_seconds": 0.1,
+            }
+            for i, query_string in queries
+        )
+        repository = Repository(self._temp_dir_path)
+        repository.initialize()
+
+        results = list(repository.query_batch(["water", "fire"]))
+
+        self.assertEqual([result["index"] for result in results], [0, 1])
+        mock_query_repository_requests.assert_called_once_with(
+            "123", [(0, "water"), (1, "fire")], revision=0
+        )
+
+        results = list(repository.query_batch(["earth", "fire"]))
+
+        self.assertEqual([result["index"] for result in results], [1, 0])
+        self.assertEqual(
+            mock_query_repository_requests.call_args.args, ("123", [(0, "earth")])
+        )
+
+    @patch("insight_cli.api.ValidateRepositoryIdAPI.make_request")
+    @patch("insight_cli.api.InitializeRepositoryAPI.make_request")
+    def test_is_valid_uses_cached_validation(
+        self,
+        mock_initialize_repository_request,
+        mock_make_validate_repository_id_request,
+    ) -> None:
+        mock_initialize_repository_request.return_value = {"repository_id": "123"}
+        Repository(self._temp_dir_path).initialize()
+
+        self.assertTrue(Repository(self._temp_dir_path).is_valid)
+        mock_make_validate_repository_id_request.assert_not_called()
+
+    @patch("insight_cli.api.QueryRepositoryAPI.stream_request")
+    @patch("insight_cli.api.ValidateRepositoryIdAPI.make_request")
+    @patch("insight_cli.api.InitializeRepositoryAPI.make_request")
+    def test_query_with_unknown_repository(
+        self,
+        mock_initialize_repository_request,
+        mock_make_validate_repository_id_request,
+        mock_query_repository_request,
+    ) -> None:
+        mock_initialize_repository_request.return_value = {"repository_id": "123"}
+        mock_make_validate_repository_id_request.return_value = {
+            "repository_id_is_valid": False
+        }
+        mock_query_repository_request.side_effect = requests.HTTPError(
+            response=MagicMock(status_code=404)
+        )
+        Repository(self._temp_dir_path).initialize()
+        repository = Repository(self._temp_dir_path)
+
+        with self.assertRaises(InvalidRepositoryError):
+            repository.query("water")
+
+        mock_make_validate_repository_id_request.assert_called_once_with(
+            "123", latency_history=repository._manager.latency_history
+        )
+        self.assertFalse(repository.is_valid)
+
     def test_is_valid_with_invalid_repository(self) -> None:
         repository = Repository(self._temp_dir_path)
         self.assertFalse(repository.is_valid)
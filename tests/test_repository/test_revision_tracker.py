@@ -0,0 +1,33 @@
+from pathlib import Path
+import tempfile, unittest
+
+from insight_cli.repository.revision_tracker import RevisionTracker
+
+
+class TestRevisionTracker(unittest.TestCase):
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self._temp_dir_path = Path(self._temp_dir.name)
+
+    def tearDown(self):
+        self._temp_dir.cleanup()
+
+    def test_revision_without_file(self):
+        self.assertEqual(RevisionTracker(self._temp_dir_path).revision, 0)
+
+    def test_increment(self):
+        revision_tracker = RevisionTracker(self._temp_dir_path)
+        revision_tracker.create()
+
+        self.assertEqual(revision_tracker.increment(), 1)
+        self.assertEqual(revision_tracker.increment(), 2)
+        self.assertEqual(RevisionTracker(self._temp_dir_path).revision, 2)
+
+        revision_tracker.create()
+
+        self.assertEqual(RevisionTracker(self._temp_dir_path).revision, 0)
+
+    def test_revision_with_corrupt_file(self):
+        (self._temp_dir_path / RevisionTracker._FILE_NAME).write_text("{")
+
+        self.assertEqual(RevisionTracker(self._temp_dir_path).revision, 0)
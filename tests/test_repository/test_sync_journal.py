@@ -0,0 +1,45 @@
+from pathlib import Path
+import tempfile, unittest
+
+from insight_cli.repository.sync_journal import SyncJournal
+
+
+class TestSyncJournal(unittest.TestCase):
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self._temp_dir_path = Path(self._temp_dir.name)
+
+    def tearDown(self):
+        self._temp_dir.cleanup()
+
+    def test_file_paths_without_file(self):
+        self.assertEqual(SyncJournal(self._temp_dir_path).file_paths, [])
+
+    def test_append(self):
+        sync_journal = SyncJournal(self._temp_dir_path)
+        sync_journal.append([Path("b.py"), Path("a.py")])
+        sync_journal.append(["a.py", Path("c.py")])
+
+        self.assertEqual(
+            SyncJournal(self._temp_dir_path).file_paths,
+            [Path("a.py"), Path("b.py"), Path("c.py")],
+        )
+
+    def test_clear(self):
+        sync_journal = SyncJournal(self._temp_dir_path)
+        sync_journal.append([Path("a.py")])
+        sync_journal.clear()
+
+        self.assertEqual(sync_journal.file_paths, [])
+        self.assertFalse((self._temp_dir_path / SyncJournal._FILE_NAME).exists())
+
+    def test_append_without_parent_dir(self):
+        sync_journal = SyncJournal(self._temp_dir_path / "missing")
+        sync_journal.append([Path("a.py")])
+
+        self.assertEqual(sync_journal.file_paths, [])
+
+    def test_file_paths_with_corrupt_file(self):
+        (self._temp_dir_path / SyncJournal._FILE_NAME).write_text("[")
+
+        self.assertEqual(SyncJournal(self._temp_dir_path).file_paths, [])
@@ -0,0 +1,558 @@
+from pathlib import Path
+from unittest.mock import patch
+import requests, tempfile, unittest
+
+from insight_cli.api import (
+    ChunkIndex,
+    IncompleteUploadError,
+    InitializeRepositoryAPI,
+    LatencyHistory,
+    UploadJournal,
+    QueryRepositoryAPI,
+    ReinitializeRepositoryAPI,
+    UninitializeRepositoryAPI,
+    ValidateRepositoryIdAPI,
+)
+from insight_cli.api.base import MediaType, MultipartRequestBody, RequestBody
+from insight_cli.repository import QueryScope
+from insight_cli.server import LocalServer
+from insight_cli.server import local_server
+from insight_cli.server.local_server import LocalServerRequestHandler
+from insight_cli.utils import File
+
+
+class TestLocalServer(unittest.TestCase):
+    def setUp(self) -> None:
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self._temp_dir_path = Path(self._temp_dir.name)
+        self._server = LocalServer().start()
+        self._base_url_patcher = patch(
+            "insight_cli.config.INSIGHT_API_BASE_URL", self._server.url
+        )
+        self._base_url_patcher.start()
+
+    def tearDown(self) -> None:
+        MediaType._supported_media_types = set()
+        MediaType._rejected_media_types = set()
+        RequestBody._accepted_content_encodings = set()
+        RequestBody._rejected_content_encodings = set()
+        MultipartRequestBody._is_advertised = False
+        self._base_url_patcher.stop()
+        self._server.stop()
+        self._temp_dir.cleanup()
+
+    def _write_files(self, files: dict[str, bytes]) -> dict[str, int]:
+        for file_name, content in files.items():
+            (self._temp_dir_path / file_name).write_bytes(content)
+
+        return {
+            str(self._temp_dir_path / file_name): len(content)
+            for file_name, content in files.items()
+        }
+
+    def _path(self, file_name: str) -> str:
+        return str(self._temp_dir_path / file_name)
+
+    def _initialize(self, files: dict[str, bytes]) -> str:
+        return InitializeRepositoryAPI.make_request(self._write_files(files))[
+            "repository_id"
+        ]
+
+    def test_initialize_and_query(self) -> None:
+        repository_id = self._initialize(
+            {"water.py": b"def drink_water():\n    pass\n", "fire.py": b"x = 1\n"}
+        )
+
+        self.assertTrue(
+            ValidateRepositoryIdAPI.make_request(repository_id)[
+                "repository_id_is_valid"
+            ]
+        )
+        self.assertEqual(
+            QueryRepositoryAPI.make_request(repository_id, "water"),
+            [
+                {
+                    "path": self._path("water.py"),
+                    "start_line": 1,
+                    "end_line": 1,
+                    "content": "def drink_water():",
+                }
+            ],
+        )
+
+    def test_stream_query(self) -> None:
+        repository_id = self._initialize(
+            {"water.py": b"water = 1\nwater = 2\n", "fire.py": b"fire = 1\n"}
+        )
+
+        self.assertEqual(
+            list(QueryRepositoryAPI.stream_request(repository_id, "water")),
+            QueryRepositoryAPI.make_request(repository_id, "water"),
+        )
+        self.assertEqual(
+            len(list(QueryRepositoryAPI.stream_request(repository_id, "water"))), 2
+        )
+
+    @patch("insight_cli.config.INSIGHT_API_HEDGE_MIN_NUM_LATENCIES", 1)
+    def test_hedged_requests(self) -> None:
+        repository_id = self._initialize({"water.py": b"water = 1\n"})
+        latency_history = LatencyHistory()
+        latency_history.record("query_repository", 0)
+        latency_history.record("validate_repository_id", 0)
+
+        for _ in range(10):
+            self.assertEqual(
+                list(
+                    QueryRepositoryAPI.stream_request(
+                        repository_id, "water", latency_history
+                    )
+                ),
+                QueryRepositoryAPI.make_request(repository_id, "water"),
+            )
+            self.assertTrue(
+                ValidateRepositoryIdAPI.make_request(repository_id, latency_history)[
+                    "repository_id_is_valid"
+                ]
+            )
+
+        self.assertIsNotNone(latency_history.get_percentile("query_repository", 50))
+
+    def test_stream_query_with_etag(self) -> None:
+        repository_id = self._initialize({"water.py": b"water = 1\n"})
+        responses = []
+
+        matches = list(
+            QueryRepositoryAPI.stream_request(
+                repository_id, "water", revision=0, on_response=responses.append
+            )
+        )
+        etag = responses[0].headers["ETag"]
+
+        self.assertEqual(len(matches), 1)
+        self.assertEqual(
+            list(
+                QueryRepositoryAPI.stream_request(
+                    repository_id, "water", etag=etag, on_response=responses.append
+                )
+            ),
+            [],
+        )
+        self.assertEqual(responses[1].status_code, 304)
+        self.assertEqual(
+            list(
+                QueryRepositoryAPI.stream_request(
+                    repository_id, "fire", etag=etag, on_response=responses.append
+                )
+            ),
+            [],
+        )
+        self.assertEqual(responses[2].status_code, 200)
+
+    def test_stream_top_matches(self) -> None:
+        repository_id = self._initialize(
+            {f"water_{index}.py": b"water = 1\n" for index in range(5)}
+        )
+        matches = QueryRepositoryAPI.make_request(repository_id, "water")
+
+        with patch("insight_cli.config.INSIGHT_QUERY_PAGE_SIZE", 2):
+            self.assertEqual(
+                list(QueryRepositoryAPI.stream_top_matches(repository_id, "water", 3)),
+                matches[:3],
+            )
+            self.assertEqual(
+                list(QueryRepositoryAPI.stream_top_matches(repository_id, "water", 9)),
+                matches,
+            )
+
+    def test_stream_query_with_scope(self) -> None:
+        (self._temp_dir_path / "billing").mkdir()
+        repository_id = self._initialize(
+            {
+                "water.py": b"water = 1\n",
+                "billing/steam.py": b"water = 2\n",
+                "billing/steam.txt": b"water = 3\n",
+            }
+        )
+
+        self.assertEqual(
+            [
+                match["path"]
+                for match in QueryRepositoryAPI.stream_request(
+                    repository_id,
+                    "water",
+                    scope=QueryScope(
+                        self._temp_dir_path, "billing", "**/*.py"
+                    ).predicate,
+                )
+            ],
+            [self._path("billing/steam.py")],
+        )
+
+    def test_stream_query_without_ndjson_support(self) -> None:
+        repository_id = self._initialize({"water.py": b"water = 1\n"})
+
+        with patch.object(
+            LocalServerRequestHandler, "_NDJSON_MEDIA_TYPE", "application/x-unknown"
+        ):
+            matches = list(QueryRepositoryAPI.stream_request(repository_id, "water"))
+
+        self.assertEqual(
+            matches, QueryRepositoryAPI.make_request(repository_id, "water")
+        )
+
+    def test_query_batch(self) -> None:
+        repository_id = self._initialize(
+            {"water.py": b"water = 1\n", "fire.py": b"fire = 1\n"}
+        )
+
+        results = sorted(
+            QueryRepositoryAPI.make_requests(
+                repository_id, [(0, "water"), (1, "fire"), (2, "earth")]
+            ),
+            key=lambda result: result["index"],
+        )
+
+        self.assertEqual(
+            [[match["path"] for match in result["matches"]] for result in results],
+            [[self._path("water.py")], [self._path("fire.py")], []],
+        )
+
+    @patch("insight_cli.config.INSIGHT_API_MULTIPART_UPLOADS", False)
+    def test_initialize_with_json_uploads(self) -> None:
+        repository_id = self._initialize({"water.py": b"water = 1\n"})
+
+        self.assertEqual(
+            self._server.state.repositories[repository_id],
+            {self._path("water.py"): b"water = 1\n"},
+        )
+
+    def test_initialize_with_empty_repository(self) -> None:
+        repository_id = self._initialize({})
+
+        self.assertEqual(self._server.state.repositories[repository_id], {})
+
+    def test_initialize_skips_known_content(self) -> None:
+        files = {"water.py": b"water = 1\n", "empty.py": b""}
+        self._initialize(files)
+
+        with patch.object(
+            InitializeRepositoryAPI,
+            "_get_request_body",
+            side_effect=InitializeRepositoryAPI._get_request_body,
+        ) as mock_get_request_body:
+            repository_id = self._initialize(files)
+
+        self.assertEqual(
+            [call.args[0]["files"] for call in mock_get_request_body.call_args_list],
+            [{}, {}],
+        )
+        self.assertEqual(
+            self._server.state.repositories[repository_id],
+            {self._path(file_name): content for file_name, content in files.items()},
+        )
+
+    def test_reinitialize_skips_known_content(self) -> None:
+        repository_id = self._initialize(
+            {"water.py": b"water = 1\n", "fire.py": b"fire = 1\n"}
+        )
+        self._write_files({"copy.py": b"water = 1\n", "fire.py": b"fire = 2\n"})
+
+        with patch.object(
+            File, "read", side_effect=File.read, autospec=True
+        ) as mock_read:
+            ReinitializeRepositoryAPI.make_request(
+                repository_id,
+                {
+                    "add": [(self._path("copy.py"), 10)],
+                    "update": [(self._path("fire.py"), 9)],
+                    "delete": [(self._path("water.py"), 0)],
+                },
+            )
+
+        self.assertEqual(
+            [call.args[0].path for call in mock_read.call_args_list],
+            [Path(self._path("fire.py"))],
+        )
+        self.assertEqual(
+            self._server.state.repositories[repository_id],
+            {
+                self._path("copy.py"): b"water = 1\n",
+                self._path("fire.py"): b"fire = 2\n",
+            },
+        )
+
+    def test_initialize_resumes_interrupted_upload(self) -> None:
+        files = {"water.py": b"water = 1\n" * 30, "fire.py": b"fire = 1\n" * 30}
+        repository_file_sizes = self._write_files(files)
+        upload_journal = UploadJournal(self._temp_dir_path / ".insight")
+        make_batch_request = InitializeRepositoryAPI._make_batch_request
+
+        async def fail_last_batch(payload: dict) -> dict:
+            if payload["batch_index"] == payload["num_total_batches"] - 1:
+                raise ValueError("interrupted")
+
+            return await make_batch_request(payload)
+
+        with patch("insight_cli.config.INSIGHT_API_MAX_BATCH_SIZE_BYTES", 1000):
+            with patch.object(
+                InitializeRepositoryAPI,
+                "_make_batch_request",
+                side_effect=fail_last_batch,
+            ):
+                with self.assertRaises(ValueError):
+                    InitializeRepositoryAPI.make_request(
+                        repository_file_sizes, upload_journal
+                    )
+
+            with patch.object(
+                InitializeRepositoryAPI,
+                "_make_batch_request",
+                side_effect=make_batch_request,
+            ) as mock_make_batch_request:
+                repository_id = InitializeRepositoryAPI.make_request(
+                    repository_file_sizes,
+                    UploadJournal(self._temp_dir_path / ".insight"),
+                )["repository_id"]
+
+        self.assertEqual(
+            [
+                call.args[0]["batch_index"]
+                for call in mock_make_batch_request.call_args_list
+            ],
+            [mock_make_batch_request.call_args.args[0]["num_total_batches"] - 1],
+        )
+        self.assertEqual(
+            self._server.state.repositories[repository_id],
+            {self._path(file_name): content for file_name, content in files.items()},
+        )
+        self.assertFalse(
+            (self._temp_dir_path / ".insight" / "upload_journal.json").exists()
+        )
+
+    def test_reinitialize_applies_acknowledged_batches(self) -> None:
+        repository_id = self._initialize({"water.py": b"water = 1\n"})
+        self._write_files(
+            {"fire.py": b"fire = 1\n" * 30, "water.py": b"water = 2\n" * 20}
+        )
+        make_batch_request = ReinitializeRepositoryAPI._make_batch_request
+
+        async def fail_last_batch(payload: dict) -> None:
+            if payload["batch_index"] == payload["num_total_batches"] - 1:
+                raise ValueError("interrupted")
+
+            await make_batch_request(payload)
+
+        with patch(
+            "insight_cli.config.INSIGHT_API_MAX_BATCH_SIZE_BYTES", 1000
+        ), patch.object(
+            ReinitializeRepositoryAPI,
+            "_make_batch_request",
+            side_effect=fail_last_batch,
+        ):
+            with self.assertRaises(IncompleteUploadError) as context:
+                ReinitializeRepositoryAPI.make_request(
+                    repository_id,
+                    {
+                        "add": [(self._path("fire.py"), 270)],
+                        "update": [(self._path("water.py"), 200)],
+                        "delete": [],
+                    },
+                )
+
+        self.assertEqual(
+            context.exception.acknowledged_file_paths, {self._path("fire.py")}
+        )
+        self.assertEqual(
+            self._server.state.repositories[repository_id],
+            {
+                self._path("fire.py"): b"fire = 1\n" * 30,
+                self._path("water.py"): b"water = 1\n",
+            },
+        )
+
+    def _get_large_file_content(self, edited_line_index: int | None = None) -> bytes:
+        return b"".join(
+            (
+                b"x = 1\n"
+                if i == edited_line_index
+                else f"value_{i} = {i * 7919 % 10007}\n".encode("utf-8")
+            )
+            for i in range(8000)
+        )
+
+    def test_reinitialize_with_delta(self) -> None:
+        chunk_index = ChunkIndex()
+        content = self._get_large_file_content()
+        repository_id = InitializeRepositoryAPI.make_request(
+            self._write_files({"water.py": content}),
+            chunk_index=chunk_index,
+        )["repository_id"]
+
+        self.assertIsNone(chunk_index.get(self._path("water.py")))
+
+        ReinitializeRepositoryAPI.make_request(
+            repository_id,
+            {
+                "add": [],
+                "update": [(self._path("water.py"), len(content))],
+                "delete": [],
+            },
+            chunk_index=chunk_index,
+        )
+        edited_content = self._get_large_file_content(edited_line_index=4000)
+        self._write_files({"water.py": edited_content})
+
+        with patch.object(
+            ReinitializeRepositoryAPI,
+            "_make_batch_request",
+            side_effect=ReinitializeRepositoryAPI._make_batch_request,
+        ) as mock_make_batch_request:
+            ReinitializeRepositoryAPI.make_request(
+                repository_id,
+                {
+                    "add": [],
+                    "update": [(self._path("water.py"), len(edited_content))],
+                    "delete": [],
+                },
+                chunk_index=chunk_index,
+            )
+
+        mock_make_batch_request.assert_not_called()
+        self.assertEqual(
+            self._server.state.repositories[repository_id],
+            {self._path("water.py"): edited_content},
+        )
+        self.assertEqual(
+            chunk_index.get(self._path("water.py")),
+            ChunkIndex.get_recipe(edited_content),
+        )
+
+    def test_reinitialize_with_conflicting_delta(self) -> None:
+        chunk_index = ChunkIndex()
+        repository_id = self._initialize({"water.py": b"water = 1\n"})
+        chunk_index.update(
+            {
+                self._path("water.py"): ChunkIndex.get_recipe(
+                    self._get_large_file_content()
+                )
+            }
+        )
+        edited_content = self._get_large_file_content(edited_line_index=4000)
+        self._write_files({"water.py": edited_content})
+
+        with patch.object(
+            ChunkIndex, "get_recipe", wraps=ChunkIndex.get_recipe
+        ) as mock_get_recipe:
+            ReinitializeRepositoryAPI.make_request(
+                repository_id,
+                {
+                    "add": [],
+                    "update": [(self._path("water.py"), len(edited_content))],
+                    "delete": [],
+                },
+                chunk_index=chunk_index,
+            )
+
+        mock_get_recipe.assert_called_once()
+        self.assertEqual(
+            self._server.state.repositories[repository_id],
+            {self._path("water.py"): edited_content},
+        )
+        self.assertEqual(
+            chunk_index.get(self._path("water.py")),
+            ChunkIndex.get_recipe(edited_content),
+        )
+
+    def test_uninitialize(self) -> None:
+        repository_id = self._initialize({"water.py": b"water = 1\n"})
+
+        UninitializeRepositoryAPI.make_request(repository_id)
+
+        self.assertFalse(
+            ValidateRepositoryIdAPI.make_request(repository_id)[
+                "repository_id_is_valid"
+            ]
+        )
+
+    def test_unix_socket(self) -> None:
+        socket_path = self._temp_dir_path / "insight.sock"
+
+        with LocalServer(socket_path=str(socket_path)) as server, patch(
+            "insight_cli.config.INSIGHT_API_BASE_URL", server.url
+        ):
+            repository_id = self._initialize({"water.py": b"water = 1\n"})
+
+            self.assertEqual(server.url, f"unix://{socket_path}")
+            self.assertEqual(
+                list(QueryRepositoryAPI.stream_request(repository_id, "water")),
+                QueryRepositoryAPI.make_request(repository_id, "water"),
+            )
+
+        self.assertFalse(socket_path.exists())
+
+    def test_unsupported_content_encoding(self) -> None:
+        response = requests.post(
+            f"{self._server.url}/validate_repository_id",
+            data=b"{}",
+            headers={"Content-Encoding": "br"},
+        )
+
+        self.assertEqual(response.status_code, 415)
+        self.assertIn("gzip", response.headers["Accept-Encoding"])
+
+    def test_content_encoding_negotiation(self) -> None:
+        self.assertEqual(RequestBody.preferred_content_encoding(), "identity")
+
+        repository_id = self._initialize({"water.py": b"water = 1\n"})
+
+        self.assertNotEqual(RequestBody.preferred_content_encoding(), "identity")
+        self.assertEqual(
+            [
+                match["path"]
+                for match in QueryRepositoryAPI.make_request(repository_id, "water")
+            ],
+            [self._path("water.py")],
+        )
+
+    def test_multipart_negotiation(self) -> None:
+        self.assertFalse(MultipartRequestBody.is_supported())
+
+        self._initialize({"water.py": b"water = 1\n"})
+
+        self.assertTrue(MultipartRequestBody.is_supported())
+
+    @unittest.skipUnless(local_server.msgpack, "msgpack is not installed")
+    def test_msgpack_negotiation(self) -> None:
+        repository_id = self._initialize({"water.py": b"water = 1\n"})
+
+        self.assertEqual(MediaType.preferred_media_type(), "application/msgpack")
+
+        with patch("insight_cli.config.INSIGHT_API_MULTIPART_UPLOADS", False):
+            self._initialize({"fire.py": b"fire = 1\n"})
+
+        self.assertEqual(
+            [
+                match["path"]
+                for match in QueryRepositoryAPI.make_request(repository_id, "water")
+            ],
+            [self._path("water.py")],
+        )
+
+    def test_unsupported_media_type(self) -> None:
+        response = requests.post(
+            f"{self._server.url}/validate_repository_id",
+            data=b"{}",
+            headers={"Content-Type": "text/plain"},
+        )
+
+        self.assertEqual(response.status_code, 415)
+        self.assertIn("application/json", response.headers["Accept"])
+
+    def test_unknown_endpoint(self) -> None:
+        response = requests.post(f"{self._server.url}/unknown_endpoint", json={})
+
+        self.assertEqual(response.status_code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
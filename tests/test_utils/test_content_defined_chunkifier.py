@@ -0,0 +1,72 @@
+from unittest.mock import patch
+import random, unittest
+
+from insight_cli.utils import content_defined_chunkifier
+from insight_cli.utils.content_defined_chunkifier import ContentDefinedChunkifier
+
+
+class TestContentDefinedChunkifier(unittest.TestCase):
+    def setUp(self):
+        self.content = random.Random(0).randbytes(256 * 1024)
+
+    def _get_chunks(self, content: bytes) -> list[bytes]:
+        return [
+            content[start:end]
+            for start, end in ContentDefinedChunkifier.chunkify_content(content, 4096)
+        ]
+
+    def test_chunkify_content_with_empty_content(self):
+        self.assertEqual(ContentDefinedChunkifier.chunkify_content(b"", 4096), [])
+
+    def test_chunkify_content_covers_content(self):
+        chunk_ranges = ContentDefinedChunkifier.chunkify_content(self.content, 4096)
+
+        self.assertEqual(chunk_ranges[0][0], 0)
+        self.assertEqual(chunk_ranges[-1][1], len(self.content))
+
+        for (_, end), (start, _) in zip(chunk_ranges, chunk_ranges[1:]):
+            self.assertEqual(end, start)
+
+    def test_chunkify_content_chunk_sizes(self):
+        chunk_sizes = [
+            end - start
+            for start, end in ContentDefinedChunkifier.chunkify_content(
+                self.content, 4096
+            )
+        ]
+
+        self.assertTrue(all(1024 <= size <= 16384 for size in chunk_sizes[:-1]))
+        self.assertLess(abs(sum(chunk_sizes) / len(chunk_sizes) - 4096), 2048)
+
+    def test_chunkify_content_preserves_chunks_around_edit(self):
+        edited_content = self.content[:100000] + b"x = 1\n" + self.content[100000:]
+
+        chunks = self._get_chunks(self.content)
+        edited_chunks = self._get_chunks(edited_content)
+
+        self.assertLessEqual(len(set(edited_chunks) - set(chunks)), 2)
+        self.assertLessEqual(len(set(chunks) - set(edited_chunks)), 2)
+
+    @unittest.skipUnless(content_defined_chunkifier.numpy, "numpy is not installed")
+    def test_chunkify_content_without_numpy(self):
+        content = self.content + bytes(100000) + self.content[:70000]
+
+        for average_chunk_size_bytes in [64, 4096]:
+            chunk_ranges = ContentDefinedChunkifier.chunkify_content(
+                content, average_chunk_size_bytes
+            )
+
+            with patch.object(content_defined_chunkifier, "numpy", None):
+                self.assertEqual(
+                    ContentDefinedChunkifier.chunkify_content(
+                        content, average_chunk_size_bytes
+                    ),
+                    chunk_ranges,
+                )
+
+    def test_chunkify_content_with_invalid_average_chunk_size(self):
+        with self.assertRaises(ValueError):
+            ContentDefinedChunkifier.chunkify_content(self.content, 4000)
+
+        with self.assertRaises(ValueError):
+            ContentDefinedChunkifier.chunkify_content(self.content, 32)
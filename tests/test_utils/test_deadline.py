@@ -0,0 +1,50 @@
+import asyncio, requests, unittest
+
+from insight_cli.utils import Deadline, DeadlineExceededError
+
+
+class TestDeadline(unittest.IsolatedAsyncioTestCase):
+    def tearDown(self) -> None:
+        Deadline.clear()
+
+    def test_limit_without_deadline(self) -> None:
+        self.assertIsNone(Deadline.get_remaining_seconds())
+        self.assertIsNone(Deadline.limit(None))
+        self.assertEqual(Deadline.limit(5), 5)
+        Deadline.raise_if_expired()
+
+    def test_limit_with_deadline(self) -> None:
+        Deadline.start(60)
+
+        self.assertEqual(Deadline.limit(5), 5)
+        self.assertLessEqual(Deadline.limit(None), 60)
+        self.assertLessEqual(Deadline.limit(120), 60)
+        self.assertFalse(Deadline.is_expired())
+
+    def test_raise_if_expired(self) -> None:
+        Deadline.start(0.001)
+        Deadline._expires_at -= 1
+
+        with self.assertRaises(DeadlineExceededError):
+            Deadline.raise_if_expired()
+
+    def test_start_with_non_positive_timeout(self) -> None:
+        with self.assertRaises(ValueError):
+            Deadline.start(0)
+
+    async def test_wait_for_with_timeout(self) -> None:
+        with self.assertRaises(requests.ReadTimeout):
+            await Deadline.wait_for(asyncio.sleep(1), 0.01, requests.ReadTimeout)
+
+    async def test_wait_for_with_deadline(self) -> None:
+        Deadline.start(0.01)
+
+        with self.assertRaises(DeadlineExceededError):
+            await Deadline.wait_for(asyncio.sleep(1), 5)
+
+    async def test_wait_for_result(self) -> None:
+        Deadline.start(5)
+
+        self.assertEqual(
+            await Deadline.wait_for(asyncio.sleep(0, "result"), 1), "result"
+        )
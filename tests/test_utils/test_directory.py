@@ -1,4 +1,3 @@
-from datetime import datetime
 from pathlib import Path
 import os, tempfile, unittest
 
@@ -57,9 +56,9 @@ class TestDirectory(unittest.TestCase):
             ],
         )
 
-    def test_file_modification_times(self) -> None:
-        expected_file_modification_times = {
-            file_path: datetime.fromtimestamp(os.path.getmtime(file_path))
+    def test_file_versions(self) -> None:
+        expected_file_versions = {
+            file_path: (os.stat(file_path).st_mtime_ns, os.stat(file_path).st_ino)
             for file_path in [
                 self.temp_dir_path / "file1.py",
                 self.temp_dir_path / "subdir/file3.py",
@@ -73,21 +72,70 @@ class TestDirectory(unittest.TestCase):
                 self.temp_dir_path,
                 {"directory": {"subdir1"}, "file": {"file2.py"}},
                 {".py"},
-            ).file_modified_times,
-            expected_file_modification_times,
+            ).file_versions,
+            expected_file_versions,
         )
 
-    def test_file_paths_to_content(self) -> None:
+    def test_file_paths_to_size(self) -> None:
         self.assertEqual(
             Directory(
                 self.temp_dir_path,
                 {"directory": {"subdir1"}, "file": {"file2.py"}},
                 {".py"},
-            ).file_paths_to_content,
+            ).file_paths_to_size,
             {
-                str(self.temp_dir_path / "file1.py"): b"content1",
-                str(self.temp_dir_path / "subdir/file3.py"): b"content3",
-                str(self.temp_dir_path / "subdir/file4.py"): b"content4",
-                str(self.temp_dir_path / "subdir/file5.py"): b"content5",
+                str(self.temp_dir_path / "file1.py"): 8,
+                str(self.temp_dir_path / "subdir/file3.py"): 8,
+                str(self.temp_dir_path / "subdir/file4.py"): 8,
+                str(self.temp_dir_path / "subdir/file5.py"): 8,
             },
         )
+
+    def test_file_stats(self) -> None:
+        os.symlink(self.temp_dir_path / "subdir", self.temp_dir_path / "linked_dir")
+        os.symlink(self.temp_dir_path / "missing.py", self.temp_dir_path / "broken.py")
+
+        file_stats = Directory(
+            self.temp_dir_path,
+            {"directory": {"subdir1"}, "file": {"file2.py"}},
+            {".py"},
+        ).file_stats
+
+        self.assertEqual(
+            sorted(file_stats),
+            [
+                self.temp_dir_path / "file1.py",
+                self.temp_dir_path / "subdir/file3.py",
+                self.temp_dir_path / "subdir/file4.py",
+                self.temp_dir_path / "subdir/file5.py",
+            ],
+        )
+
+        for file_path, file_stat in file_stats.items():
+            self.assertEqual(file_stat.st_ino, os.stat(file_path).st_ino)
+            self.assertEqual(file_stat.st_mtime_ns, os.stat(file_path).st_mtime_ns)
+
+    def test_file_paths_with_scope_path(self) -> None:
+        self.assertEqual(
+            sorted(
+                Directory(
+                    self.temp_dir_path,
+                    {"directory": set(), "file": {"file4"}},
+                    {".py"},
+                    scope_path=self.temp_dir_path / "subdir",
+                ).file_paths
+            ),
+            [
+                self.temp_dir_path / "subdir/file3.py",
+                self.temp_dir_path / "subdir/file5.py",
+            ],
+        )
+        self.assertEqual(
+            Directory(
+                self.temp_dir_path,
+                {"directory": {"subdir1"}, "file": set()},
+                {".py"},
+                scope_path=self.temp_dir_path / "subdir1",
+            ).file_paths,
+            [],
+        )
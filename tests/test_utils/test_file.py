@@ -1,5 +1,5 @@
 from pathlib import Path
-import tempfile, unittest
+import hashlib, tempfile, unittest
 
 from insight_cli.utils.file import File
 
@@ -35,6 +35,37 @@ class TestFileClass(unittest.TestCase):
 
         self.assertEqual(File(file_path).content, b"")
 
+    def test_size(self):
+        file_path = self.temp_dir_path / "test_file_1.txt"
+        self.assertEqual(File(file_path).size, 0)
+
+        with open(file_path, "wb") as file:
+            file.write(b"Hello, World!")
+
+        self.assertEqual(File(file_path).size, 13)
+
+    def test_read(self):
+        file_path = self.temp_dir_path / "test_file_1.txt"
+        self.assertEqual(File(file_path).read(0, 5), b"")
+
+        with open(file_path, "wb") as file:
+            file.write(b"Hello, World!")
+
+        self.assertEqual(File(file_path).read(0, 5), b"Hello")
+        self.assertEqual(File(file_path).read(7, 20), b"World!")
+
+    def test_content_hash(self):
+        file_path = self.temp_dir_path / "test_file_1.txt"
+        self.assertEqual(File(file_path).content_hash, hashlib.sha256().hexdigest())
+
+        with open(file_path, "wb") as file:
+            file.write(b"Hello, World!")
+
+        self.assertEqual(
+            File(file_path).content_hash,
+            hashlib.sha256(b"Hello, World!").hexdigest(),
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
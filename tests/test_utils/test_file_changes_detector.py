@@ -1,6 +1,6 @@
 from pathlib import Path
-from datetime import datetime
-import tempfile, unittest
+from unittest.mock import patch
+import os, tempfile, unittest
 
 from insight_cli.utils.file_changes_detector import FileChangesDetector, File
 
@@ -15,19 +15,19 @@ class TestFileChangesDetector(unittest.TestCase):
 
     def test_file_path_changes_with_no_changes(self) -> None:
         previous_files = {
-            Path("file1.txt"): datetime(2023, 1, 1),
-            Path("file2.txt"): datetime(2023, 1, 2),
-            Path("file3.txt"): datetime(2023, 1, 4),
+            Path("file1.txt"): (1, 1),
+            Path("file2.txt"): (2, 1),
+            Path("file3.txt"): (4, 1),
         }
         current_files = {
-            Path("file1.txt"): datetime(2023, 1, 1),
-            Path("file2.txt"): datetime(2023, 1, 2),
-            Path("file3.txt"): datetime(2023, 1, 4),
+            Path("file1.txt"): (1, 1),
+            Path("file2.txt"): (2, 1),
+            Path("file3.txt"): (4, 1),
         }
 
         file_changes_detector = FileChangesDetector(
-            previous_file_modified_times=previous_files,
-            current_file_modified_times=current_files,
+            previous_file_versions=previous_files,
+            current_file_versions=current_files,
         )
 
         self.assertEqual(
@@ -37,20 +37,20 @@ class TestFileChangesDetector(unittest.TestCase):
 
     def test_file_path_changes_with_changes(self) -> None:
         previous_files = {
-            Path("file1.txt"): datetime(2023, 1, 1),
-            Path("file2.txt"): datetime(2023, 1, 2),
-            Path("file3.txt"): datetime(2023, 1, 4),
+            Path("file1.txt"): (1, 1),
+            Path("file2.txt"): (2, 1),
+            Path("file3.txt"): (4, 1),
         }
         current_files = {
-            Path("file1.txt"): datetime(2023, 1, 3),
-            Path("file2.txt"): datetime(2023, 1, 2),
-            Path("file4.txt"): datetime(2023, 1, 4),
-            Path("file5.txt"): datetime(2023, 1, 4),
+            Path("file1.txt"): (3, 1),
+            Path("file2.txt"): (2, 1),
+            Path("file4.txt"): (4, 1),
+            Path("file5.txt"): (4, 1),
         }
 
         file_changes_detector = FileChangesDetector(
-            previous_file_modified_times=previous_files,
-            current_file_modified_times=current_files,
+            previous_file_versions=previous_files,
+            current_file_versions=current_files,
         )
 
         self.assertSetEqual(
@@ -64,108 +64,118 @@ class TestFileChangesDetector(unittest.TestCase):
             set(file_changes_detector.file_path_changes["delete"]), {Path("file3.txt")}
         )
 
-    def test_file_changes_no_changes(self) -> None:
-        previous_files = {
-            Path("file1.txt"): datetime(2023, 1, 1),
-            Path("file2.txt"): datetime(2023, 1, 2),
-            Path("file3.txt"): datetime(2023, 1, 4),
-        }
-        current_files = {
-            Path("file1.txt"): datetime(2023, 1, 1),
-            Path("file2.txt"): datetime(2023, 1, 2),
-            Path("file3.txt"): datetime(2023, 1, 4),
-        }
+    def test_file_path_changes_with_replaced_file(self) -> None:
+        file_changes_detector = FileChangesDetector(
+            previous_file_versions={Path("file1.txt"): (1, 1)},
+            current_file_versions={Path("file1.txt"): (1, 2)},
+        )
 
+        self.assertEqual(
+            file_changes_detector.file_path_changes,
+            {"add": [], "update": [Path("file1.txt")], "delete": []},
+        )
+
+    def test_file_path_changes_with_legacy_versions(self) -> None:
         file_changes_detector = FileChangesDetector(
-            previous_file_modified_times=previous_files,
-            current_file_modified_times=current_files,
+            previous_file_versions={
+                Path("file1.txt"): (1702751393824125300, None),
+                Path("file2.txt"): (1702751393824125300, None),
+            },
+            current_file_versions={
+                Path("file1.txt"): (1702751393824125312, 1),
+                Path("file2.txt"): (1702751394824125312, 2),
+            },
         )
 
         self.assertEqual(
-            file_changes_detector.file_changes, {"add": [], "update": [], "delete": []}
+            file_changes_detector.file_path_changes,
+            {"add": [], "update": [Path("file2.txt")], "delete": []},
         )
 
-    def test_file_changes_with_changes(self) -> None:
+    def test_file_size_changes_with_changes(self) -> None:
         with open(self.temp_dir_path / "file1.txt", "w") as file:
             file.write("yo1")
 
-        with open(self.temp_dir_path / "file2.txt", "w") as file:
-            file.write("yo2")
-
         with open(self.temp_dir_path / "file4.txt", "w") as file:
-            file.write("yo4")
-
-        with open(self.temp_dir_path / "file5.txt", "w") as file:
-            file.write("yo5")
+            file.write("yo4!")
 
         previous_files = {
-            Path(self.temp_dir_path / "file1.txt"): datetime(2023, 1, 1),
-            Path(self.temp_dir_path / "file2.txt"): datetime(2023, 1, 2),
-            Path(self.temp_dir_path / "file3.txt"): datetime(2023, 1, 4),
+            Path(self.temp_dir_path / "file1.txt"): (1, 1),
+            Path(self.temp_dir_path / "file3.txt"): (4, 1),
         }
         current_files = {
-            Path(self.temp_dir_path / "file1.txt"): datetime(2023, 1, 3),
-            Path(self.temp_dir_path / "file2.txt"): datetime(2023, 1, 2),
-            Path(self.temp_dir_path / "file4.txt"): datetime(2023, 1, 4),
-            Path(self.temp_dir_path / "file5.txt"): datetime(2023, 1, 4),
+            Path(self.temp_dir_path / "file1.txt"): (3, 1),
+            Path(self.temp_dir_path / "file4.txt"): (4, 1),
         }
 
         file_changes_detector = FileChangesDetector(
-            previous_file_modified_times=previous_files,
-            current_file_modified_times=current_files,
+            previous_file_versions=previous_files,
+            current_file_versions=current_files,
         )
 
-        self.assertSetEqual(
-            set(file_changes_detector.file_changes["add"]),
+        self.assertEqual(
+            file_changes_detector.file_size_changes,
             {
-                (str(self.temp_dir_path / "file5.txt"), b"yo5"),
-                (str(self.temp_dir_path / "file4.txt"), b"yo4"),
+                "add": [(str(self.temp_dir_path / "file4.txt"), 4)],
+                "update": [(str(self.temp_dir_path / "file1.txt"), 3)],
+                "delete": [(str(self.temp_dir_path / "file3.txt"), 0)],
             },
         )
-        self.assertSetEqual(
-            set(file_changes_detector.file_changes["update"]),
-            {(str(self.temp_dir_path / "file1.txt"), b"yo1")},
-        )
-        self.assertSetEqual(
-            set(file_changes_detector.file_changes["delete"]),
-            {(str(self.temp_dir_path / "file3.txt"), b"")},
+
+    def test_file_size_changes_with_file_stats(self) -> None:
+        file_path = self.temp_dir_path / "file1.txt"
+        file_path.write_text("yo1")
+        file_stats = {file_path: os.stat(file_path)}
+
+        file_changes_detector = FileChangesDetector(
+            previous_file_versions={},
+            current_file_versions={file_path: (1, 1)},
+            current_file_stats=file_stats,
         )
 
+        with patch("os.path.getsize") as mock_getsize:
+            self.assertEqual(
+                file_changes_detector.file_size_changes,
+                {"add": [(str(file_path), 3)], "update": [], "delete": []},
+            )
+
+        mock_getsize.assert_not_called()
+
     def test_no_files_changes_exist_with_no_changes(self) -> None:
         previous_files = {
-            Path("file1.txt"): datetime(2023, 1, 1),
-            Path("file2.txt"): datetime(2023, 1, 2),
-            Path("file3.txt"): datetime(2023, 1, 4),
+            Path("file1.txt"): (1, 1),
+            Path("file2.txt"): (2, 1),
+            Path("file3.txt"): (4, 1),
         }
         current_files = {
-            Path("file1.txt"): datetime(2023, 1, 1),
-            Path("file2.txt"): datetime(2023, 1, 2),
-            Path("file3.txt"): datetime(2023, 1, 4),
+            Path("file1.txt"): (1, 1),
+            Path("file2.txt"): (2, 1),
+            Path("file3.txt"): (4, 1),
         }
 
         file_changes_detector = FileChangesDetector(
-            previous_file_modified_times=previous_files,
-            current_file_modified_times=current_files,
+            previous_file_versions=previous_files,
+            current_file_versions=current_files,
         )
 
         self.assertTrue(file_changes_detector.no_files_changes_exist)
         
     def test_no_files_changes_exist_with_changes(self) -> None:
         previous_files = {
-            Path("file1.txt"): datetime(2023, 1, 1),
-            Path("file2.txt"): datetime(2023, 1, 2),
-            Path("file3.txt"): datetime(2023, 1, 4),
+            Path("file1.txt"): (1, 1),
+            Path("file2.txt"): (2, 1),
+            Path("file3.txt"): (4, 1),
         }
         current_files = {
-            Path("file1.txt"): datetime(2023, 1, 1),
-            Path("file2.txt"): datetime(2023, 1, 2),
-            Path("file3.txt"): datetime(2023, 1, 4),
-            Path("file5.txt"): datetime(2023, 1, 4),
+            Path("file1.txt"): (1, 1),
+            Path("file2.txt"): (2, 1),
+            Path("file3.txt"): (4, 1),
+            Path("file5.txt"): (4, 1),
         }
 
         file_changes_detector = FileChangesDetector(
-            previous_file_modified_times=previous_files,
-            current_file_modified_times=current_files,
+            previous_file_versions=previous_files,
+            current_file_versions=current_files,
         )
 
         self.assertFalse(file_changes_detector.no_files_changes_exist)
@@ -0,0 +1,26 @@
+import unittest
+
+from insight_cli.utils import PositiveInt
+
+
+class TestPositiveInt(unittest.TestCase):
+    def test_positive_int(self):
+        self.assertEqual(PositiveInt("5"), 5)
+        self.assertEqual(PositiveInt(1), 1)
+
+    def test_non_positive_int(self):
+        for value in ["0", "-3", 0]:
+            with self.assertRaises(ValueError) as context_manager:
+                PositiveInt(value)
+
+            self.assertEqual(
+                str(context_manager.exception), f"{value!r} is not a positive integer"
+            )
+
+    def test_non_int(self):
+        with self.assertRaises(ValueError):
+            PositiveInt("five")
+
+
+if __name__ == "__main__":
+    unittest.main()